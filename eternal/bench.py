@@ -0,0 +1,285 @@
+"""Benchmarks of card loading, deck-builder URL parsing, deck analytics and the 7-win pipeline.
+
+Every benchmark runs on fixed inputs: a seeded corpus of decks drawn from the card collection (see make_decks)
+at several corpus sizes. Each benchmark is timed over a few repeats (the fastest run is reported) and its peak
+memory is measured with tracemalloc in one more run. Reports can be saved as a baseline and later runs compared
+against it to catch regressions.
+
+From the command line:
+
+    python -m eternal.bench --sizes 100 1000 10000 --save-baseline
+    python -m eternal.bench --sizes 100 1000 10000 --baseline bench_baseline.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import eternal.card
+import eternal.deck
+import eternal.ewc
+import eternal.format
+
+SIZES = [100, 1000, 10000]
+REPEAT = 3
+SEED = 0
+BASELINE_PATH = 'bench_baseline.json'
+# Relative slowdown (or memory growth) over the baseline reported as a regression
+TOLERANCE = 0.25
+# Cards per deck (power cards first) of the generated decks
+DECK_POWER = 17
+DECK_SIZE = 45
+REPORT_COLUMNS = ['Benchmark', 'Size', 'Seconds', 'PeakMB']
+
+
+def make_decks(collection, n_decks, seed=SEED):
+    """Draw a fixed corpus of decks from a card collection.
+
+    Decks have DECK_POWER power cards and DECK_SIZE - DECK_POWER other cards drawn uniformly (with replacement)
+    from the cards of the sets a v2 deck-builder URL can hold. These are not realistic draft decks, only repeatable
+    inputs of the right shape.
+
+    Args:
+        collection: CardCollection to draw the cards from
+        n_decks: Number of decks
+        seed: Random seed
+
+    Returns: List of [(card_id, count)] main decks in canonical order (see eternal.ewc.canonical_counts)
+    """
+    rng = np.random.default_rng(seed)
+    card_ids = collection.data.index.to_numpy()
+    set_numbers = np.array([int(cid.split('-')[0]) for cid in card_ids])
+    is_encodable = set_numbers < len(eternal.ewc.encode_v2_cards.SET_NUMBER_CHARS)
+    is_power = collection.values('Type') == 'Power'
+    power_ids, other_ids = card_ids[is_encodable & is_power], card_ids[is_encodable & ~is_power]
+    decks = []
+    for _ in range(n_decks):
+        cards = np.concatenate([rng.choice(power_ids, DECK_POWER), rng.choice(other_ids, DECK_SIZE - DECK_POWER)])
+        ids, counts = np.unique(cards, return_counts=True)
+        decks.append(eternal.ewc.canonical_counts(zip(ids, counts)))
+    return decks
+
+
+def v1_url(card_counts):
+    """v1 deck-builder URL of card counts."""
+    return eternal.ewc.DECKBUILDER_URL + '?main=' + eternal.ewc.encode_v1_cards(card_counts)
+
+
+class Corpus:
+    """Fixed inputs of the benchmarks for one corpus size."""
+
+    def __init__(self, size, collection=None, seed=SEED, cards_json_path=None, boosting_dir=None):
+        """Corpus object
+
+        Args:
+            size: Number of decks
+            collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+            seed: Random seed of the decks
+            cards_json_path: Card JSON of the loading benchmarks (defaults to eternal.card.ALL_CARDS_JSON_PATH)
+            boosting_dir: Boosting data of the 7-win pipeline (defaults to eternal.sevenwin.BOOSTING_DIR)
+        """
+        self.size = size
+        self.collection = collection if collection is not None else eternal.card.ALL
+        self.cards_json_path = cards_json_path or eternal.card.ALL_CARDS_JSON_PATH
+        self.boosting_dir = boosting_dir
+        self.decks = make_decks(self.collection, size, seed=seed)
+        self.v1_urls = [v1_url(deck) for deck in self.decks]
+        self.v2_urls = [eternal.ewc.deck_url((deck, None)) for deck in self.decks]
+        self._tmp_dir = None
+
+    @property
+    def csv_path(self):
+        """7-win CSV of the decks (written to a temporary directory on first use, see write_7win_csv)."""
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.TemporaryDirectory(prefix='eternal-bench-')
+            self.write_7win_csv(os.path.join(self._tmp_dir.name, '7win.csv'))
+        return os.path.join(self._tmp_dir.name, '7win.csv')
+
+    def write_7win_csv(self, csv_path):
+        """Write the decks as a 7-win CSV (the columns eternal.sevenwin reads, v2 URLs)."""
+        import eternal.sevenwin
+
+        csv = pd.DataFrame({'s': 1, 'Factions': '', 'Contributor': [f'Player{ix % 50}' for ix in range(self.size)],
+                            'Image': '', 'EWC': '', 'EWC-P': self.v2_urls, 'W': 7, 'L': np.arange(self.size) % 3,
+                            'Ep. #': 1})
+        csv[eternal.sevenwin.CSV_COLUMNS].to_csv(csv_path, index=False)
+
+
+# ********** BENCHMARKS **************
+# Each benchmark is setup(corpus) -> function to time, so every repeat runs on fresh objects (e.g. Decks without
+# their lazily built tables).
+
+def _card_load(corpus):
+    return lambda: eternal.card.CardCollection().load(corpus.cards_json_path, use_cache=False)
+
+
+def _card_load_cached(corpus):
+    eternal.card.CardCollection().load(corpus.cards_json_path)  # Make sure the compiled cache exists
+    return lambda: eternal.card.CardCollection().load(corpus.cards_json_path)
+
+
+def _card_info(corpus):
+    with open(corpus.cards_json_path, 'rb') as fin:
+        card_dicts = [d for d in json.load(fin) if eternal.card.CardInfo.is_valid_dict(d)]
+    return lambda: [eternal.card.CardInfo(d) for d in card_dicts]
+
+
+def _parse_v2_cards(corpus):
+    card_strings = [eternal.ewc.split_deckbuilder_url(url)[0] for url in corpus.v2_urls]
+    return lambda: [eternal.ewc.parse_v2_cards(card_string) for card_string in card_strings]
+
+
+def _parse_deckbuilder_url_v1(corpus):
+    return lambda: [eternal.ewc.parse_deckbuilder_url_v1(url) for url in corpus.v1_urls]
+
+
+def _parse_deckbuilder_urls(corpus):
+    return lambda: eternal.ewc.parse_deckbuilder_urls(corpus.v2_urls, collection=corpus.collection)
+
+
+def _deck_analytics(corpus):
+    decks = [eternal.deck.Deck.from_counts(deck, collection=corpus.collection) for deck in corpus.decks]
+    return lambda: [(deck.faction(), deck.types(), deck.unit_stats()) for deck in decks]
+
+
+def _draft_format_matcher(corpus):
+    return lambda: eternal.format.DraftFormatMatcher(setnum=None)
+
+
+def _sevenwin_card_counts(corpus):
+    import eternal.sevenwin
+
+    kwargs = {'boosting_dir': corpus.boosting_dir} if corpus.boosting_dir else {}
+    return lambda: eternal.sevenwin.Pipeline(corpus.csv_path, cache_dir=os.path.dirname(corpus.csv_path),
+                                             collection=corpus.collection, use_cache=False, **kwargs).run('offer_rates')
+
+
+# Name -> (setup, whether it depends on the corpus size)
+BENCHMARKS = {'card_load': (_card_load, False),
+              'card_load_cached': (_card_load_cached, False),
+              'card_info': (_card_info, False),
+              'draft_format_matcher': (_draft_format_matcher, False),
+              'parse_v2_cards': (_parse_v2_cards, True),
+              'parse_deckbuilder_url_v1': (_parse_deckbuilder_url_v1, True),
+              'parse_deckbuilder_urls': (_parse_deckbuilder_urls, True),
+              'deck_analytics': (_deck_analytics, True),
+              'sevenwin_card_counts': (_sevenwin_card_counts, True)}
+
+
+def measure(setup, corpus, repeat=REPEAT):
+    """Time a benchmark and measure its peak memory.
+
+    Returns: (fastest of the repeated runs in seconds, peak traced memory of one more run in MB)
+    """
+    seconds = []
+    for _ in range(repeat):
+        func = setup(corpus)
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    func = setup(corpus)
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    if not was_tracing:
+        tracemalloc.stop()
+    return min(seconds), peak / 1e6
+
+
+def run(benchmarks=None, sizes=SIZES, repeat=REPEAT, seed=SEED, collection=None, **corpus_kwargs):
+    """Run benchmarks at several corpus sizes.
+
+    Args:
+        benchmarks: Names of the benchmarks (see BENCHMARKS, defaults to all of them)
+        sizes: Corpus sizes (number of decks). Benchmarks that don't depend on the corpus run once (Size 0).
+        repeat: Timed runs per benchmark (the fastest is reported)
+        seed: Random seed of the corpora
+        collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+        corpus_kwargs: Other Corpus arguments
+
+    Returns: DataFrame with columns Benchmark, Size, Seconds (fastest run) and PeakMB (peak traced memory)
+    """
+    benchmarks = list(BENCHMARKS) if benchmarks is None else benchmarks
+    records = []
+    for ix_size, size in enumerate(sizes):
+        corpus = Corpus(size, collection=collection, seed=seed, **corpus_kwargs)
+        for name in benchmarks:
+            setup, is_sized = BENCHMARKS[name]
+            if is_sized or ix_size == 0:
+                seconds, peak = measure(setup, corpus, repeat=repeat)
+                records.append((name, size if is_sized else 0, seconds, peak))
+    return pd.DataFrame(records, columns=REPORT_COLUMNS)
+
+
+def save_baseline(report, path=BASELINE_PATH):
+    """Save a benchmark report (see run) as a JSON baseline."""
+    with open(path, 'w') as fout:
+        json.dump(report[REPORT_COLUMNS].to_dict(orient='records'), fout, indent=1)
+
+
+def load_baseline(path=BASELINE_PATH):
+    """Load a JSON baseline (see save_baseline) as a report DataFrame."""
+    with open(path) as fin:
+        return pd.DataFrame(json.load(fin), columns=REPORT_COLUMNS)
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """Compare a benchmark report against a baseline.
+
+    Args:
+        report: DataFrame of run
+        baseline: DataFrame of run (or load_baseline)
+        tolerance: Relative increase of the time or peak memory over the baseline flagged as a regression
+
+    Returns: DataFrame of the benchmarks of the report with the baseline Seconds / PeakMB (NaN for benchmarks that
+        aren't in the baseline), their TimeRatio / MemoryRatio (report / baseline) and Regression
+    """
+    comparison = report.merge(baseline, on=['Benchmark', 'Size'], how='left', suffixes=('', 'Baseline'))
+    comparison['TimeRatio'] = comparison['Seconds'] / comparison['SecondsBaseline']
+    comparison['MemoryRatio'] = comparison['PeakMB'] / comparison['PeakMBBaseline']
+    comparison['Regression'] = (comparison['TimeRatio'] > 1 + tolerance) | (comparison['MemoryRatio'] > 1 + tolerance)
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the eternal package')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), help='Benchmarks to run (default: all)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help='Corpus sizes (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='Timed runs per benchmark (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=SEED, help='Random seed of the corpora (default: %(default)s)')
+    parser.add_argument('--baseline', help='Compare against this baseline (exit status 1 on regressions)')
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE_PATH, help='Save the report as a baseline '
+                                                                                  '(default path: %(const)s)')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='Relative slowdown / memory growth flagged as a regression (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    report = run(args.benchmarks, sizes=args.sizes, repeat=args.repeat, seed=args.seed)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        if args.baseline:
+            comparison = compare(report, load_baseline(args.baseline), tolerance=args.tolerance)
+            print(comparison.to_string(index=False))
+        else:
+            print(report.to_string(index=False))
+    if args.save_baseline:
+        save_baseline(report, args.save_baseline)
+    if args.baseline and comparison['Regression'].any():
+        print('Regressions: ' + ', '.join(f'{name} ({size})' for name, size in
+                                          comparison.loc[comparison['Regression'], ['Benchmark', 'Size']].values))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
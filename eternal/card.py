@@ -1,12 +1,109 @@
+import functools
+import hashlib
+import inspect
 import json
 import logging
 import os
 import re
+import threading
+import types
 
+import numpy as np
 import pandas as pd
 
+import eternal.cardcache
+
 FACTIONS = set('FJTPS')
 
+# Deterministic faction order (alphabetical, as in influence_to_faction) and the bit of each faction in a faction mask
+FACTION_ORDER = sorted(FACTIONS)
+FACTION_BITS = dict((faction, 1 << i) for i, faction in enumerate(FACTION_ORDER))
+# Faction string of every faction mask e.g. FACTION_MASK_STRINGS[FACTION_BITS['F'] | FACTION_BITS['J']] == 'FJ'
+FACTION_MASK_STRINGS = np.array([''.join(f for f in FACTION_ORDER if mask & FACTION_BITS[f])
+                                 for mask in range(1 << len(FACTION_ORDER))], dtype=object)
+
+MARKET_ACCESS_EXCEPTIONS = {"6-14": False,  # Incendiary Slagmite
+                            "6-92": False,  # Embargo Officer
+                            "6-165": False,  # Bam, Sneakeepeekee
+                            "10-51": False,  # Customs Officer
+                            "10-65": False,  # Learn the Truth
+                            "10-71": False,  # Bastion Boltcrafter
+                            "10-75": True,  # Fair Exchange
+                            "10-78": False,  # Arms Race
+                            "10-102": False,  # Unexpected Arrival
+                            "10-159": False,  # Send to Market
+                            "10-183": False,  # Hoarding Builder
+                            "10-215": True,  # Blow the Dam
+                            "10-337": False,  # Scrapmetal Fury
+                            "10-338": False,  # Xumuc Whisper
+                            "10-342": True,  # Shorthopper
+                            "10-345": False,  # Toll of Warfare
+                            "10-362": True,  # Siege Supplier
+                            "10-368": False,  # Vicious Overgrowth
+                            "10-382": False,  # Watchwing Support
+                            "1005-18": False,  # Ponysnatcher
+                            "1097-8": False,  # Near Perfect Imitation
+                            "1097-12": False,  # Glaive of the Chosen
+                            "1107-10": False  # Gentleman Jun D’Angolo
+                            }
+
+LOWCOST_DRAW_SIGIL_EXCEPTIONS = {"1-157": 1,  # Privilege of Rank --> 2J cost draw a justice sigil
+                                 "1-513": 1,  # Find the Way      --> 2T cost spell to draw a depleted sigil
+                                 "3-108": 0,  # Copperhall Porter --> 2J cost unit... maybe
+                                 "4-275": 0,  # Recon Tower
+                                 "11-67": 0,  # Reliable Troops
+                                 "1105-19": 0,  # Hifos, Reach Captain
+                                 }
+
+# "Draw a power card": (11-43: Conspire) (4-274: Petition), notably excluding (8-25: Midias, Leyline Dragon)
+EPC_DRAW_POWER_IDS = {"11-43", "4-274"}
+
+# The below are done to match https://www.shiftstoned.com/epc/
+# The logic appears to be that no-other conditions need be met in order to get the Sigil*
+# * - Reliable Troops is an exception
+EPC_DRAW_SIGIL_EXCEPTIONS = {"1-154": 0,  # Spire Chaplain
+                             "3-305": 0,  # Lieutenant Relia
+                             "6-29": 0,  # Kaleb's Persuader
+                             "7-76": 0,  # Hexcaster
+                             "11-49": 0,  # Nurturing Sentinel
+                             "1087-1": 0,  # Jekk, Mercenary Hunter
+                             "11-67": 1,  # Reliable Troops <-- This seems to be an exception as the Pay 2 cost is ignored by EPC
+                             "2-177": 2  # Brilliant Discovery
+                             }
+
+# TODO: Complete the Play a Sigil condition
+EPC_PLAY_SIGIL_EXCEPTIONS = {"1-346": 2}  # Minotaur Ambassador
+
+RE_DRAW_SIGIL = re.compile("(?i)draw a .*sigil")
+RE_PLAY_SIGIL = re.compile("(?i)play a .*sigil")
+RE_MAX_POWER = re.compile(r"\+(.) Maximum Power")
+
+# Apostrophe variants (curly quotes, backtick, prime) folded into "'" when normalizing card names
+RE_APOSTROPHES = re.compile("[\u2018\u2019\u201b\u2032`\u00b4]")
+
+
+def normalize_name(name):
+    """Normalize a card name for lookups (case folded, apostrophe variants as "'" and single spaces).
+
+    Args:
+        name: Card name e.g. "Gentleman Jun D’Angolo"
+
+    Returns: Normalized name e.g. "gentleman jun d'angolo"
+    """
+    return ' '.join(RE_APOSTROPHES.sub("'", name).casefold().split())
+
+
+def normalize_names(names):
+    """Vectorized normalize_name.
+
+    Args:
+        names: Iterable (or pandas Series) of card names
+
+    Returns: Series of normalized names
+    """
+    names = pd.Series(names, dtype=object) if not isinstance(names, pd.Series) else names
+    return names.astype(str).str.replace(RE_APOSTROPHES, "'", regex=True).str.casefold().str.split().str.join(' ')
+
 
 def influence_to_faction(influence):
     """Convert influence to faction
@@ -17,18 +114,212 @@ def influence_to_faction(influence):
     Returns: faction
     faction is a string with JUST the de-deuplicated influence or 'None' (string) for factionless
     """
-    faction = sorted(FACTIONS.intersection(influence))
+    faction = FACTION_MASK_STRINGS[influence_to_mask(influence)]
     if faction:
-        return ''.join(faction)
+        return faction
     else:
         return 'None'
 
 
+def influence_to_mask(influence):
+    """Convert influence to a faction mask
+
+    Args:
+        influence: string with influence e.g. {F}{F}{J}
+
+    Returns: integer with the FACTION_BITS of the factions in the influence set (0 for factionless)
+    """
+    return sum(bit for faction, bit in FACTION_BITS.items() if faction in influence)
+
+
+def faction_strings(masks, none='None'):
+    """Convert faction masks to faction strings (see influence_to_faction)
+
+    Args:
+        masks: Array (or Series) of faction masks
+        none: String used for factionless masks
+
+    Returns: numpy object array of faction strings e.g. 'FJ'
+    """
+    strings = FACTION_MASK_STRINGS[np.asarray(masks, dtype=np.int64)]
+    strings[strings == ''] = none
+    return strings
+
+
+def faction_pips(data):
+    """Return the number of influence pips of each faction for each card.
+
+    Args:
+        data: DataFrame of cards indexed by card id
+
+    Returns: DataFrame with one int column per faction (in FACTION_ORDER)
+    """
+    influence = data['Influence'].fillna('')
+    return pd.DataFrame(dict((faction, influence.str.count(faction).astype('int64')) for faction in FACTION_ORDER),
+                        index=data.index)
+
+
+def faction_mask(data):
+    """Return the faction mask of the influence of each card (see FACTION_BITS).
+
+    Args:
+        data: DataFrame of cards indexed by card id
+
+    Returns: Series of int faction masks (0 for factionless cards)
+    """
+    is_faction = faction_pips(data).to_numpy() > 0
+    return pd.Series(is_faction @ np.array([FACTION_BITS[f] for f in FACTION_ORDER]), index=data.index, dtype='int64')
+
+
+def has_market_access(data):
+    """Return whether each card grants market access.
+
+    This does not return True for cards that simply have market interaction (buffing, prevention)
+    or cards that interact (even drawing) from the enemy market.
+
+    The decision was to return which cards incentivize creating your own market.
+
+    Args:
+        data: DataFrame of cards indexed by card id
+
+    Returns: Series of True or False
+    """
+    exceptions = data.index.to_series().map(MARKET_ACCESS_EXCEPTIONS)
+    is_market = data['CardText'].str.lower().str.contains('market', regex=False)
+    return exceptions.where(exceptions.notna(), is_market).astype(bool)
+
+
+def power_count(data):
+    """Generate the number of power sources each card represents for purposes of power counting within a deck.
+
+    Args:
+        data: DataFrame of cards indexed by card id
+
+    Returns: Series with the amount of power created by each card
+    """
+    card_text = data['CardText']
+    is_power = data['Type'] == 'Power'
+    is_inscribe = card_text.str.contains('<b>Inscribe</b>', regex=False)
+    is_lowcost_draw_sigil = card_text.str.contains(RE_DRAW_SIGIL) & (data['Cost'] <= 2)
+    lowcost_draw_sigil = data.index.to_series().map(LOWCOST_DRAW_SIGIL_EXCEPTIONS).fillna(1)
+    counts = np.select([is_power, is_inscribe, is_lowcost_draw_sigil], [1, 1, lowcost_draw_sigil], default=0)
+    return pd.Series(counts, index=data.index, dtype='int64')
+
+
+def epc_power_count(data):
+    """Generate the number of power sources each card represents for purposes of showing total power sources in a deck.
+    This method aims to match the logic with https://www.shiftstoned.com/epc/
+
+    Args:
+        data: DataFrame of cards indexed by card id
+
+    Returns: Series with the amount of power created by each card
+    """
+    card_ids = data.index.to_series()
+    card_text = data['CardText']
+
+    # Handle +X Maximum Power cards
+    # As of Set 11, there are only 4 cards with multiple matches:
+    #   Azindel, the Wayfinder
+    #   Mask of Torment
+    #   High Prophet of Sol
+    #   Battery Mage
+    # All of these are treated as 1 power source according to https://www.shiftstoned.com/epc/ so we will follow suit
+    # (i.e. use the first match)
+    max_power = card_text.str.extract(RE_MAX_POWER, expand=False)
+    is_max_power = max_power.notna()
+    max_power = pd.to_numeric(max_power[is_max_power]).reindex(data.index, fill_value=0)
+
+    # Handle "Draw a [XXX] Sigil" (with special cases handled before applying rules)
+    draw_sigil_exceptions = card_ids.map(EPC_DRAW_SIGIL_EXCEPTIONS)
+    is_draw_sigil_exception = draw_sigil_exceptions.notna()
+    is_draw_sigil = card_text.str.contains(RE_DRAW_SIGIL)
+
+    counts = np.select([data['Type'] == 'Power',
+                        card_ids.isin(EPC_DRAW_POWER_IDS),
+                        is_max_power,
+                        is_draw_sigil_exception,
+                        is_draw_sigil],
+                       [1, 1, max_power, draw_sigil_exceptions.fillna(0), 1], default=0)
+    return pd.Series(counts, index=data.index, dtype='int64')
+
+
+# Card features derived from the base fields and precomputed for every card in a CardCollection
+DERIVED_COLUMNS = {'PowerCount': power_count,
+                   'EPCPowerCount': epc_power_count,
+                   'MarketAccess': has_market_access,
+                   'FactionMask': faction_mask}
+# Influence pips of each faction e.g. 'InfluenceF'
+DERIVED_COLUMNS.update((f'Influence{faction}', lambda data, faction=faction: faction_pips(data)[faction])
+                       for faction in FACTION_ORDER)
+
+
+def add_derived_columns(data):
+    """Add the DERIVED_COLUMNS to a table of cards (in a single vectorized pass per feature).
+
+    Args:
+        data: DataFrame of cards indexed by card id
+
+    Returns: Copy of data with the derived columns added
+    """
+    return data.assign(**{column: func(data) for column, func in DERIVED_COLUMNS.items()})
+
+
+def _global_names(code):
+    """Global names used by a code object and the functions / comprehensions nested in it."""
+    yield from code.co_names
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from _global_names(const)
+
+
+def _stable_repr(value):
+    """repr of a rule table that doesn't depend on set ordering."""
+    if isinstance(value, re.Pattern):
+        return repr((value.pattern, value.flags))
+    if isinstance(value, (set, frozenset)):
+        return repr(sorted(value))
+    if isinstance(value, dict):
+        return repr(sorted(value.items()))
+    return repr(value.tolist() if isinstance(value, np.ndarray) else value)
+
+
+@functools.lru_cache(maxsize=None)
+def derived_columns_digest():
+    """SHA-256 of what the DERIVED_COLUMNS are computed from: the source of their functions (and of the functions of
+    this module they call) and the rule tables / regexes those use. The compiled card cache is keyed on it, so that
+    changing a rule recomputes the derived columns instead of serving stale ones.
+    """
+    sha = hashlib.sha256()
+    pending, seen = list(DERIVED_COLUMNS.values()), set()
+    while pending:
+        func = pending.pop(0)
+        if func.__code__ in seen:
+            continue
+        seen.add(func.__code__)
+        try:
+            sha.update(inspect.getsource(func).encode('utf-8'))
+        except OSError:  # No source (e.g. a bytecode-only install)
+            sha.update(func.__code__.co_code)
+        for name in _global_names(func.__code__):
+            value = globals().get(name)
+            if inspect.isfunction(value) and value.__module__ == __name__:
+                pending.append(value)
+            elif isinstance(value, (re.Pattern, set, frozenset, dict, list, tuple, np.ndarray)):
+                sha.update(f'{name}={_stable_repr(value)}'.encode('utf-8'))
+    return sha.hexdigest()
+
+
 class CardInfo:
-    """Class to represent stats of a card in Eternal"""
+    """Class to represent stats of a card in Eternal
+
+    A CardInfo is either a standalone card (built from a dictionary) or a lightweight view onto a single row of a
+    CardCollection. Views hold no card data of their own, only the collection and the row position.
+    """
 
-    # TODO: Replace with Python 3.7's dataclass
     # TODO: Figure out how to handle-factions more easily
+    __slots__ = ('id', '_data', '_collection', '_row')
+
     BASE_FIELDS = set(['Attack', 'CardText', 'Cost', 'DeckBuildable', 'DetailsUrl', 'EternalID', 'Health',
                        'ImageUrl', 'Influence', 'Name', 'Rarity', 'SetNumber', 'Type'])
     UNIT_FIELDS = set(['UnitType'])
@@ -58,13 +349,40 @@ class CardInfo:
         Returns: instance of Card
         """
         if isinstance(card_info, CardInfo):
-            self.data = card_info.data
             self.id = card_info.id
+            self._data = card_info._data
+            self._collection = card_info._collection
+            self._row = card_info._row
         else:
             self.validate_dict(card_info)
-            self.data = pd.Series(card_info)
-            self.id = '{set}-{eid}'.format(set=self.data['SetNumber'], eid=self.data['EternalID'])
-            self.data.name = self.id
+            self._data = pd.Series(card_info)
+            self.id = '{set}-{eid}'.format(set=self._data['SetNumber'], eid=self._data['EternalID'])
+            self._data.name = self.id
+            self._collection = None
+            self._row = None
+
+    @classmethod
+    def _view(cls, collection, row, card_id):
+        """Create a view onto row `row` of `collection` without copying any card data."""
+        view = cls.__new__(cls)
+        view.id = card_id
+        view._data = None
+        view._collection = collection
+        view._row = row
+        return view
+
+    @property
+    def data(self):
+        """pandas Series with all the fields of the card (named by the card id)."""
+        if self._collection is not None:
+            return self._collection.data.iloc[self._row]
+        return self._data
+
+    def _field(self, field):
+        """Get a single field of the card without materializing the full row."""
+        if self._collection is not None:
+            return self._collection.data[field].iat[self._row]
+        return self._data[field]
 
     @classmethod
     def is_valid_dict(cls, d):
@@ -86,138 +404,44 @@ class CardInfo:
     def __repr__(self):
         return "<{obj_class}@{address}> {id:>8}: {name:<30} [{type}-{rarity}]".format(
             obj_class=self.__class__.__name__, address=hex(id(self)),
-            id=self.id, name=self.data['Name'], type=self.data['Type'], rarity=self.data['Rarity'])
+            id=self.id, name=self._field('Name'), type=self._field('Type'), rarity=self._field('Rarity'))
 
-    def has_market_access(self):
-        """Return whether a card grants market access.
+    def _derived(self, column):
+        """Get a derived card feature (see DERIVED_COLUMNS), computing it for standalone cards."""
+        if self._collection is not None:
+            return self._collection.data[column].iat[self._row]
+        return add_derived_columns(pd.DataFrame([self._data]))[column].iat[0]
 
-        This does not return True for cards that simply have market interaction (buffing, prevention)
-        or cards that interact (even drawing) from the enemy market.
-
-        The decision was to return which cards incentivize creating your own market.
+    def has_market_access(self):
+        """Return whether a card grants market access (see has_market_access()).
 
         Returns: True or False
         """
-        MARKET_ACCESS_EXCEPTIONS = {"6-14": False,  # Incendiary Slagmite
-                                    "6-92": False,  # Embargo Officer
-                                    "6-165": False,  # Bam, Sneakeepeekee
-                                    "10-51": False,  # Customs Officer
-                                    "10-65": False,  # Learn the Truth
-                                    "10-71": False,  # Bastion Boltcrafter
-                                    "10-75": True,  # Fair Exchange
-                                    "10-78": False,  # Arms Race
-                                    "10-102": False,  # Unexpected Arrival
-                                    "10-159": False,  # Send to Market
-                                    "10-183": False,  # Hoarding Builder
-                                    "10-215": True,  # Blow the Dam
-                                    "10-337": False,  # Scrapmetal Fury
-                                    "10-338": False,  # Xumuc Whisper
-                                    "10-342": True,  # Shorthopper
-                                    "10-345": False,  # Toll of Warfare
-                                    "10-362": True,  # Siege Supplier
-                                    "10-368": False,  # Vicious Overgrowth
-                                    "10-382": False,  # Watchwing Support
-                                    "1005-18": False,  # Ponysnatcher
-                                    "1097-8": False,  # Near Perfect Imitation
-                                    "1097-12": False,  # Glaive of the Chosen
-                                    "1107-10": False  # Gentleman Jun D’Angolo
-                                    }
-        card_text = self.data['CardText']
-        if self.id in MARKET_ACCESS_EXCEPTIONS:
-            return MARKET_ACCESS_EXCEPTIONS[self.id]
-        else:
-            return 'market' in card_text.lower()
+        return bool(self._derived('MarketAccess'))
 
     def power_count(self):
         """Generate the number of power sources a card represents for purposes of power counting within a deck.
+        (see power_count())
 
         Returns: Amount of power created by the card as a number.
         """
-        if self.data['Type'] == 'Power':
-            return 1
-
-        card_text = self.data['CardText']
-        if '<b>Inscribe</b>' in card_text:
-            return 1
-        re_draw_sigil = re.compile("(?i)draw a .*sigil")
-        matches = re_draw_sigil.findall(card_text)
-        if matches and self.data['Cost'] <= 2:
-            LOWCOST_DRAW_SIGIL_EXCEPTIONS = {"1-157": 1,  # Privilege of Rank --> 2J cost draw a justice sigil
-                                             "1-513": 1,  # Find the Way      --> 2T cost spell to draw a depleted sigil
-                                             "3-108": 0,  # Copperhall Porter --> 2J cost unit... maybe
-                                             "4-275": 0,  # Recon Tower
-                                             "11-67": 0,  # Reliable Troops
-                                             "1105-19": 0,  # Hifos, Reach Captain
-                                             }
-            if self.id in LOWCOST_DRAW_SIGIL_EXCEPTIONS:
-                return LOWCOST_DRAW_SIGIL_EXCEPTIONS[self.id]
-            else:
-                return 1
-        return 0
+        return int(self._derived('PowerCount'))
 
     def epc_power_count(self):
         """Generate the number of power sources a card represents for purposes of showing total power sources in a deck.
-        This method aims to match the logic with https://www.shiftstoned.com/epc/
+        (see epc_power_count())
 
         Returns: Amount of power created by the card as a number.
         """
-        # Short-circuit power cards
-        if self.data['Type'] == 'Power':
-            return 1
-
-        # Handle some other cases special cases before applying rules
-        # * "Draw a power card": (11-43: Conspire) (4-274: Petition), notably excluding (8-25: Midias, Leyline Dragon)
-        if self.id in ["11-43", "4-274"]:
-            return 1
-
-        # Handle +X Maximum Power cards
-        card_text = self.data['CardText']
-        re_max_power = re.compile("\+. Maximum Power")
-        matches = re_max_power.findall(card_text)
-        if matches:
-            if len(matches) == 1:
-                return int(matches[0][1])
-            else:
-                # As of Set 11, there are only 4 cards in this case:
-                #   Azindel, the Wayfinder
-                #   Mask of Torment
-                #   High Prophet of Sol
-                #   Battery Mage
-                # All of these are treated as 1 power source according to https://www.shiftstoned.com/epc/ so we will follow suit
-                return int(matches[0][1])
-
-        # Handle "Draw a [XXX] Sigil"
-
-        # Handle some other cases special cases before applying rules
-        # The below are done to match https://www.shiftstoned.com/epc/
-        # The logic appears to be that no-other conditions need be met in order to get the Sigil*
-        # * - Reliable Troops is an exception
-        DRAW_SIGIL_EXCEPTIONS = {"1-154": 0,  # Spire Chaplain
-                                 "3-305": 0,  # Lieutenant Relia
-                                 "6-29": 0,  # Kaleb's Persuader
-                                 "7-76": 0,  # Hexcaster
-                                 "11-49": 0,  # Nurturing Sentinel
-                                 "1087-1": 0,  # Jekk, Mercenary Hunter
-                                 "11-67": 1,  # Reliable Troops <-- This seems to be an exception as the Pay 2 cost is ignored by EPC
-                                 "2-177": 2  # Brilliant Discovery
-                                 }
-        if self.id in DRAW_SIGIL_EXCEPTIONS:
-            return DRAW_SIGIL_EXCEPTIONS[self.id]
-        re_draw_sigil = re.compile("(?i)draw a .*sigil")
-        matches = re_draw_sigil.findall(card_text)
-        if matches:
-            return 1
-
-        # Play a [X] Sigil/Power
-        # TODO: Complete the Play a Sigil condition
-        re_play_sigil = re.compile("(?i)play a .*sigil")
-        PLAY_SIGIL_EXCEPTIONS = {"1-346": 2}  # Minotaur Ambassador
-
-        return 0
+        return int(self._derived('EPCPowerCount'))
 
 
 class CardCollection:
-    """Lookup objet for all card info exposing a dictionary like interface based on an identified <set>-<card_id>."""
+    """Lookup objet for all card info exposing a dictionary like interface based on an identified <set>-<card_id>.
+
+    All card data lives in a single columnar DataFrame (self.data, indexed by card id). The CardInfo objects in
+    self.cards / self.cards_dict are lightweight views onto the rows of that table.
+    """
 
     def __init__(self):
         """
@@ -227,43 +451,168 @@ class CardCollection:
         self.data = pd.DataFrame()
         self.cards = []
         self.cards_dict = {}
+        self._values = {}
+        self._name_index = None
 
-    def load(self, json_path):
+    def load(self, json_path, use_cache=True):
         """Load a card collection from JSON.
 
         Args:
             json_path:
+            use_cache: Load from (and write) a compiled cache next to the JSON, see eternal.cardcache
         """
+        if use_cache:
+            digest = eternal.cardcache.file_digest(json_path)
+            derived_digest = derived_columns_digest()
+            data = eternal.cardcache.load(json_path, digest, columns=DERIVED_COLUMNS, derived_digest=derived_digest)
+            if data is None:
+                data = add_derived_columns(self._parse_json(json_path))
+                eternal.cardcache.save(json_path, digest, data, derived_digest=derived_digest)
+        else:
+            data = add_derived_columns(self._parse_json(json_path))
+        self._set_data(data, derived=True)
+
+    @staticmethod
+    def _parse_json(json_path):
+        """Parse and validate the card JSON into a DataFrame of cards indexed by card id."""
         with open(json_path, 'rb') as fin:
             json_card_list = json.load(fin)
+        records = {}
         for card_json in json_card_list:
             if CardInfo.is_valid_dict(card_json):
-                cardinfo = CardInfo(card_json)
-                self.cards_dict[cardinfo.id] = cardinfo
-        self.cards = list(self.cards_dict.values())
-        self.data = pd.DataFrame(x.data for x in self.cards)
+                card_id = '{set}-{eid}'.format(set=card_json['SetNumber'], eid=card_json['EternalID'])
+                records[card_id] = card_json
+        return pd.DataFrame(list(records.values()), index=list(records.keys()))
+
+    def _set_data(self, data, derived=False):
+        """Set the underlying card table and (re)build the CardInfo views onto it.
+
+        Args:
+            data: DataFrame of cards indexed by card id
+            derived: Whether data already has the DERIVED_COLUMNS (e.g. from the compiled cache)
+        """
+        self.data = data if derived else add_derived_columns(data)
+        self._values = {}
+        self._name_index = None
+        card_ids = data.index.tolist()
+        self.cards = [CardInfo._view(self, row, card_id) for row, card_id in enumerate(card_ids)]
+        self.cards_dict = dict(zip(card_ids, self.cards))
+
+    def values(self, column):
+        """Get a column of the card table as a (cached) numpy array, e.g. for indexing by row position.
+
+        Args:
+            column: Name of the column in self.data
+
+        Returns: numpy array with one entry per card (in the order of self.cards)
+        """
+        if column not in self._values:
+            self._values[column] = self.data[column].to_numpy()
+        return self._values[column]
+
+    def name_index(self):
+        """Normalized card name (see normalize_name) -> tuple of the ids of the cards with that name (reprints
+        included, in collection order), built on first use."""
+        if self._name_index is None:
+            name_index = {}
+            for name, card_id in zip(normalize_names(self.values('Name')), self.data.index):
+                name_index.setdefault(name, []).append(card_id)
+            self._name_index = dict((name, tuple(card_ids)) for name, card_ids in name_index.items())
+        return self._name_index
+
+    def lookup_names(self, names, duplicates='raise'):
+        """Resolve card names to card ids (ignoring case, whitespace and apostrophe variants).
+
+        Args:
+            names: Iterable (or pandas Series) of card names
+            duplicates: What to do with names shared by several cards (reprints):
+                'raise' - KeyError listing the ambiguous names
+                'first' / 'last' - Id of the first / last card of that name in the collection
+                'all'   - Tuple of all the ids
+
+        Returns: Series of card ids (None for unknown names) indexed by the names (or the index of a Series)
+        """
+        assert duplicates in ('raise', 'first', 'last', 'all')
+        if not isinstance(names, pd.Series):
+            names = list(names)
+            names = pd.Series(names, index=names, dtype=object)
+        name_index = self.name_index()
+        matches = [name_index.get(name) for name in normalize_names(names)]
+
+        if duplicates == 'raise':
+            is_ambiguous = np.array([ids is not None and len(ids) > 1 for ids in matches], dtype=bool)
+            if is_ambiguous.any():
+                raise KeyError(f"Card names shared by several cards: {sorted(set(names.to_numpy()[is_ambiguous]))}")
+        ix_pick = -1 if duplicates == 'last' else 0
+        card_ids = [None if ids is None else ids if duplicates == 'all' else ids[ix_pick] for ids in matches]
+        return pd.Series(card_ids, index=names.index, dtype=object)
 
     def __getitem__(self, key):
         return self.cards_dict[key]
 
+    def __contains__(self, key):
+        return key in self.cards_dict
+
+    def __len__(self):
+        return len(self.cards)
+
 
 # Eternal Card JSONs can be obtained at https://eternalwarcry.com/cards/download
-# All cards is the global card list
+# All cards is the global card list (eternal.card.ALL) which is loaded lazily on first access
 ALL_CARDS_JSON_PATH = os.path.join(os.path.dirname(__file__), 'eternal-cards.json')
 
-if os.path.exists(ALL_CARDS_JSON_PATH):
-    ALL = CardCollection()
-    ALL.load(ALL_CARDS_JSON_PATH)
-else:
-    logging.warning(
-        """"
-        *****************************************
-        Unable to locate eternal-cards.json!
-        
-        This file is needed in order to get card states and can be downloaded at:
-        https://eternalwarcry.com/cards/download
-        
-        And saved to the following path:
-        {dir}        
-        *****************************************
-        """.format(dir=os.path.dirname(__file__)))
+_ALL = None
+_ALL_LOCK = threading.Lock()
+
+
+def load_all():
+    """Get the global card collection, loading it from ALL_CARDS_JSON_PATH on first use.
+
+    This is what backs eternal.card.ALL and is safe to call from multiple threads (the JSON is only parsed once).
+    Call it directly to preload the cards ahead of time.
+
+    Returns: CardCollection with all cards
+    """
+    global _ALL
+    if _ALL is None:
+        with _ALL_LOCK:
+            if _ALL is None:
+                if not os.path.exists(ALL_CARDS_JSON_PATH):
+                    logging.warning(
+                        """"
+                        *****************************************
+                        Unable to locate eternal-cards.json!
+
+                        This file is needed in order to get card states and can be downloaded at:
+                        https://eternalwarcry.com/cards/download
+
+                        And saved to the following path:
+                        {dir}
+                        *****************************************
+                        """.format(dir=os.path.dirname(__file__)))
+                    raise FileNotFoundError(ALL_CARDS_JSON_PATH)
+                collection = CardCollection()
+                collection.load(ALL_CARDS_JSON_PATH)
+                _ALL = collection
+    return _ALL
+
+
+def preload(background=False):
+    """Preload the global card collection.
+
+    Args:
+        background: If True load the cards in a daemon thread and return immediately
+
+    Returns: The loading thread if background is True otherwise the CardCollection
+    """
+    if background:
+        thread = threading.Thread(target=load_all, name='eternal-card-preload', daemon=True)
+        thread.start()
+        return thread
+    return load_all()
+
+
+def __getattr__(name):
+    if name == 'ALL':
+        return load_all()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,163 @@
+"""Compiled on-disk cache of a card collection.
+
+The cache is stored next to the source JSON as a directory of .npy files (one per column plus the card-id index)
+that are memory-mapped on load. It holds the card table with its derived columns (see eternal.card.DERIVED_COLUMNS)
+and numeric columns are used in place (read-only) without being copied. Each cache is keyed on the SHA-256 of the
+JSON file content so that a new download of eternal-cards.json is picked up automatically (and stale caches are
+removed when the new one is written). The digest of the derivation rules (eternal.card.derived_columns_digest) is
+checked too, so that changed rules recompute the derived columns.
+
+Layout:
+    <json dir>/.<json name>.cache/<sha256>/meta.json
+    <json dir>/.<json name>.cache/<sha256>/<n>.npy          numeric/bool column
+    <json dir>/.<json name>.cache/<sha256>/<n>.text.npy     utf-8 text of all values of a text/list column
+    <json dir>/.<json name>.cache/<sha256>/<n>.offsets.npy  character offsets of each value in the text
+    <json dir>/.<json name>.cache/<sha256>/<n>.isnull.npy   missing values of a text/list column
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 3
+LIST_SEPARATOR = '\x1f'  # ASCII unit separator used to join list values (e.g. UnitType)
+INDEX_KEY = 'index'
+
+
+def file_digest(path):
+    """SHA-256 hex digest of the content of a file."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fin:
+        for chunk in iter(lambda: fin.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def cache_root(json_path):
+    """Directory holding all caches for a given JSON file."""
+    dirname, basename = os.path.split(os.path.abspath(json_path))
+    return os.path.join(dirname, f'.{basename}.cache')
+
+
+def cache_dir(json_path, digest):
+    """Directory holding the cache of a given version (digest) of a JSON file."""
+    return os.path.join(cache_root(json_path), digest)
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _save_text(dirpath, key, values, is_list):
+    isnull = np.array([_is_null(x) for x in values], dtype=bool)
+    unexpected = set(type(x).__name__ for x, null in zip(values, isnull) if not null and not isinstance(x, (list, str)))
+    if unexpected:
+        raise TypeError(f"Can't cache column {key} with values of type {sorted(unexpected)} (only str, list or null)")
+    strings = ['' if null else (LIST_SEPARATOR.join(x) if is_list else x) for x, null in zip(values, isnull)]
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum([len(x) for x in strings], out=offsets[1:])
+    text = np.frombuffer(''.join(strings).encode('utf-8'), dtype=np.uint8)
+    np.save(os.path.join(dirpath, f'{key}.text.npy'), text)
+    np.save(os.path.join(dirpath, f'{key}.offsets.npy'), offsets)
+    np.save(os.path.join(dirpath, f'{key}.isnull.npy'), isnull)
+
+
+def _load_text(dirpath, key, is_list):
+    text = np.load(os.path.join(dirpath, f'{key}.text.npy'), mmap_mode='r').tobytes().decode('utf-8')
+    offsets = np.load(os.path.join(dirpath, f'{key}.offsets.npy'), mmap_mode='r').tolist()
+    isnull = np.load(os.path.join(dirpath, f'{key}.isnull.npy'), mmap_mode='r')
+    values = [text[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+    if is_list:
+        values = [x.split(LIST_SEPARATOR) if x else [] for x in values]
+    if isnull.any():
+        values = [np.nan if null else x for x, null in zip(values, isnull.tolist())]
+    return values
+
+
+def save(json_path, digest, data, derived_digest=None):
+    """Write the compiled cache of a card table.
+
+    Failing to write the cache (e.g. read-only install) is logged and otherwise ignored. Text columns with values
+    other than str, list or null raise TypeError (rather than being cached as missing).
+
+    Args:
+        json_path: Path to the source JSON
+        digest: file_digest() of the source JSON
+        data: DataFrame of cards indexed by card id (as built by CardCollection.load)
+        derived_digest: (optional) Digest of the rules the derived columns of data were computed with
+    """
+    root = cache_root(json_path)
+    tmpdir = None
+    try:
+        os.makedirs(root, exist_ok=True)
+        tmpdir = tempfile.mkdtemp(dir=root, prefix='.tmp-')
+        columns = []
+        _save_text(tmpdir, INDEX_KEY, list(data.index), is_list=False)
+        for i, column in enumerate(data.columns):
+            series = data[column]
+            if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+                kind = 'numeric'
+                np.save(os.path.join(tmpdir, f'{i}.npy'), series.to_numpy())
+            else:
+                values = series.tolist()
+                kind = 'list' if any(isinstance(x, list) for x in values) else 'text'
+                _save_text(tmpdir, str(i), values, is_list=(kind == 'list'))
+            columns.append({'name': column, 'kind': kind})
+        with open(os.path.join(tmpdir, 'meta.json'), 'w') as fout:
+            json.dump({'version': CACHE_VERSION, 'digest': digest, 'derived_digest': derived_digest,
+                       'columns': columns}, fout)
+
+        # Swap in the new cache and clear out caches of previous versions of the JSON
+        target = cache_dir(json_path, digest)
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(tmpdir, target)
+        for name in os.listdir(root):
+            if name != digest and not name.startswith('.tmp-'):
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    except OSError as e:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        logging.warning(f"Unable to write card cache for {json_path}: {e}")
+    except BaseException:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+
+
+def load(json_path, digest, columns=(), derived_digest=None):
+    """Load the compiled cache of a card table.
+
+    Args:
+        json_path: Path to the source JSON
+        digest: file_digest() of the source JSON
+        columns: Names of columns the cache must have (e.g. derived columns), it is ignored otherwise
+        derived_digest: (optional) Digest of the current derivation rules, the cache is ignored if it was saved with
+                        other ones
+
+    Returns: DataFrame of cards indexed by card id (numeric columns memory-mapped, read-only) or None if there is no
+        (valid) cache
+    """
+    dirpath = cache_dir(json_path, digest)
+    try:
+        with open(os.path.join(dirpath, 'meta.json'), 'r') as fin:
+            meta = json.load(fin)
+        if meta['version'] != CACHE_VERSION or meta['digest'] != digest or meta['derived_digest'] != derived_digest or \
+                not set(columns) <= set(column['name'] for column in meta['columns']):
+            return None
+        index = _load_text(dirpath, INDEX_KEY, is_list=False)
+        table = {}
+        for i, column in enumerate(meta['columns']):
+            if column['kind'] == 'numeric':
+                table[column['name']] = np.load(os.path.join(dirpath, f'{i}.npy'), mmap_mode='r').view(np.ndarray)
+            else:
+                table[column['name']] = _load_text(dirpath, str(i), is_list=(column['kind'] == 'list'))
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logging.warning(f"Ignoring unreadable card cache {dirpath}: {e}")
+        return None
+    return pd.DataFrame(table, index=index, copy=False)
@@ -0,0 +1,264 @@
+import functools
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+import eternal.card
+import eternal.ewc
+import eternal.parallel
+
+# Deck faction cutoff (see eternal.deck.Deck.faction)
+MAIN_FACTION_COUNT = 6
+
+# Faction order used for the faction columns (matches eternal.deck.Deck.faction)
+FACTION_ORDER = eternal.card.FACTION_ORDER
+
+# Default per-deck features of deck_features (card collection columns)
+DECK_FEATURES = ['PowerCount', 'EPCPowerCount', 'MarketAccess']
+
+
+class DeckMatrix:
+    """Sparse deck x card count matrix for a corpus of decks (e.g. the 7-win decks).
+
+    Rows are decks (labelled by self.decks) and columns are every card of the card collection (in the order of
+    collection.cards, labelled by self.cards) so card features are simply the collection columns.
+    Only the main deck is counted.
+    """
+
+    def __init__(self, matrix, decks, collection=None):
+        """DeckMatrix object
+
+        Args:
+            matrix: scipy.sparse matrix (n_decks x n_cards) of card counts
+            decks: Labels of the decks (rows)
+            collection: (optional) CardCollection defining the columns (defaults to eternal.card.ALL)
+        """
+        self.collection = collection if collection is not None else eternal.card.ALL
+        self.matrix = scipy.sparse.csr_matrix(matrix, dtype=np.int32)
+        self.decks = pd.Index(decks)
+        self.cards = self.collection.data.index
+        assert self.matrix.shape == (len(self.decks), len(self.cards))
+        self._faction_indicators = {}
+
+    @classmethod
+    def from_table(cls, table, collection=None, zone='main'):
+        """Build the matrix from the long-form table of eternal.ewc.parse_deckbuilder_urls.
+
+        Decks that failed to decode are left out.
+
+        Args:
+            table: DataFrame with columns Deck, CardId, Count, Zone and Error
+            collection: (optional) CardCollection to resolve the card ids against (defaults to eternal.card.ALL)
+            zone: Zone of the cards to count ('main' or 'market')
+
+        Returns: DeckMatrix
+        """
+        collection = collection if collection is not None else eternal.card.ALL
+        table = table[table['Error'].isna()]
+        rows, decks = pd.factorize(table['Deck'])
+        in_zone = (table['Zone'] == zone).to_numpy()
+
+        card_ids = pd.Categorical(table['CardId'][in_zone])
+        category_columns = collection.data.index.get_indexer(card_ids.categories)
+        if (category_columns < 0).any():
+            raise KeyError(f"Unknown card ids: {list(card_ids.categories[category_columns < 0])}")
+        columns = category_columns[card_ids.codes]
+
+        matrix = scipy.sparse.coo_matrix((table['Count'].to_numpy()[in_zone], (rows[in_zone], columns)),
+                                         shape=(len(decks), len(collection.cards)))
+        return cls(matrix, decks, collection=collection)
+
+    @classmethod
+    def from_urls(cls, urls, collection=None, n_jobs=1):
+        """Build the matrix from deck-builder URLs (see eternal.ewc.parse_deckbuilder_urls).
+
+        Args:
+            urls: Iterable (or pandas Series) of Eternal warcry deckbuilder URLs
+            collection: (optional) CardCollection to resolve the card ids against (defaults to eternal.card.ALL)
+            n_jobs: Number of processes decoding the URLs (None for all CPUs)
+
+        Returns: DeckMatrix (decks that fail to decode or have card ids missing from the collection are left out)
+        """
+        collection = collection if collection is not None else eternal.card.ALL
+        table = eternal.ewc.parse_deckbuilder_urls(urls, collection=collection, n_jobs=n_jobs)
+        return cls.from_table(table, collection=collection)
+
+    @classmethod
+    def from_decks(cls, decks, collection=None):
+        """Build the matrix from Deck objects.
+
+        Args:
+            decks: Iterable (or pandas Series) of eternal.deck.Deck
+            collection: (optional) CardCollection the decks resolve against (defaults to that of the first deck)
+
+        Returns: DeckMatrix
+        """
+        labels = decks.index if isinstance(decks, pd.Series) else None
+        decks = list(decks)
+        if labels is None:
+            labels = pd.RangeIndex(len(decks))
+        if collection is None:
+            collection = decks[0].collection if decks else eternal.card.ALL
+        assert all(deck.collection is collection for deck in decks)
+
+        rows = np.repeat(np.arange(len(decks)), [len(deck.main_ids) for deck in decks])
+        columns = np.concatenate([deck.main_positions for deck in decks] + [np.zeros(0, dtype=np.intp)])
+        counts = np.concatenate([deck.main_counts for deck in decks] + [np.zeros(0, dtype=np.int64)])
+        matrix = scipy.sparse.coo_matrix((counts, (rows, columns)), shape=(len(decks), len(collection.cards)))
+        return cls(matrix, labels, collection=collection)
+
+    def __len__(self):
+        return len(self.decks)
+
+    @property
+    def card_data(self):
+        """Card collection table (one row per matrix column)."""
+        return self.collection.data
+
+    def _faction_indicator(self, non_power):
+        """Dense (n_cards x n_factions) boolean matrix of the factions in each card's influence."""
+        if non_power not in self._faction_indicators:
+            masks = self.collection.values('FactionMask')
+            indicator = np.column_stack([(masks & eternal.card.FACTION_BITS[faction]) != 0 for faction in FACTION_ORDER])
+            if non_power:
+                indicator &= (self.collection.values('Type') != 'Power')[:, None]
+            self._faction_indicators[non_power] = indicator
+        return self._faction_indicators[non_power]
+
+    def _column_totals(self, matrix):
+        totals = pd.Series(np.asarray(matrix.sum(axis=0)).ravel(), index=self.cards)
+        return totals[totals > 0]
+
+    def card_counts(self):
+        """Total number of copies of each card across all decks.
+
+        Returns: Series indexed by card id (cards that are played only)
+        """
+        return self._column_totals(self.matrix)
+
+    def deck_counts(self):
+        """Number of decks playing each card.
+
+        Returns: Series indexed by card id (cards that are played only)
+        """
+        return self._column_totals(self.matrix > 0)
+
+    def deck_sizes(self):
+        """Number of cards in each deck.
+
+        Returns: Series indexed by deck
+        """
+        return pd.Series(np.asarray(self.matrix.sum(axis=1)).ravel(), index=self.decks)
+
+    def deck_aggregate(self, values):
+        """Per-deck total of a card feature (e.g. 'PowerCount' or card_data['Type'] == 'Unit').
+
+        Args:
+            values: Name of a card collection column or array/Series with one value per card
+
+        Returns: Series indexed by deck
+        """
+        if isinstance(values, str):
+            values = self.card_data[values]
+        values = np.asarray(values)
+        if values.dtype == bool:
+            values = values.astype(np.int64)
+        return pd.Series(self.matrix @ values, index=self.decks)
+
+    def deck_faction_counts(self):
+        """Count of non-power cards of each faction in each deck (see eternal.deck.Deck._faction_counts).
+
+        Returns: DataFrame indexed by deck with one column per faction
+        """
+        counts = self.matrix @ self._faction_indicator(non_power=True).astype(np.int64)
+        return pd.DataFrame(counts, index=self.decks, columns=FACTION_ORDER)
+
+    def deck_faction_masks(self):
+        """Main and splash factions of each deck as faction masks (see eternal.deck.Deck.faction_masks).
+
+        Returns: DataFrame indexed by deck with int 'MainMask' and 'SplashMask' columns
+        """
+        faction_counts = self.deck_faction_counts().to_numpy()
+        is_main = faction_counts >= MAIN_FACTION_COUNT
+        is_splash = (faction_counts > 0) & ~is_main
+        bits = np.array([eternal.card.FACTION_BITS[faction] for faction in FACTION_ORDER])
+        return pd.DataFrame({'MainMask': is_main @ bits, 'SplashMask': is_splash @ bits}, index=self.decks)
+
+    def deck_factions(self):
+        """Main and splash factions of each deck (see eternal.deck.Deck.faction).
+
+        Returns: DataFrame indexed by deck with 'MainFaction' and 'SplashFaction' strings
+        """
+        masks = self.deck_faction_masks()
+        return pd.DataFrame({'MainFaction': eternal.card.FACTION_MASK_STRINGS[masks['MainMask'].to_numpy()],
+                             'SplashFaction': eternal.card.FACTION_MASK_STRINGS[masks['SplashMask'].to_numpy()]},
+                            index=self.decks)
+
+    def playable_deck_counts(self):
+        """Number of decks able to play a card of each faction mask (main + splash factions cover the card's).
+
+        Returns: numpy array indexed by faction mask (index 0, factionless, counts every deck)
+        """
+        masks = self.deck_faction_masks()
+        deck_masks = np.bincount(masks['MainMask'] | masks['SplashMask'], minlength=len(eternal.card.FACTION_MASK_STRINGS))
+        all_masks = np.arange(len(deck_masks))
+        is_covered = (all_masks[:, None] & ~all_masks[None, :]) == 0  # [card mask, deck mask]
+        return is_covered @ deck_masks
+
+    def splash_matrix(self):
+        """Sparse matrix of the card counts that are splashed in each deck.
+
+        A card is splashed in a deck if its influence contains any of the deck's splash factions.
+
+        Returns: scipy.sparse.csr_matrix (n_decks x n_cards)
+        """
+        splash_masks = self.deck_faction_masks()['SplashMask'].to_numpy()
+        coo = self.matrix.tocoo()
+        is_splash = (splash_masks[coo.row] & self.collection.values('FactionMask')[coo.col]) != 0
+        return scipy.sparse.csr_matrix((coo.data[is_splash], (coo.row[is_splash], coo.col[is_splash])),
+                                       shape=self.matrix.shape)
+
+    def splash_counts(self):
+        """Total number of splashed copies of each card across all decks.
+
+        Returns: Series indexed by card id (splashed cards only)
+        """
+        return self._column_totals(self.splash_matrix())
+
+
+def _deck_feature_shard(offset, urls, features):
+    """Per-deck feature totals of a shard of URLs (see deck_features).
+
+    Returns: (positions of the decoded decks, n_decks x (1 + n_features) array of card counts and feature totals)
+    """
+    collection = eternal.parallel.worker_collection()
+    deck_matrix = DeckMatrix.from_table(eternal.ewc.parse_deckbuilder_urls(urls, collection=collection),
+                                        collection=collection)
+    values = [deck_matrix.deck_sizes().to_numpy()] + [deck_matrix.deck_aggregate(feature).to_numpy() for feature in features]
+    return np.asarray(deck_matrix.decks, dtype=np.int64) + offset, np.column_stack(values).astype(np.float64)
+
+
+def deck_features(urls, features=DECK_FEATURES, collection=None, n_jobs=1, shard_size=eternal.parallel.SHARD_SIZE):
+    """Per-deck totals of card features (e.g. effective power) straight from deck-builder URLs.
+
+    Shards of the URLs are decoded and aggregated by worker processes (see eternal.parallel.map_shards) which only
+    send back the per-deck totals.
+
+    Args:
+        urls: Iterable (or pandas Series) of Eternal warcry deckbuilder URLs
+        features: Card collection columns to total over the main deck
+        collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+        n_jobs: Number of worker processes (None for all CPUs)
+        shard_size: Number of URLs per shard
+
+    Returns: DataFrame indexed by deck (position of the URL or its Series label, decks that failed to decode are
+        left out) with a 'Cards' column and one column per feature
+    """
+    labels = urls.index if isinstance(urls, pd.Series) else None
+    results = eternal.parallel.map_shards(functools.partial(_deck_feature_shard, features=list(features)), urls,
+                                          n_jobs=n_jobs, shard_size=shard_size, collection=collection)
+    positions = np.concatenate([np.zeros(0, dtype=np.int64)] + [shard_positions for shard_positions, _ in results])
+    values = np.concatenate([np.zeros((0, 1 + len(features)))] + [shard_values for _, shard_values in results])
+    return pd.DataFrame(values, index=labels[positions] if labels is not None else positions,
+                        columns=['Cards'] + list(features))
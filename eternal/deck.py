@@ -1,10 +1,40 @@
+import numpy as np
 import pandas as pd
 
-from .card import FACTIONS
+import eternal.card
+from .card import FACTION_BITS, FACTION_ORDER
+
+
+def _card_counts(cards):
+    """Collapse a list of (repeated) cards into card ids and counts, keeping the order cards first appear in."""
+    counts = {}
+    for card in cards:
+        counts[card.id] = counts.get(card.id, 0) + 1
+    return counts
+
+
+def _counts_to_arrays(card_counts):
+    """Convert a {card_id: count} dictionary, pandas Series or iterable of (card_id, count) into id/count arrays."""
+    if isinstance(card_counts, pd.Series):
+        card_counts = card_counts.items()
+    elif isinstance(card_counts, dict):
+        card_counts = card_counts.items()
+    card_counts = list(card_counts)
+    card_ids = np.array([cid for cid, _ in card_counts], dtype=object)
+    counts = np.array([count for _, count in card_counts], dtype=np.int64)
+    return card_ids, counts
+
 
 class Deck:
     """Object representing a deck of cards in Eternal.
+
+    The deck is stored as card-id -> count arrays for the main deck and market which are resolved against a
+    CardCollection (eternal.card.ALL by default) when the deck is built: unknown card ids raise KeyError. The per-card
+    tables (main_data / market_data) and card lists (main_cards / market_cards) are only built when they are asked for.
     """
+    __slots__ = ('main_ids', 'main_counts', 'market_ids', 'market_counts',
+                 '_collection', '_main_positions', '_market_positions',
+                 '_main_cards', '_market_cards', '_main_data', '_market_data')
 
     def __init__(self, main, market=[]):
         """Deck object
@@ -13,15 +43,149 @@ class Deck:
             main: List of Cards in the main deck
             market: List of Cards in the market
         """
-        self.main_cards = main
-        self.main_data = pd.DataFrame(x.data for x in self.main_cards)
+        market = list(market) if market is not None else None
+        all_cards = list(main) + (market or [])
+        collections = set(id(card._collection) for card in all_cards)
+        if not all_cards:
+            collection = None
+        elif len(collections) == 1 and all_cards[0]._collection is not None:
+            collection = all_cards[0]._collection
+        else:
+            # Standalone cards (or a mix of collections): resolve against a private collection of just these cards
+            unique_cards = dict((card.id, card) for card in all_cards)
+            collection = eternal.card.CardCollection()
+            collection._set_data(pd.DataFrame([card.data for card in unique_cards.values()]))
+
+        self._init_counts(_card_counts(main), _card_counts(market) if market is not None else None, collection)
+        self._main_cards = list(main)
+        self._market_cards = market
+
+    @classmethod
+    def from_counts(cls, main, market=None, collection=None):
+        """Create a deck from card counts.
+
+        Args:
+            main: Main deck cards as a {card_id: count} dictionary, pandas Series or iterable of (card_id, count)
+            market: (optional) Market cards in the same format as main
+            collection: (optional) CardCollection to resolve card ids against (defaults to eternal.card.ALL)
+
+        Returns: Deck object
+        """
+        deck = cls.__new__(cls)
+        deck._init_counts(main, market, collection)
+        deck._main_cards = None
+        deck._market_cards = None
+        return deck
+
+    def copy(self):
+        """Shallow copy of the deck: it shares the card id / count arrays but builds its own tables and card lists.
+
+        Returns: Deck object
+        """
+        deck = type(self).__new__(type(self))
+        deck.main_ids, deck.main_counts = self.main_ids, self.main_counts
+        deck.market_ids, deck.market_counts = self.market_ids, self.market_counts
+        deck._collection = self._collection
+        deck._main_positions = self._main_positions
+        deck._market_positions = self._market_positions
+        deck._main_cards = list(self._main_cards) if self._main_cards is not None else None
+        deck._market_cards = list(self._market_cards) if self._market_cards is not None else None
+        deck._main_data = None
+        deck._market_data = None
+        return deck
 
+    def _init_counts(self, main, market, collection):
+        self.main_ids, self.main_counts = _counts_to_arrays(main)
         if market is not None:
-            self.market_cards = market
-            self.market_data = pd.DataFrame(x.data for x in self.market_cards)
+            self.market_ids, self.market_counts = _counts_to_arrays(market)
         else:
-            self.market_cards = None
-            self.market_data = None
+            self.market_ids, self.market_counts = None, None
+        self._collection = collection
+        self._main_positions = self._positions(self.main_ids)
+        self._market_positions = self._positions(self.market_ids) if self.market_ids is not None else None
+        self._main_data = None
+        self._market_data = None
+
+    @property
+    def collection(self):
+        """CardCollection the card ids of the deck are resolved against."""
+        if self._collection is None:
+            self._collection = eternal.card.ALL
+        return self._collection
+
+    def _positions(self, card_ids):
+        positions = self.collection.data.index.get_indexer(card_ids)
+        if (positions < 0).any():
+            raise KeyError(f"Unknown card ids: {list(card_ids[positions < 0])}")
+        return positions
+
+    @property
+    def main_positions(self):
+        """Row positions of the (unique) main deck cards in the card collection."""
+        if self._main_positions is None:
+            self._main_positions = self._positions(self.main_ids)
+        return self._main_positions
+
+    @property
+    def market_positions(self):
+        """Row positions of the (unique) market cards in the card collection (None without a market)."""
+        if self._market_positions is None and self.market_ids is not None:
+            self._market_positions = self._positions(self.market_ids)
+        return self._market_positions
+
+    def _main_column(self, column):
+        """Values of a card collection column for each (unique) main deck card."""
+        return self.collection.values(column)[self.main_positions]
+
+    @property
+    def main_cards(self):
+        """List of Cards in the main deck (one entry per copy)."""
+        if self._main_cards is None:
+            cards = self.collection.cards
+            self._main_cards = [cards[pos] for pos in np.repeat(self.main_positions, self.main_counts)]
+        return self._main_cards
+
+    @property
+    def market_cards(self):
+        """List of Cards in the market (one entry per copy) or None without a market."""
+        if self._market_cards is None and self.market_ids is not None:
+            cards = self.collection.cards
+            self._market_cards = [cards[pos] for pos in np.repeat(self.market_positions, self.market_counts)]
+        return self._market_cards
+
+    @property
+    def main_data(self):
+        """DataFrame with one row per card copy in the main deck (built on first access)."""
+        if self._main_data is None:
+            self._main_data = self.collection.data.iloc[np.repeat(self.main_positions, self.main_counts)]
+        return self._main_data
+
+    @property
+    def market_data(self):
+        """DataFrame with one row per card copy in the market (built on first access) or None without a market."""
+        if self._market_data is None and self.market_ids is not None:
+            self._market_data = self.collection.data.iloc[np.repeat(self.market_positions, self.market_counts)]
+        return self._market_data
+
+    def _faction_count_dict(self):
+        is_non_power = self._main_column('Type') != 'Power'
+        masks = self._main_column('FactionMask')[is_non_power]
+        counts = self.main_counts[is_non_power]
+        return dict((faction, int(counts[(masks & FACTION_BITS[faction]) != 0].sum())) for faction in FACTION_ORDER)
+
+    def faction_masks(self):
+        """Determine the faction of the deck as faction masks (see eternal.card.FACTION_BITS and faction()).
+
+        Returns: (main_mask, splash_mask) integers
+        """
+        MAIN_FACTION_COUNT = 6  # Adapted from 10 in constructed (to be confirmed), see faction()
+        main_mask, splash_mask = 0, 0
+        for faction, count in self._faction_count_dict().items():
+            if count >= MAIN_FACTION_COUNT:
+                main_mask |= FACTION_BITS[faction]
+            elif count > 0:
+                splash_mask |= FACTION_BITS[faction]
+        return main_mask, splash_mask
 
     def _faction_counts(self):
         """Get the count of non-power cards by faction.
@@ -29,11 +193,7 @@ class Deck:
 
         Returns: Dictionary with keys 'F','J','T','P','S' with values of the card-count
         """
-        non_power_influence = self.main_data[self.main_data.Type != 'Power'].Influence
-        faction_counts = pd.Series(index=list(FACTIONS), data=0)
-        for faction in FACTIONS:
-            faction_counts[faction] = non_power_influence.str.contains(faction).sum()
-        return faction_counts
+        return pd.Series(self._faction_count_dict())
 
     def faction(self):
         """Determine the faction of the deck based on main/market cards.
@@ -47,12 +207,11 @@ class Deck:
 
         Adapted for Draft (45 card deck) we use 6 as the cutoff.
 
-        Returns: (main_factions, splash_factions) - Lists containing 'F','J','T','P' and/or 'S'
+        Returns: (main_factions, splash_factions) - Lists containing 'F','J','P','S' and/or 'T' (in that order)
         """
-        MAIN_FACTION_COUNT = 6  # Adapted from 10 in constructed (to be confirmed)
-        faction_counts = self._faction_counts()
-        main_factions = faction_counts[faction_counts >= MAIN_FACTION_COUNT].index.tolist()
-        splash_factions = faction_counts[(faction_counts > 0) & (faction_counts < MAIN_FACTION_COUNT)].index.tolist()
+        main_mask, splash_mask = self.faction_masks()
+        main_factions = [faction for faction in FACTION_ORDER if main_mask & FACTION_BITS[faction]]
+        splash_factions = [faction for faction in FACTION_ORDER if splash_mask & FACTION_BITS[faction]]
         return (main_factions, splash_factions)
 
     def faction_string(self):
@@ -67,20 +226,31 @@ class Deck:
 
     def cards_splash(self):
         """Return list of most splashed cards."""
-        main_factions, splash_factions = self.faction()
-        splashed_set = set(splash_factions)
-        is_splash = lambda x: bool(splashed_set.intersection(x))
-        return [x for x in self.main_cards if is_splash(x.data['Influence'])]
+        _, splash_mask = self.faction_masks()
+        is_splash = (self._main_column('FactionMask') & splash_mask) != 0
+        cards = self.collection.cards
+        return [cards[pos] for pos in np.repeat(self.main_positions[is_splash], self.main_counts[is_splash])]
 
     def types(self):
         """Return unit-type breakdown of the maindeck
         Returns: Series with value-counts of card types.
         """
-        return self.main_data.Type.value_counts()
+        type_counts = {}
+        for card_type, count in zip(self._main_column('Type'), self.main_counts):
+            type_counts[card_type] = type_counts.get(card_type, 0) + int(count)
+        type_counts = sorted(type_counts.items(), key=lambda x: -x[1])
+        return pd.Series([count for _, count in type_counts], name='count', dtype='int64',
+                         index=pd.Index([card_type for card_type, _ in type_counts], name='Type'))
 
     def unit_stats(self):
         """Returns statics on units.
 
         Returns: Series with mean unit stats
         """
-        return self.main_data[self.main_data.Type == 'Unit'][['Attack', 'Health']].mean()
+        is_unit = self._main_column('Type') == 'Unit'
+        counts = self.main_counts[is_unit]
+        stats = {}
+        for column in ['Attack', 'Health']:
+            values = self._main_column(column)[is_unit].astype('float64')
+            stats[column] = (values * counts).sum() / counts.sum() if counts.sum() else np.nan
+        return pd.Series(stats)
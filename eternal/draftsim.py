@@ -0,0 +1,141 @@
+"""Monte Carlo simulation of draft packs (to check the analytic offer rates of eternal.format.DraftFormat).
+
+A 4-pack draft is PACKS_PER_DRAFT current set packs followed by PACKS_PER_DRAFT draft packs. Every pack has
+PACK_SLOTS cards: commons, uncommons and a rare slot which holds a legendary with probability LEGENDARY_RATE.
+Current set cards are drawn uniformly within their rarity and draft pack cards according to their boosting.
+Drafts are generated in batches of arrays and offer rates are estimated from the batch means (which also give
+their confidence intervals).
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+import eternal.card
+import eternal.format
+import eternal.parallel
+
+RARITY_OFFERS_PER_PACK = eternal.format.RARITY_OFFERS_PER_PACK
+PACKS_PER_DRAFT = eternal.format.PACKS_PER_DRAFT
+# Pack slots by rarity (the 'Rare' slot holds a rare or a legendary card)
+PACK_SLOTS = {'Common': int(RARITY_OFFERS_PER_PACK['Common']), 'Uncommon': int(RARITY_OFFERS_PER_PACK['Uncommon']),
+              'Rare': int(round(RARITY_OFFERS_PER_PACK['Rare'] + RARITY_OFFERS_PER_PACK['Legendary']))}
+LEGENDARY_RATE = RARITY_OFFERS_PER_PACK['Legendary'] / PACK_SLOTS['Rare']
+PACK_SIZE = sum(PACK_SLOTS.values())
+# Normal quantile of the 95% confidence intervals
+Z_95 = 1.959963984540054
+
+
+def _sample(pool, uniforms):
+    """Card positions drawn from a pool (positions, cumulative probabilities) for uniform random numbers."""
+    positions, cumulative = pool
+    return positions[np.minimum(np.searchsorted(cumulative, uniforms, side='right'), len(positions) - 1)]
+
+
+class PackSimulator:
+    """Seeded, vectorized generator of the drafts of a DraftFormat."""
+
+    def __init__(self, draft_format, collection=None):
+        """PackSimulator object
+
+        Args:
+            draft_format: eternal.format.DraftFormat (its set is the current set and its boosting the draft packs)
+            collection: (optional) CardCollection (defaults to eternal.card.ALL)
+        """
+        self.draft_format = draft_format
+        self.collection = collection if collection is not None else eternal.card.ALL
+        rarity = self.collection.values('Rarity')
+
+        boosted_positions = self.collection.data.index.get_indexer(list(draft_format.boosting))
+        assert (boosted_positions >= 0).all(), "Boosted card ids missing from the card collection"
+        boosting = np.zeros(len(rarity))
+        boosting[boosted_positions] = list(draft_format.boosting.values())
+        current_set = (self.collection.values('SetNumber') == draft_format.set).astype(float)
+
+        # (positions, cumulative probabilities) of the cards of each rarity for both kinds of packs
+        self.pools = {}
+        for source, weights in (('current_set', current_set), ('draft_pack', boosting)):
+            for rarity_name in ['Common', 'Uncommon', 'Rare', 'Legendary']:
+                positions = np.flatnonzero((rarity == rarity_name) & (weights > 0))
+                cumulative = np.cumsum(weights[positions])
+                self.pools[source, rarity_name] = (positions.astype(np.int32), cumulative / cumulative[-1] if len(positions) else cumulative)
+
+    def _packs(self, source, n_packs, rng):
+        """Card positions (n_packs x PACK_SIZE) of packs of a kind, -1 for slots of a rarity missing from the pool."""
+        packs = np.full((n_packs, PACK_SIZE), -1, dtype=np.int32)
+        slot = 0
+        for rarity_name, n_slots in PACK_SLOTS.items():
+            uniforms = rng.random((n_packs, n_slots))
+            if rarity_name == 'Rare':
+                is_legendary = rng.random((n_packs, n_slots)) < LEGENDARY_RATE
+                for name, selected in (('Rare', ~is_legendary), ('Legendary', is_legendary)):
+                    if len(self.pools[source, name][0]):
+                        packs[:, slot:slot + n_slots][selected] = _sample(self.pools[source, name], uniforms[selected])
+            elif len(self.pools[source, rarity_name][0]):
+                packs[:, slot:slot + n_slots] = _sample(self.pools[source, rarity_name], uniforms)
+            slot += n_slots
+        return packs
+
+    def drafts(self, n_drafts, rng):
+        """Generate drafts.
+
+        Args:
+            n_drafts: Number of drafts
+            rng: numpy.random.Generator
+
+        Returns: int32 array (n_drafts x 2 * PACKS_PER_DRAFT x PACK_SIZE) of card positions in the collection (current
+            set packs first, -1 for slots that can't be filled)
+        """
+        current_set = self._packs('current_set', n_drafts * PACKS_PER_DRAFT, rng).reshape(n_drafts, PACKS_PER_DRAFT, PACK_SIZE)
+        draft_pack = self._packs('draft_pack', n_drafts * PACKS_PER_DRAFT, rng).reshape(n_drafts, PACKS_PER_DRAFT, PACK_SIZE)
+        return np.concatenate([current_set, draft_pack], axis=1)
+
+    def offer_counts(self, n_drafts, rng):
+        """Number of times each card is offered over n_drafts drafts (int64 array in collection order)."""
+        positions = self.drafts(n_drafts, rng).ravel()
+        return np.bincount(positions[positions >= 0], minlength=len(self.collection.cards))
+
+    def offer_rates(self, n_drafts=1000000, batch_size=50000, seed=0, n_jobs=1):
+        """Estimate the offer rates (offers per draft) of every card by simulation.
+
+        Each batch of drafts gets its own random stream (spawned from seed) so the result only depends on seed,
+        n_drafts and batch_size, not on n_jobs.
+
+        Args:
+            n_drafts: Number of drafts (rounded up to whole batches)
+            batch_size: Number of drafts per batch
+            seed: Random seed
+            n_jobs: Number of processes simulating batches (None for all CPUs, see eternal.parallel)
+
+        Returns: DataFrame indexed by card id (cards that can be offered) with columns
+            OfferRate   - Mean number of offers per draft
+            StdErr      - Standard error of OfferRate (from the batch means)
+            Lower/Upper - 95% confidence interval
+            Analytic    - Offer rate of the analytic model (DraftFormat.offer_rates)
+            ZScore      - (OfferRate - Analytic) / StdErr
+        """
+        n_batches = max(-(-n_drafts // batch_size), 2)
+        seeds = np.random.SeedSequence(seed).spawn(n_batches)
+        shard_size = -(-n_batches // (eternal.parallel.cpu_count() if n_jobs is None else max(n_jobs, 1)))
+        batches = eternal.parallel.map_shards(functools.partial(_simulate_batches, simulator=self, batch_size=batch_size),
+                                              seeds, n_jobs=n_jobs, shard_size=shard_size)
+        batch_rates = np.concatenate(batches) / batch_size
+
+        offered = np.zeros(len(self.collection.cards), dtype=bool)
+        for positions, _ in self.pools.values():
+            offered[positions] = True
+        batch_rates = batch_rates[:, offered]
+        offer_rate = batch_rates.mean(axis=0)
+        std_err = batch_rates.std(axis=0, ddof=1) / np.sqrt(n_batches)
+        rates = pd.DataFrame({'OfferRate': offer_rate, 'StdErr': std_err,
+                              'Lower': offer_rate - Z_95 * std_err, 'Upper': offer_rate + Z_95 * std_err},
+                             index=self.collection.data.index[offered])
+        rates['Analytic'] = self.draft_format.offer_rates(self.collection)[rates.index]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates['ZScore'] = (rates['OfferRate'] - rates['Analytic']) / rates['StdErr']
+        return rates
+
+
+def _simulate_batches(offset, seeds, simulator, batch_size):
+    """Offer counts (n_batches x n_cards) of batches of drafts, one random stream per batch."""
+    return np.stack([simulator.offer_counts(batch_size, np.random.default_rng(seed)) for seed in seeds])
@@ -1,8 +1,15 @@
-
+import collections
+import functools
+import hashlib
+import threading
 import urllib.parse
 
+import numpy as np
+import pandas as pd
+
 import eternal.card
 import eternal.deck
+import eternal.parallel
 
 
 def parse_v2_cards(cardstring):
@@ -22,39 +29,97 @@ def parse_v2_cards(cardstring):
     Z = eternal_id: (B=1, C=2, ... Z --> a ... f  --> [  gX ... zX --> 0X ... 9X --> -X --> _X  ]  repeating with X == B, C, D etc.)
     """
     cards = []
+    for cid, count in decode_v2_cards(cardstring):
+        cards += [eternal.card.ALL[cid]] * count
+    return cards
+
+
+# Initialize the static lookup tables
+parse_v2_cards.CARD_COUNT_LOOKUP = dict([(x, i + 1) for i, x in enumerate('BCDEFGHIJKLMNOPQRSTUVWXYZ')])
+parse_v2_cards.SET_NUMBER_LOOKUP = dict([(x, i ) for i, x in enumerate('ABCDEFGHIJKLM')])
+parse_v2_cards.ETERNAL_ID_1CHAR_LOOKUP = dict([(x, i + 1) for i, x in enumerate('BCDEFGHIJKLMNOPQRSTUVWXYZabcdef')])
+parse_v2_cards.ETERNAIL_ID_2CHAR_REPEATING = 'ghijklmnopqrstuvwxyz0123456789-_'
+
+
+def decode_v2_cards(cardstring):
+    """Decode a v2 url encoded list of cards into card ids and counts (see parse_v2_cards for the format)
+
+    Args:
+        cardstring: Deckbuilder card string (multiple cards)
+
+    Returns: List of (card_id, count) tuples
+    """
+    count_lookup = parse_v2_cards.CARD_COUNT_LOOKUP
+    set_number_lookup = parse_v2_cards.SET_NUMBER_LOOKUP
+    eternal_id_lookup = parse_v2_cards.ETERNAL_ID_1CHAR_LOOKUP
+    eternal_id_repeating = parse_v2_cards.ETERNAIL_ID_2CHAR_REPEATING
+
+    card_counts = []
     ix_card = 0
     while ix_card <= (len(cardstring) - 3):
-        count = None
-        set_number = None
-        eternal_id = None
         x, y, z = cardstring[ix_card:(ix_card + 3)]
-        count = parse_v2_cards.CARD_COUNT_LOOKUP[x]
-        set_number = parse_v2_cards.SET_NUMBER_LOOKUP[y]
+        count = count_lookup[x]
+        set_number = set_number_lookup[y]
 
-        if z in parse_v2_cards.ETERNAL_ID_1CHAR_LOOKUP:
-            eternal_id = parse_v2_cards.ETERNAL_ID_1CHAR_LOOKUP[z]
+        if z in eternal_id_lookup:
+            eternal_id = eternal_id_lookup[z]
             ix_card += 3
         else:
             z_repeat = z
             z_multiply = cardstring[ix_card + 3]
-            eternal_id = parse_v2_cards.ETERNAIL_ID_2CHAR_REPEATING.index(z_repeat) \
-                         + len(parse_v2_cards.ETERNAIL_ID_2CHAR_REPEATING) * (ord(z_multiply) - ord('B')) \
-                         + len(parse_v2_cards.ETERNAL_ID_1CHAR_LOOKUP) + 1
+            eternal_id = eternal_id_repeating.index(z_repeat) \
+                         + len(eternal_id_repeating) * (ord(z_multiply) - ord('B')) \
+                         + len(eternal_id_lookup) + 1
             ix_card += 4
-        cid = f"{set_number}-{eternal_id}"
-        cards += [eternal.card.ALL[cid]] * int(count)
-    return cards
+        card_counts.append((f"{set_number}-{eternal_id}", count))
+    return card_counts
 
 
-# Initialize the static lookup tables
-parse_v2_cards.CARD_COUNT_LOOKUP = dict([(x, i + 1) for i, x in enumerate('BCDEFGHIJKLMNOPQRSTUVWXYZ')])
-parse_v2_cards.SET_NUMBER_LOOKUP = dict([(x, i ) for i, x in enumerate('ABCDEFGHIJKLM')])
-parse_v2_cards.ETERNAL_ID_1CHAR_LOOKUP = dict([(x, i + 1) for i, x in enumerate('BCDEFGHIJKLMNOPQRSTUVWXYZabcdef')])
-parse_v2_cards.ETERNAIL_ID_2CHAR_REPEATING = 'ghijklmnopqrstuvwxyz0123456789-_'
+def decode_v1_cards(cardstring):
+    """Decode a v1 url encoded list of cards into card ids and counts
+
+    Args:
+        cardstring: Deckbuilder card string (multiple cards) e.g. 11-4:1;1-408:1;
+
+    Returns: List of (card_id, count) tuples
+    """
+    card_counts = []
+    for id_count in cardstring.split(';')[:-1]:
+        cid, count = id_count.split(':')
+        card_counts.append((cid, int(count)))
+    return card_counts
+
+
+def split_deckbuilder_url(url):
+    """Split a deck-builder URL into its main and market card strings
+
+    Args:
+        url: Eternal warcry deckbuilder URL
+
+    Returns: (main, market) card strings, market is None for decks without a market
+    """
+    main_deck = urllib.parse.urlsplit(url).query.split('main=')[1]
+    market = None
+    if '&market=' in main_deck:
+        main_deck, market = main_deck.split('&market=')
+    return main_deck, market
+
+
+def decode_deckbuilder_url(url):
+    """Decode a deck-builder URL (supports both v1 and v2 urls) into card ids and counts
+
+    Args:
+        url: Eternal warcry deckbuilder URL
+
+    Returns: (main, market) lists of (card_id, count) tuples, market is None for decks without a market
+    """
+    main_deck, market = split_deckbuilder_url(url)
+    decode_cards = decode_v1_cards if ':' in main_deck else decode_v2_cards
+    return decode_cards(main_deck), (decode_cards(market) if market is not None else None)
 
 
 def parse_deckbuilder_url_v2(url):
-    """Parse a deck-builder v2 URL 
+    """Parse a deck-builder v2 URL
 
     This format was updated in November 2021 was used starting with the Set 12 7-win sheet.
 
@@ -63,22 +128,17 @@ def parse_deckbuilder_url_v2(url):
 
     Returns: Deck object
     """
-    market = None
-    main_deck = None
-
-    parsed_url = urllib.parse.urlparse(url)
-    main_deck = parsed_url.query.split('main=')[1]
-    market_cards = None
-    if 'market' in main_deck:
-        main_deck, market = main_deck.split('&market=')
-        market_cards = parse_v2_cards(market)
+    main_deck, market = split_deckbuilder_url(url)
+    market_counts = None
+    if market is not None:
+        market_counts = decode_v2_cards(market)
 
-    main_cards = parse_v2_cards(main_deck)
-    return eternal.deck.Deck(main_cards, market=market_cards)
+    main_counts = decode_v2_cards(main_deck)
+    return eternal.deck.Deck.from_counts(main_counts, market=market_counts)
 
 
 def parse_deckbuilder_url_v1(url):
-    """Parse a deck-builder v1 URL 
+    """Parse a deck-builder v1 URL
 
     This format existed prior to change in November 2021 and was last used for the Set 11 7-win sheets.
     These URLs are simple as the card-ids are right in the URL and can be used directly
@@ -88,40 +148,364 @@ def parse_deckbuilder_url_v1(url):
 
     Returns: Deck object
     """
-    market = None
-    main_deck = None
-
-    parsed_url = urllib.parse.urlparse(url)
-    main_deck = parsed_url.query.split('main=')[1]
-    market_cards = None
-    if 'market' in main_deck:
-        main_deck, market = main_deck.split('&market=')
-        market_card_id_counts = market.split(';')[:-1]
-        market_cards = []
-        for id_count in market_card_id_counts:
-            cid, count = id_count.split(':')
-            market_cards += [eternal.card.ALL[cid]] * int(count)
-
-    main_card_id_counts = main_deck.split(';')[:-1]
-    main_cards = []
-    for id_count in main_card_id_counts:
-        cid, count = id_count.split(':')
-        main_cards += [eternal.card.ALL[cid]] * int(count)
+    main_deck, market = split_deckbuilder_url(url)
+    market_counts = None
+    if market is not None:
+        market_counts = decode_v1_cards(market)
 
-    return eternal.deck.Deck(main_cards, market=market_cards)
+    main_counts = decode_v1_cards(main_deck)
+    return eternal.deck.Deck.from_counts(main_counts, market=market_counts)
 
 
-def parse_deckbuilder_url(url):
+def parse_deckbuilder_url(url, cache=None):
     """Parse a deck-builder URL (supports both v1 and v2 urls)
 
     Args:
         url: Eternal warcry deckbuilder URL
+        cache: (optional) DeckCache to get the deck from (see DeckCache)
 
     Returns: Deck object
     """
-    parsed_url = urllib.parse.urlparse(url)
-    main_deck = parsed_url.query.split('main=')[1]
+    if cache is not None:
+        return cache.parse(url)
+    main_deck, market = split_deckbuilder_url(url)
     if ':' in main_deck:
         return parse_deckbuilder_url_v1(url)
     else:
-        return parse_deckbuilder_url_v2(url)
\ No newline at end of file
+        return parse_deckbuilder_url_v2(url)
+
+
+DECKBUILDER_URL = 'https://eternalwarcry.com/deck-builder'
+# Hex digits of deck_hash
+DECK_HASH_SIZE = 16
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _v2_card_code(card_id, count):
+    """v2 code of a single (card_id, count) entry (see parse_v2_cards for the format)."""
+    count_chars = encode_v2_cards.COUNT_CHARS
+    set_chars = encode_v2_cards.SET_NUMBER_CHARS
+    id_chars = encode_v2_cards.ETERNAL_ID_1CHAR_CHARS
+    repeating = parse_v2_cards.ETERNAIL_ID_2CHAR_REPEATING
+
+    multiply_chars = encode_v2_cards.MULTIPLY_CHARS
+
+    set_number, eternal_id = (int(x) for x in card_id.split('-'))
+    max_eternal_id = len(id_chars) + len(repeating) * len(multiply_chars)
+    if not 0 <= set_number < len(set_chars) or not 1 <= eternal_id <= max_eternal_id or \
+            not 1 <= count <= len(count_chars):
+        raise ValueError(f"Card {card_id} x{count} can't be encoded in a v2 deck-builder string")
+    if eternal_id <= len(id_chars):
+        return count_chars[count - 1] + set_chars[set_number] + id_chars[eternal_id - 1]
+    multiply, repeat = divmod(eternal_id - len(id_chars) - 1, len(repeating))
+    return count_chars[count - 1] + set_chars[set_number] + repeating[repeat] + multiply_chars[multiply]
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _card_id_order(card_id):
+    """Sort key (set number, eternal id) of a card id."""
+    return tuple(int(x) for x in card_id.split('-'))
+
+
+def canonical_counts(card_counts):
+    """Merge card counts into their canonical order.
+
+    Args:
+        card_counts: {card_id: count} dictionary, pandas Series or iterable of (card_id, count) (repeated card ids
+                     are added up)
+
+    Returns: List of (card_id, count) sorted by (set number, eternal id), without cards of count 0
+    """
+    if isinstance(card_counts, (dict, pd.Series)):
+        card_counts = card_counts.items()
+    totals = {}
+    for cid, count in card_counts:
+        totals[cid] = totals.get(cid, 0) + int(count)
+    if any(count < 0 for count in totals.values()):
+        raise ValueError("Card counts can't be negative")
+    return sorted(((cid, count) for cid, count in totals.items() if count),
+                  key=lambda cid_count: _card_id_order(cid_count[0]))
+
+
+def encode_v2_cards(card_counts):
+    """Encode card counts into a canonical v2 deck-builder card string (the inverse of decode_v2_cards).
+
+    The same cards always give the same string, whatever their order or how they are split: cards are sorted by
+    (set number, eternal id) and counts of the same card added up. Counts above the largest v2 count (25) are
+    split over several entries.
+
+    Args:
+        card_counts: {card_id: count} dictionary, pandas Series or iterable of (card_id, count)
+
+    Returns: v2 card string
+    """
+    max_count = len(encode_v2_cards.COUNT_CHARS)
+    codes = []
+    for cid, count in canonical_counts(card_counts):
+        while count > 0:
+            codes.append(_v2_card_code(cid, min(count, max_count)))
+            count -= max_count
+    return ''.join(codes)
+
+
+# Initialize the static lookup tables (inverse of the parse_v2_cards tables)
+encode_v2_cards.COUNT_CHARS = 'BCDEFGHIJKLMNOPQRSTUVWXYZ'
+encode_v2_cards.SET_NUMBER_CHARS = 'ABCDEFGHIJKLM'
+encode_v2_cards.ETERNAL_ID_1CHAR_CHARS = 'BCDEFGHIJKLMNOPQRSTUVWXYZabcdef'
+# Second character of 2-char eternal ids (B=0, C=1, ...), after Z decode_v2_cards would read non-alphabet characters
+encode_v2_cards.MULTIPLY_CHARS = 'BCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def encode_v1_cards(card_counts):
+    """Encode card counts into a canonical v1 deck-builder card string (the inverse of decode_v1_cards).
+
+    Args:
+        card_counts: {card_id: count} dictionary, pandas Series or iterable of (card_id, count)
+
+    Returns: v1 card string e.g. 1-408:1;11-4:1;
+    """
+    return ''.join(f'{cid}:{count};' for cid, count in canonical_counts(card_counts))
+
+
+def _deck_counts(deck):
+    """(main, market) card counts of a Deck, deck-builder URL or (main, market) pair of card counts."""
+    if isinstance(deck, str):
+        return decode_deckbuilder_url(deck)
+    if isinstance(deck, eternal.deck.Deck):
+        market = zip(deck.market_ids, deck.market_counts) if deck.market_ids is not None else None
+        return zip(deck.main_ids, deck.main_counts), market
+    main, market = deck
+    return main, market
+
+
+def _canonical_deck(deck):
+    """(main, market) tuples of the (card_id, count) pairs of a deck in canonical order (see canonical_counts), the
+    market is empty for decks without one. Unlike deck_key this covers every card id, encodable in v2 or not."""
+    main, market = _deck_counts(deck)
+    return tuple(canonical_counts(main)), tuple(canonical_counts(market) if market is not None else ())
+
+
+def deck_key(deck):
+    """Canonical v2 deck-builder query of a deck, identical for every encoding of the same deck.
+
+    Args:
+        deck: Deck, deck-builder URL (v1 or v2) or (main, market) pair of card counts (market may be None)
+
+    Returns: String 'main=<v2 cards>' followed by '&market=<v2 cards>' for decks with a (non-empty) market (a
+             ValueError is raised for cards v2 can't encode, see deck_hash for a key of any deck)
+    """
+    main, market = _deck_counts(deck)
+    key = 'main=' + encode_v2_cards(main)
+    market = encode_v2_cards(market) if market is not None else ''
+    return key + '&market=' + market if market else key
+
+
+def deck_url(deck):
+    """Canonical v2 deck-builder URL of a deck (see deck_key)."""
+    return f"{DECKBUILDER_URL}?{deck_key(deck)}"
+
+
+def deck_hash(deck):
+    """Fixed width hash (DECK_HASH_SIZE hex digits) of the canonical card counts of a deck.
+
+    Identical for every encoding of the same deck, like deck_key, but defined for every card id (campaign cards and
+    sets v2 can't encode included): it hashes the canonical v1 card strings of the main deck and market.
+    """
+    main, market = _canonical_deck(deck)
+    key = 'main=' + encode_v1_cards(main) + ('&market=' + encode_v1_cards(market) if market else '')
+    return hashlib.blake2b(key.encode('ascii'), digest_size=DECK_HASH_SIZE // 2).hexdigest()
+
+
+def deck_hashes(urls):
+    """Hash many deck-builder URLs (e.g. to find duplicate decks in a corpus).
+
+    Args:
+        urls: Iterable of deck-builder URLs. For a pandas Series its index is kept.
+
+    Returns: Series of deck hashes (None for URLs that can't be decoded)
+    """
+    index = urls.index if isinstance(urls, pd.Series) else None
+    hashes = []
+    for url in urls:
+        try:
+            hashes.append(deck_hash(url))
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            hashes.append(None)
+    return pd.Series(hashes, index=index, dtype=object)
+
+
+# Default number of decks kept by a DeckCache
+DECK_CACHE_SIZE = 4096
+
+DeckCacheInfo = collections.namedtuple('DeckCacheInfo', ['hits', 'misses', 'evictions', 'invalidations',
+                                                         'maxsize', 'currsize'])
+
+
+class DeckCache:
+    """Bounded, thread-safe LRU cache of parsed decks keyed by their canonical (card_id, count) pairs.
+
+    The same deck under different URLs (v1 / v2, any card order) is a single entry. Decks are built in canonical
+    card order and every parse returns a copy of the cached deck (see Deck.copy): the copies share its read-only card
+    id / count arrays but build their own tables (main_data etc.), so they can be modified freely.
+
+    Decks are resolved against the cache's collection. When that collection reloads (its data table is replaced)
+    the cache empties itself on the next access; call invalidate() after reloading eternal.card.ALL when the cache
+    has no collection of its own.
+    """
+
+    def __init__(self, maxsize=DECK_CACHE_SIZE, collection=None):
+        """DeckCache object
+
+        Args:
+            maxsize: Maximum number of decks kept (least recently used decks are evicted first)
+            collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+        """
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.collection = collection
+        self._decks = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._data = collection.data if collection is not None else None
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _check_collection(self):
+        """Drop every deck if the collection was reloaded since they were built (call with the lock held)."""
+        if self.collection is not None and self.collection.data is not self._data:
+            self._decks.clear()
+            self._data = self.collection.data
+            self.invalidations += 1
+
+    def parse(self, url):
+        """Parse a deck-builder URL, reusing the cached deck of the same cards if there is one.
+
+        Args:
+            url: Eternal warcry deckbuilder URL (v1 or v2)
+
+        Returns: Deck object (a copy sharing the cached deck's read-only card arrays)
+        """
+        key = _canonical_deck(decode_deckbuilder_url(url))
+        with self._lock:
+            self._check_collection()
+            deck = self._decks.get(key)
+            if deck is not None:
+                self._decks.move_to_end(key)
+                self.hits += 1
+                return deck.copy()
+            self.misses += 1
+
+        main, market = key
+        deck = eternal.deck.Deck.from_counts(main, market=market or None, collection=self.collection)
+        for array in (deck.main_ids, deck.main_counts, deck.market_ids, deck.market_counts):
+            if array is not None:
+                array.flags.writeable = False
+
+        with self._lock:
+            deck = self._decks.setdefault(key, deck)  # Another thread may have built it meanwhile
+            self._decks.move_to_end(key)
+            while len(self._decks) > self.maxsize:
+                self._decks.popitem(last=False)
+                self.evictions += 1
+        return deck.copy()
+
+    def invalidate(self):
+        """Drop every cached deck (e.g. after the card collection was reloaded), keeping the counters."""
+        with self._lock:
+            self._decks.clear()
+            self._data = self.collection.data if self.collection is not None else None
+            self.invalidations += 1
+
+    def cache_info(self):
+        """Counters of the cache (as a DeckCacheInfo named tuple, like functools.lru_cache)."""
+        with self._lock:
+            return DeckCacheInfo(self.hits, self.misses, self.evictions, self.invalidations, self.maxsize,
+                                 len(self._decks))
+
+    def __len__(self):
+        return len(self._decks)
+
+
+ZONES = ['main', 'market']
+DECK_TABLE_COLUMNS = ['Deck', 'CardId', 'Count', 'Zone', 'Error']
+
+
+def _decode_url_shard(offset, urls):
+    """Decode a shard of deck-builder URLs into compact arrays (see parse_deckbuilder_urls).
+
+    Returns: Tuple of (deck positions, card id codes, card ids, counts, zone codes, {deck position: error})
+    """
+    decks, card_ids, counts, zones, errors = [], [], [], [], {}
+    for ix_deck, url in enumerate(urls, offset):
+        try:
+            main, market = decode_deckbuilder_url(url)
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+            decks.append(ix_deck)
+            card_ids.append(None)
+            counts.append(0)
+            zones.append(-1)
+            errors[ix_deck] = f"Unable to decode {url!r}: {type(e).__name__}: {e}"
+            continue
+        for ix_zone, card_counts in enumerate((main, market or [])):
+            for cid, count in card_counts:
+                decks.append(ix_deck)
+                card_ids.append(cid)
+                counts.append(count)
+                zones.append(ix_zone)
+    codes, uniques = pd.factorize(pd.Series(card_ids, dtype=object))
+    return (np.array(decks, dtype=np.int64), codes.astype(np.int32), list(uniques),
+            np.array(counts, dtype=np.int64), np.array(zones, dtype=np.int8), errors)
+
+
+def parse_deckbuilder_urls(urls, collection=None, n_jobs=1, shard_size=eternal.parallel.SHARD_SIZE):
+    """Decode many deck-builder URLs (v1 and/or v2) into a single long-form table.
+
+    No per-deck objects are created. Decks that can't be decoded get a single row with the reason in 'Error'
+    (and no card) instead of raising.
+
+    Args:
+        urls: Iterable of Eternal warcry deckbuilder URLs. For a pandas Series its index labels are used for 'Deck'.
+        collection: (optional) CardCollection used to flag decks with unknown card ids as errors
+        n_jobs: Number of processes decoding shards of the URLs (None for all CPUs, see eternal.parallel). The
+                table is the same whatever the number of processes.
+        shard_size: Number of URLs per shard
+
+    Returns: DataFrame with one row per (deck, card, zone) and columns
+        Deck    - Position of the URL in urls (or its index label for a Series)
+        CardId  - Card id e.g. '11-4' (categorical)
+        Count   - Number of copies of the card in the zone
+        Zone    - 'main' or 'market' (categorical)
+        Error   - None or the reason the deck couldn't be decoded
+    """
+    labels = urls.index if isinstance(urls, pd.Series) else None
+    results = eternal.parallel.map_shards(_decode_url_shard, urls, n_jobs=n_jobs, shard_size=shard_size)
+    decks, card_ids, counts, zones, errors = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=object)], \
+        [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int8)], {}
+    for shard_decks, shard_codes, shard_ids, shard_counts, shard_zones, shard_errors in results:
+        decks.append(shard_decks)
+        card_ids.append(np.append(np.array(shard_ids, dtype=object), None)[shard_codes])  # Code -1 -> None
+        counts.append(shard_counts)
+        zones.append(shard_zones)
+        errors.update(shard_errors)
+    decks, zones = np.concatenate(decks), np.concatenate(zones)
+    error_values = np.full(len(decks), None, dtype=object)
+    error_values[zones < 0] = [errors[ix_deck] for ix_deck in decks[zones < 0]]
+
+    table = pd.DataFrame({'Deck': decks,
+                          'CardId': pd.Categorical(np.concatenate(card_ids)),
+                          'Count': np.concatenate(counts),
+                          'Zone': pd.Categorical.from_codes(zones, categories=ZONES),
+                          'Error': pd.Series(error_values, dtype=object)})
+
+    if collection is not None:
+        is_unknown = table['CardId'].notna() & ~table['CardId'].isin(collection.data.index)
+        if is_unknown.any():
+            unknown = table.loc[is_unknown, 'CardId'].astype(str).groupby(table.loc[is_unknown, 'Deck']).agg(', '.join)
+            error_rows = pd.DataFrame({'Deck': unknown.index.values, 'CardId': None, 'Count': 0,
+                                       'Zone': pd.Categorical([None] * len(unknown), categories=ZONES),
+                                       'Error': ('Unknown card ids: ' + unknown).values})
+            table = pd.concat([table[~table['Deck'].isin(unknown.index)], error_rows])
+            table['CardId'] = table['CardId'].astype('category')
+            table = table.sort_values('Deck', kind='stable').reset_index(drop=True)
+
+    if labels is not None:
+        table['Deck'] = labels[table['Deck'].values]
+    return table
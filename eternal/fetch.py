@@ -0,0 +1,165 @@
+"""Concurrent HTTP fetching with an on-disk cache (for the scrapers of eternal.format).
+
+Pages are fetched with asyncio (urllib requests run in worker threads, at most `concurrency` at a time), failed
+requests are retried with exponential backoff and responses are stored on disk with their ETag / Last-Modified
+headers. Cached pages are revalidated with conditional requests (a 304 reply serves the cached body) and in
+offline mode only the cache is used. Nothing is cached on disk unless a cache directory (e.g. CACHE_DIR) is given.
+
+The blocking get / get_all also work from inside a running event loop (e.g. a Jupyter notebook), where they run
+the fetch in a worker thread with its own loop.
+"""
+import asyncio
+import concurrent.futures
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import urllib.error
+import urllib.request
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'eternal', 'http')
+USER_AGENT = 'eternal-fetch/1.0'
+# HTTP status codes worth retrying (besides connection errors)
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class HTTPCache:
+    """On-disk cache of HTTP responses: <sha256 of the url>.body with the url and validators in <sha256>.json."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, url, extension):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + extension)
+
+    def get(self, url):
+        """Cached response of a url.
+
+        Returns: (body bytes, metadata dictionary with url, etag, last_modified and fetched) or None
+        """
+        try:
+            with open(self._path(url, '.json')) as fin:
+                meta = json.load(fin)
+            with open(self._path(url, '.body'), 'rb') as fin:
+                body = fin.read()
+        except (OSError, ValueError):
+            return None
+        return body, meta
+
+    def put(self, url, body, headers):
+        """Store a response (body first, then its metadata, each written atomically)."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta = {'url': url, 'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified'),
+                'fetched': email.utils.formatdate(usegmt=True)}
+        for extension, data in (('.body', body), ('.json', json.dumps(meta).encode('utf-8'))):
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as fout:
+                fout.write(data)
+            os.replace(tmp_path, self._path(url, extension))
+        return meta
+
+
+class Fetcher:
+    """Bulk page fetcher with bounded concurrency, retries and an HTTP cache."""
+
+    def __init__(self, cache_dir=None, concurrency=4, retries=3, backoff=0.5, timeout=30, offline=False,
+                 revalidate=True):
+        """Fetcher object
+
+        Args:
+            cache_dir: (optional) Directory of the HTTP cache e.g. CACHE_DIR (no caching by default)
+            concurrency: Maximum number of requests in flight
+            retries: Number of retries of a failing request (connection errors, timeouts and RETRY_STATUS)
+            backoff: Delay (seconds) before the first retry, doubled for every following retry
+            timeout: Timeout (seconds) of each request
+            offline: Only serve pages from the cache (KeyError for pages that aren't cached)
+            revalidate: Check cached pages with a conditional request (otherwise cached pages are served as is)
+        """
+        self.cache = HTTPCache(cache_dir) if cache_dir is not None else None
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.offline = offline
+        self.revalidate = revalidate
+
+    def _request(self, url, cached):
+        """Blocking request (with conditional headers for a cached page).
+
+        Returns: (status, body, headers) with status 304 and the cached body when the page didn't change
+        """
+        request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+        if cached is not None:
+            if cached[1].get('etag'):
+                request.add_header('If-None-Match', cached[1]['etag'])
+            if cached[1].get('last_modified'):
+                request.add_header('If-Modified-Since', cached[1]['last_modified'])
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and cached is not None:
+                return 304, cached[0], e.headers
+            raise
+
+    async def fetch(self, url, semaphore=None):
+        """Fetch a page (from the cache when possible).
+
+        Args:
+            url: URL of the page
+            semaphore: (optional) asyncio.Semaphore bounding the requests in flight
+
+        Returns: Body of the page (bytes)
+        """
+        cached = self.cache.get(url) if self.cache is not None else None
+        if self.offline:
+            if cached is None:
+                raise KeyError(f"{url} is not in the HTTP cache (offline)")
+            return cached[0]
+        if cached is not None and not self.revalidate:
+            return cached[0]
+
+        semaphore = semaphore or asyncio.Semaphore(self.concurrency)
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    status, body, headers = await asyncio.to_thread(self._request, url, cached)
+                break
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                is_retryable = not isinstance(e, urllib.error.HTTPError) or e.code in RETRY_STATUS
+                if not is_retryable or attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logging.warning(f"Fetching {url} failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        if self.cache is not None and status != 304:
+            self.cache.put(url, body, headers)
+        return body
+
+    async def fetch_all(self, urls):
+        """Fetch many pages concurrently (at most self.concurrency requests at a time).
+
+        Returns: List of page bodies (bytes) in the order of urls
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*[self.fetch(url, semaphore) for url in urls])
+
+    def get(self, url):
+        """Blocking version of fetch."""
+        return _run(self.fetch(url))
+
+    def get_all(self, urls):
+        """Blocking version of fetch_all."""
+        return _run(self.fetch_all(list(urls)))
+
+
+def _run(coroutine):
+    """Run a coroutine to completion, in a worker thread when this thread already runs an event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
@@ -1,12 +1,25 @@
+import codecs
+import html.parser
 import json
 import os
 import re
 import glob
+import weakref
 
-from bs4 import BeautifulSoup
-from urllib.request import urlopen
+import numpy as np
+import pandas as pd
+import scipy.sparse
 
 import eternal.card
+import eternal.corpus
+import eternal.fetch
+
+# Expected number of cards of each rarity in a pack
+RARITY_OFFERS_PER_PACK = {'Common': 8.0, 'Uncommon': 3.0, 'Rare': 0.905, 'Legendary': 0.095}
+# Packs of each kind (current set / draft pack) in a 4-pack draft
+PACKS_PER_DRAFT = 2
+# Offer rate assumed for cards outside a format's packs when matching decks (see DraftFormatMatcher.match)
+UNOFFERED_RATE = 1e-4
 
 
 def text2int(textnum, numwords={}):
@@ -43,77 +56,332 @@ def text2int(textnum, numwords={}):
     return result + current
 
 
-def scrape_dwd_draft_pack_boosted_rates(url='https://www.direwolfdigital.com/news/draft-packs-card-list/'):
-    """Scrape the web for Draft Pack boosted rates
+def _find_card_ids(names, collection=None, duplicates='raise'):
+    """Card ids of scraped card names (see eternal.card.CardCollection.lookup_names), KeyError for unknown names."""
+    collection = collection if collection is not None else eternal.card.ALL
+    card_ids = collection.lookup_names(names, duplicates=duplicates)
+    if card_ids.isna().any():
+        raise KeyError(f"Unknown card names: {list(card_ids.index[card_ids.isna()])}")
+    return list(card_ids)
+
+
+# Number of characters fed to the streaming HTML extractors at a time
+HTML_CHUNK_SIZE = 1 << 16
+RE_BOOSTED_RATE = re.compile('This card appears in draft packs')
+DWD_TABLE_HEADINGS = [['Name', 'Type', 'Subtype', 'Cost', 'Influence', 'Rarity'],
+                      ['Name', 'Type', 'Subtype', 'Cost', 'Influence', 'Weighted Rarity']]
+
+
+def html_chunks(source, chunk_size=HTML_CHUNK_SIZE):
+    """Split an HTML source into text chunks.
 
     Args:
-        url: url to the DWD draft pack boost rate table
+        source: HTML str or bytes (UTF-8), file object (text or binary) or iterable of str chunks
+        chunk_size: Number of characters (bytes for binary files) per chunk
 
-    Returns: Cards lookup dictionary (keyed on card.id) with boosted rates attached
+    Returns: Generator of str chunks
+    """
+    if isinstance(source, bytes):
+        source = source.decode('utf-8')
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    elif hasattr(source, 'read'):
+        decoder = codecs.getincrementaldecoder('utf-8')()  # For binary files (characters split across chunks)
+        for chunk in iter(lambda: source.read(chunk_size), source.read(0)):
+            yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        yield decoder.decode(b'', final=True)
+    else:
+        yield from source
+
+
+class StreamingExtractor(html.parser.HTMLParser):
+    """Base class of the event driven HTML extractors.
+
+    Subclasses handle tags and whole text nodes (handle_text, text split across chunks is joined back together)
+    and append what they find to self.events which extract() yields as the page is read.
     """
 
-    page = urlopen(url)
-    html = page.read().decode("utf-8")
-    soup = BeautifulSoup(html, "html.parser")
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events = []
+        self._text = []
+
+    def extract(self, source):
+        """Generator of the events of a page (see html_chunks for the sources)."""
+        for chunk in html_chunks(source):
+            self.feed(chunk)
+            yield from self.events
+            self.events.clear()
+        self.close()
+        self._flush()
+        yield from self.events
+        self.events.clear()
+
+    def _flush(self):
+        if self._text:
+            text = ''.join(self._text)
+            self._text = []
+            self.handle_text(text)
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        self.start_tag(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self._flush()
+        self.end_tag(tag)
+
+    def handle_comment(self, data):
+        self._flush()
+        self.comment(data)
+
+    def handle_decl(self, decl):
+        self._flush()
 
-    # Get the boosting rates
-    boosted_rates = soup(text=re.compile('This card appears in draft packs'))
+    def handle_text(self, text):
+        pass
+
+    def start_tag(self, tag, attrs):
+        pass
+
+    def end_tag(self, tag):
+        pass
+
+    def comment(self, text):
+        pass
+
+
+class FandomBoostingExtractor(StreamingExtractor):
+    """Extract the (name, boosting) pairs of a Fandom Draft_Packs module page (consecutive strings in
+    <span class="s2"> tags)."""
+
+    def __init__(self):
+        super().__init__()
+        self._depth = 0  # Depth of the span tags inside a string span (0 outside)
+        self._span_text = []
+        self._name = None
+
+    def start_tag(self, tag, attrs):
+        if tag == 'span':
+            if self._depth:
+                self._depth += 1
+            elif 's2' in (attrs.get('class') or '').split():
+                self._depth = 1
+
+    def end_tag(self, tag):
+        if tag == 'span' and self._depth:
+            self._depth -= 1
+            if not self._depth:
+                text = ''.join(self._span_text).replace('"', '').strip()
+                self._span_text = []
+                if self._name is None:
+                    self._name = text
+                else:
+                    self.events.append((self._name, int(text)))
+                    self._name = None
+
+    def handle_text(self, text):
+        if self._depth:
+            self._span_text.append(text)
+
+
+class DwdBoostingExtractor(StreamingExtractor):
+    """Extract the boosting footnotes and card table rows of the DWD draft pack card list page.
+
+    Events:
+        ('rate', text)              - Text node (or comment) of a boosting footnote (matching RE_BOOSTED_RATE)
+        ('row', name, rarity)       - Row of the first <tbody> of a table with a <thead>
+        ('table', headings)         - End of a table with a <thead> (headings of its <th> cells)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._tables = []
+
+    def start_tag(self, tag, attrs):
+        if tag == 'table':
+            self._tables.append({'thead': False, 'headings': [], 'tbody': 'before', 'rows': [], 'row': None, 'cell': None})
+        elif self._tables:
+            table = self._tables[-1]
+            if tag == 'thead':
+                table['thead'] = True
+            elif tag == 'tbody' and table['tbody'] == 'before':
+                table['tbody'] = 'in'
+            elif tag == 'tr' and table['tbody'] == 'in':
+                table['row'] = []
+            elif tag == 'th' or (tag == 'td' and table['row'] is not None):
+                table['cell'] = []
+
+    def end_tag(self, tag):
+        if not self._tables:
+            return
+        table = self._tables[-1]
+        if tag == 'th' and table['cell'] is not None:
+            table['headings'].append(''.join(table['cell']).strip())
+            table['cell'] = None
+        elif tag == 'td' and table['cell'] is not None:
+            table['row'].append(''.join(table['cell']).strip())
+            table['cell'] = None
+        elif tag == 'tr' and table['row'] is not None:
+            table['rows'].append(table['row'])  # Raw cells until we know whether the table has a <thead>
+            table['row'] = None
+            if table['thead']:
+                self._flush_rows(table)
+        elif tag == 'tbody' and table['tbody'] == 'in':
+            table['tbody'] = 'done'
+        elif tag == 'table':
+            self._tables.pop()
+            if table['thead']:
+                self._flush_rows(table)
+                self.events.append(('table', table['headings']))
+
+    def _flush_rows(self, table):
+        """Emit the buffered rows of a table with a <thead> (skipping rows shorter than its heading row)."""
+        n_cells = max(len(table['headings']), 6)
+        self.events.extend(('row', cells[0], cells[5]) for cells in table['rows'] if len(cells) >= n_cells)
+        table['rows'] = []
+
+    def comment(self, text):
+        if RE_BOOSTED_RATE.search(text):
+            self.events.append(('rate', text))
+
+    def handle_text(self, text):
+        if RE_BOOSTED_RATE.search(text):
+            self.events.append(('rate', text))
+        if self._tables and self._tables[-1]['cell'] is not None:
+            self._tables[-1]['cell'].append(text)
+
+
+def parse_dwd_draft_pack_boosted_rates(html, collection=None, duplicates='raise'):
+    """Extract the Draft Pack boosted rates from the DWD draft pack card list page
+
+    Args:
+        html: HTML of the page (str, bytes, file object or iterable of chunks, see html_chunks)
+        collection: (optional) CardCollection to find the cards in (defaults to eternal.card.ALL)
+        duplicates: How to resolve names of reprinted cards (see eternal.card.CardCollection.lookup_names)
+
+    Returns: Cards lookup dictionary (keyed on card.id) with boosted rates attached
+    """
     boosting_lookup = {}
-    for text in boosted_rates:
-        items = text.split(' ')
-        asterisk_count = text.count('*')
-        boosting_lookup[asterisk_count] = text2int(items[items.index('times') - 1])
+    names, rarities = [], []
+    for event in DwdBoostingExtractor().extract(html):
+        if event[0] == 'rate':
+            text = event[1]
+            items = text.split(' ')
+            asterisk_count = text.count('*')
+            boosting_lookup[asterisk_count] = text2int(items[items.index('times') - 1])
+        elif event[0] == 'row':
+            names.append(event[1])
+            rarities.append(event[2])
+        else:
+            assert event[1] in DWD_TABLE_HEADINGS
     if 0 not in boosting_lookup:
         boosting_lookup[0] = 1
 
-    # Get the tables
-    tables = [x for x in soup.find_all('table') if x.find('thead')]
+    boosts = [boosting_lookup[rarity.count('*')] for rarity in rarities]
+    return dict(zip(_find_card_ids(names, collection, duplicates), boosts))
 
-    card_boost_lookup = {}
-    for table in tables:
-        table_headings = [x.text.strip() for x in table.find_all('th')]
-        assert table_headings in [['Name', 'Type', 'Subtype', 'Cost', 'Influence', 'Rarity'],
-                                  ['Name', 'Type', 'Subtype', 'Cost', 'Influence', 'Weighted Rarity']]
-        for row in table.find('tbody').find_all('tr'):
-            values = [x.text.strip() for x in row.find_all('td')]
 
-            name = values[0]
-            matched_cards = eternal.card.ALL.data[eternal.card.ALL.data.Name == name]
-            assert len(matched_cards) == 1
-            card_id = matched_cards.index[0]
+def scrape_dwd_draft_pack_boosted_rates(url='https://www.direwolfdigital.com/news/draft-packs-card-list/', fetcher=None,
+                                        cache_dir=None):
+    """Scrape the web for Draft Pack boosted rates
+
+    Args:
+        url: url to the DWD draft pack boost rate table
+        fetcher: (optional) eternal.fetch.Fetcher (defaults to one caching in cache_dir)
+        cache_dir: (optional) HTTP cache directory of the default fetcher (e.g. eternal.fetch.CACHE_DIR, no cache by
+                   default)
+
+    Returns: Cards lookup dictionary (keyed on card.id) with boosted rates attached
+    """
+    fetcher = fetcher or eternal.fetch.Fetcher(cache_dir=cache_dir)
+    return parse_dwd_draft_pack_boosted_rates(fetcher.get(url).decode("utf-8"))
+
+
+FANDOM_DRAFT_PACKS_URL = 'https://eternalcardgame.fandom.com/wiki/Module:Data/Draft_Packs/'
 
-            rarity = values[5]
-            asterisk_count = rarity.count('*')
-            card_boost_lookup[card_id] = boosting_lookup[asterisk_count]
-    return card_boost_lookup
 
-def scrape_fandom_draft_pack_boosted_rates( url='https://eternalcardgame.fandom.com/wiki/Module:Data/Draft_Packs/2021-11-11' ):
+def parse_fandom_draft_pack_boosted_rates(html, collection=None, duplicates='raise'):
+    """Extract the boosting data from a Fandom Draft_Packs module page
+
+    Args:
+        html: HTML of the page (str, bytes, file object or iterable of chunks, see html_chunks)
+        collection: (optional) CardCollection to find the cards in (defaults to eternal.card.ALL)
+        duplicates: How to resolve names of reprinted cards (see eternal.card.CardCollection.lookup_names)
+
+    Returns: Cards lookup dictionary (keyed on card.id) with boosted rates attached
+    """
+    names, boosts = [], []
+    for name, boosting_rate in FandomBoostingExtractor().extract(html):
+        names.append(name)
+        boosts.append(boosting_rate)
+    return dict(zip(_find_card_ids(names, collection, duplicates), boosts))
+
+
+def scrape_fandom_draft_pack_boosted_rates( url=FANDOM_DRAFT_PACKS_URL + '2021-11-11', fetcher=None, cache_dir=None ):
     """Scrape the Fandom hosted boosting data found on:
     https://eternalcardgame.fandom.com/wiki/Special:PrefixIndex/Module:Data/Draft_Packs
     (Thanks Pusillanimous!)
 
     Args:
         url: URL to fandom website
+        fetcher: (optional) eternal.fetch.Fetcher (defaults to one caching in cache_dir)
+        cache_dir: (optional) HTTP cache directory of the default fetcher (e.g. eternal.fetch.CACHE_DIR, no cache by
+                   default)
 
     Returns: Cards lookup dictionary (keyed on card.id) with boosted rates attached
     """
-    page = urlopen(url)
-    html = page.read().decode("utf-8")
-    soup = BeautifulSoup(html, "html.parser")
+    fetcher = fetcher or eternal.fetch.Fetcher(cache_dir=cache_dir)
+    return parse_fandom_draft_pack_boosted_rates(fetcher.get(url).decode("utf-8"))
 
-    card_boost_lookup = {}
-    span_data = soup.find_all("span", {"class": "s2"})
-    for name_data, boost_data in zip( span_data[::2], span_data[1::2]):
-        name = name_data.text.replace('"','').strip()
 
-        matched_cards = eternal.card.ALL.data[eternal.card.ALL.data.Name == name]
-        assert len(matched_cards) == 1
-        card_id = matched_cards.index[0]
+def scrape_fandom_draft_formats(startdates, output_dir=None, fetcher=None, base_url=FANDOM_DRAFT_PACKS_URL, collection=None,
+                                cache_dir=None):
+    """Build DraftFormats from many Fandom Draft_Packs pages (fetched concurrently) in one go.
 
-        boosting_rate = int(boost_data.text.replace('"','').strip())
+    Formats end when the next one starts (the last one is open ended).
 
-        card_boost_lookup[card_id] = boosting_rate
-    return card_boost_lookup
+    Args:
+        startdates: Dictionary of format version (e.g. '12.1') -> start date (e.g. '2021-11-11', also the page name)
+        output_dir: (optional) Directory to save the formats to (as <version>.json)
+        fetcher: (optional) eternal.fetch.Fetcher (defaults to one caching in cache_dir)
+        base_url: URL of the pages (without the date)
+        collection: (optional) CardCollection to find the cards in (defaults to eternal.card.ALL)
+        cache_dir: (optional) HTTP cache directory of the default fetcher (e.g. eternal.fetch.CACHE_DIR, no cache by
+                   default)
+
+    Returns: List of DraftFormat sorted by start date
+    """
+    fetcher = fetcher or eternal.fetch.Fetcher(cache_dir=cache_dir)
+    versions = sorted(startdates, key=startdates.get)
+    pages = fetcher.get_all([base_url + startdates[version] for version in versions])
+
+    formats = []
+    for ix, (version, page) in enumerate(zip(versions, pages)):
+        d = DraftFormat()
+        d.version = version
+        d.set, d.iteration = [int(x) for x in version.split('.')]
+        d.startdate = startdates[version]
+        d.enddate = startdates[versions[ix + 1]] if ix + 1 < len(versions) else None
+        d.boosting = parse_fandom_draft_pack_boosted_rates(page.decode("utf-8"), collection)
+        if output_dir is not None:
+            d.save_json(os.path.join(output_dir, f'{version}.json'))
+        formats.append(d)
+    return formats
+
+
+def _per_collection(cache, collection, build):
+    """Get build(collection) from a cache keyed (weakly) by card collection, rebuilding it when the collection's
+    table was replaced (see CardCollection._set_data) since it was cached."""
+    entry = cache.get(collection)
+    if entry is None or entry[0] is not collection.data:
+        entry = (collection.data, build(collection))
+        cache[collection] = entry
+    return entry[1]
 
 
 class DraftFormat:
@@ -129,6 +397,7 @@ class DraftFormat:
         self.startdate = None
         self.enddate = None
         self.boosting = None
+        self._offer_rates = weakref.WeakKeyDictionary()
 
     def load_json(self, json_path):
         """Load data from custom JSON format. """
@@ -140,6 +409,16 @@ class DraftFormat:
             self.boosting = filedata['boosting']
             self.startdate = filedata['startdate']
             self.enddate = filedata['enddate']
+        self._offer_rates = weakref.WeakKeyDictionary()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_offer_rates'] = None  # Caches (weakly keyed) aren't pickled
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._offer_rates = weakref.WeakKeyDictionary()
 
     def save_json(self, json_path):
         """Save data to custom JSON format."""
@@ -153,6 +432,53 @@ class DraftFormat:
                 boosting=self.boosting
             )
             json.dump( filedata, fout, indent=2 )
+
+    def pack_cards(self, collection=None):
+        """Whether each card can be found in the packs of this format (current set or boosted draft pack card).
+
+        Args:
+            collection: (optional) CardCollection (defaults to eternal.card.ALL)
+
+        Returns: Boolean Series indexed by card id (in collection order)
+        """
+        return self.offer_rates(collection).notna()
+
+    def offer_rates(self, collection=None):
+        """Expected number of times each card is offered in a 4-pack draft of this format.
+
+        Current set cards (2 packs) are equally likely within their rarity and draft pack cards (2 packs) are
+        weighted by their boosting within their rarity, with RARITY_OFFERS_PER_PACK cards of each rarity per pack.
+        Computed for every card at once and cached per collection until the format or the collection is reloaded.
+
+        Args:
+            collection: (optional) CardCollection (defaults to eternal.card.ALL)
+
+        Returns: Series indexed by card id (in collection order), NaN for cards that are never offered (e.g. sigils,
+            promos or cards outside the current set and the draft packs)
+        """
+        collection = collection if collection is not None else eternal.card.ALL
+        return _per_collection(self._offer_rates, collection, self._compute_offer_rates)
+
+    def _compute_offer_rates(self, collection):
+        rarity = pd.Series(collection.values('Rarity'))
+        per_pack = rarity.map(RARITY_OFFERS_PER_PACK).to_numpy()
+
+        # Current set: uniform within each rarity
+        is_current_set = collection.values('SetNumber') == self.set
+        current_set_counts = rarity[is_current_set].value_counts()
+        base_rate = np.where(is_current_set, 1.0 / rarity.map(current_set_counts).to_numpy(dtype=float), np.nan)
+
+        # Draft packs: boosted within each rarity (sigils come from the sigil slot)
+        boosted_positions = collection.data.index.get_indexer(list(self.boosting))
+        assert (boosted_positions >= 0).all(), "Boosted card ids missing from the card collection"
+        boosting = np.zeros(len(rarity))
+        boosting[boosted_positions] = list(self.boosting.values())
+        boosted_totals = pd.Series(boosting).groupby(rarity).sum()
+        is_draft_pack = ~is_current_set & (boosting > 0) & ~pd.Series(collection.values('Name')).str.endswith('Sigil').to_numpy()
+        base_rate[is_draft_pack] = boosting[is_draft_pack] / rarity[is_draft_pack].map(boosted_totals).to_numpy()
+
+        return pd.Series(PACKS_PER_DRAFT * per_pack * base_rate, index=collection.data.index, name=self.version)
+
     def __repr__(self):
         r = f"Format {self.version} ({self.startdate} - {self.enddate})"
         return r
@@ -163,11 +489,145 @@ class DraftFormatMatcher():
     BOOSTING_DATA_DIR = os.path.join(os.path.dirname(__file__), 'boosting_data')
 
     def __init__(self, setnum=12 ):
+        """DraftFormatMatcher object
+
+        Args:
+            setnum: Set number of the formats to load (None for the formats of every set)
+        """
         self.formats = {}
-        for filepath in glob.glob( os.path.join( self.BOOSTING_DATA_DIR, f"{setnum}*.json")):
+        pattern = '*.json' if setnum is None else f"{setnum}*.json"
+        for filepath in glob.glob( os.path.join( self.BOOSTING_DATA_DIR, pattern)):
             d = DraftFormat()
             d.load_json(filepath)
             self.formats[ d.version  ] = ( d )
+        self._indexes = weakref.WeakKeyDictionary()
+        self._dates = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_indexes'] = None  # Caches (weakly keyed) aren't pickled
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._indexes = weakref.WeakKeyDictionary()
+
+    def _date_index(self):
+        """Start dates, end dates (exclusive, open ended formats end when the next one starts or at the max date) and
+        versions of the formats sorted by start date, built on first use."""
+        if self._dates is None:
+            formats = sorted(self.formats.values(), key=lambda d: d.startdate)
+            starts = np.array([d.startdate for d in formats], dtype='datetime64[D]')
+            next_starts = np.append(starts[1:], np.datetime64('9999-12-31'))
+            ends = np.array([d.enddate or next_start for d, next_start in zip(formats, next_starts)],
+                            dtype='datetime64[D]')
+            assert (starts[1:] >= ends[:-1]).all(), "Draft formats overlap"
+            self._dates = (starts, ends, np.array([d.version for d in formats], dtype=object))
+        return self._dates
+
+    def format_on(self, date):
+        """Draft format live on a date.
+
+        Args:
+            date: Date (e.g. '2021-11-11', datetime.date or pandas.Timestamp)
+
+        Returns: DraftFormat or None when no format was live
+        """
+        version = self.formats_on([date])[0]
+        return self.formats[version] if version is not None else None
+
+    def formats_on(self, dates):
+        """Draft formats live on many dates (e.g. a column of deck dates), by binary search of the start dates.
+
+        Args:
+            dates: Iterable (or pandas Series) of dates. Missing dates get no format.
+
+        Returns: Array of format versions (None where no format was live), or a Series with the index of dates
+        """
+        starts, ends, versions = self._date_index()
+        days = pd.to_datetime(pd.Series(list(dates) if not isinstance(dates, pd.Series) else dates))
+        days = days.to_numpy().astype('datetime64[D]')
+        labels = np.full(len(days), None, dtype=object)
+        if len(versions):
+            ix = np.maximum(np.searchsorted(starts, days, side='right') - 1, 0)
+            is_live = (days >= starts[ix]) & (days < ends[ix])  # False for missing dates
+            labels[is_live] = versions[ix[is_live]]
+        return pd.Series(labels, index=dates.index, name='Format', dtype=object) if isinstance(dates, pd.Series) else labels
+
+    def _index(self, collection):
+        """Inverted index of the card packs, log offer rates (n_cards x n_formats) of the formats and the non-sigil
+        cards, built once per collection (and again when its table is replaced)."""
+        return _per_collection(self._indexes, collection, self._build_index)
+
+    def _build_index(self, collection):
+        offer_rates = self.offer_rates(collection)
+        pool = scipy.sparse.csr_matrix(offer_rates.notna().to_numpy())
+        log_rates = np.log(offer_rates.fillna(UNOFFERED_RATE).to_numpy())
+        is_sigil = pd.Series(collection.values('Name')).str.endswith('Sigil').to_numpy()
+        log_rates[is_sigil] = 0.0  # Sigils aren't drafted
+        return offer_rates.columns, pool, log_rates, ~is_sigil
+
+    def formats_for(self, card_id, collection=None):
+        """Formats whose packs contain a card.
+
+        Args:
+            card_id: Card id e.g. '11-4'
+            collection: (optional) CardCollection (defaults to eternal.card.ALL)
+
+        Returns: List of format versions
+        """
+        collection = collection if collection is not None else eternal.card.ALL
+        versions, pool, _, _ = self._index(collection)
+        row = pool[collection.data.index.get_loc(card_id)]
+        return list(versions[row.indices])
+
+    def match(self, decks, collection=None):
+        """Find the most likely draft format of each deck.
+
+        Each deck is scored against every format by the log-likelihood of drafting its (non-sigil) cards given the
+        format's offer rates (cards outside a format's packs get UNOFFERED_RATE). Current set cards are equally
+        likely in every format of a set so formats of the same set are told apart by their draft pack cards.
+        Confidence is the posterior probability of the best format (uniform prior over the formats).
+
+        Args:
+            decks: eternal.corpus.DeckMatrix, iterable of eternal.deck.Deck or iterable of deck-builder URLs
+            collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+
+        Returns: DataFrame indexed by deck with columns
+            Format      - Version of the most likely format
+            Confidence  - Posterior probability of that format
+            Coverage    - Fraction of the deck's (non-sigil) cards found in that format's packs
+        """
+        if not isinstance(decks, eternal.corpus.DeckMatrix):
+            if not isinstance(decks, pd.Series):
+                decks = pd.Series(list(decks), dtype=object)
+            if len(decks) and isinstance(decks.iloc[0], str):
+                decks = eternal.corpus.DeckMatrix.from_urls(decks, collection=collection)
+            else:
+                decks = eternal.corpus.DeckMatrix.from_decks(decks, collection=collection)
+        collection = decks.collection
+        versions, pool, log_rates, is_drafted = self._index(collection)
+
+        log_likelihood = np.asarray(decks.matrix @ log_rates)
+        best = log_likelihood.argmax(axis=1)
+        rows = np.arange(len(best))
+        log_likelihood -= log_likelihood[rows, best][:, None]
+        confidence = 1.0 / np.exp(log_likelihood).sum(axis=1)
+        covered = np.asarray((decks.matrix @ pool).todense())[rows, best]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            coverage = covered / (decks.matrix @ is_drafted.astype(np.int64))
+        return pd.DataFrame({'Format': np.asarray(versions)[best], 'Confidence': confidence, 'Coverage': coverage},
+                            index=decks.decks)
+
+    def offer_rates(self, collection=None):
+        """Offer rates of every card in every format (see DraftFormat.offer_rates).
+
+        Args:
+            collection: (optional) CardCollection (defaults to eternal.card.ALL)
+
+        Returns: DataFrame indexed by card id with one column per format version (sorted)
+        """
+        return pd.concat([self.formats[version].offer_rates(collection) for version in sorted(self.formats)], axis=1)
 
 
 
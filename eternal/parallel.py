@@ -0,0 +1,119 @@
+"""Sharded processing of deck corpora over a pool of worker processes.
+
+Rows (e.g. deck-builder URLs) are split into contiguous shards which are handed to the workers in order and the
+results are returned in shard order, so the output doesn't depend on the number of workers or their scheduling.
+Workers receive the card collection once (when they start) rather than with every shard and return compact
+numpy arrays instead of pickled Deck objects / DataFrames.
+"""
+import concurrent.futures
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import eternal.card
+
+# Number of rows (decks) per shard
+SHARD_SIZE = 2000
+
+# Card collection of the worker process (set by _init_worker)
+_WORKER_COLLECTION = None
+
+
+def cpu_count():
+    """Number of CPUs available to this process."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _init_worker(collection):
+    global _WORKER_COLLECTION
+    _WORKER_COLLECTION = collection
+
+
+def worker_collection():
+    """Card collection of the current worker (eternal.card.ALL unless the pool was given one)."""
+    return _WORKER_COLLECTION if _WORKER_COLLECTION is not None else eternal.card.ALL
+
+
+def shards(items, shard_size=SHARD_SIZE):
+    """Split a sequence into contiguous shards.
+
+    Returns: List of (offset, items[offset:offset + shard_size])
+    """
+    items = list(items)
+    return [(offset, items[offset:offset + shard_size]) for offset in range(0, len(items), shard_size)]
+
+
+def map_shards(func, items, n_jobs=1, shard_size=SHARD_SIZE, collection=None):
+    """Apply a function to the shards of a sequence, optionally over a process pool.
+
+    Args:
+        func: Module level function taking (offset, shard) (must be picklable). It can get the card collection
+              with worker_collection().
+        items: Sequence of rows to process
+        n_jobs: Number of worker processes (None for all CPUs, 1 to run in this process)
+        shard_size: Number of rows per shard
+        collection: (optional) CardCollection for the workers (eternal.card.ALL by default)
+
+    Returns: List of func results in shard order
+    """
+    n_jobs = cpu_count() if n_jobs is None else n_jobs
+    item_shards = shards(items, shard_size)
+    if n_jobs <= 1 or len(item_shards) <= 1:
+        previous = _WORKER_COLLECTION
+        _init_worker(collection)
+        try:
+            return [func(offset, shard) for offset, shard in item_shards]
+        finally:
+            _init_worker(previous)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(n_jobs, len(item_shards)), initializer=_init_worker,
+                                                initargs=(collection,)) as executor:
+        return list(executor.map(func, *zip(*item_shards)))
+
+
+def scaling_report(urls, max_jobs=None, repeat=3, shard_size=SHARD_SIZE, collection=None):
+    """Measure the deck parsing throughput (see eternal.ewc.parse_deckbuilder_urls) for 1 to max_jobs processes.
+
+    Args:
+        urls: Deck-builder URLs to parse
+        max_jobs: Largest number of processes (defaults to the number of CPUs)
+        repeat: Number of runs per process count (the fastest is reported)
+        shard_size: Number of URLs per shard
+        collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+
+    Returns: DataFrame indexed by number of processes with Seconds, DecksPerSecond, Speedup and Efficiency
+    """
+    import eternal.ewc
+
+    urls = list(urls)
+    max_jobs = max_jobs or cpu_count()
+    seconds = {}
+    for n_jobs in range(1, max_jobs + 1):
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            eternal.ewc.parse_deckbuilder_urls(urls, collection=collection, n_jobs=n_jobs, shard_size=shard_size)
+            runs.append(time.perf_counter() - start)
+        seconds[n_jobs] = min(runs)
+    report = pd.DataFrame({'Seconds': pd.Series(seconds)})
+    report.index.name = 'Processes'
+    report['DecksPerSecond'] = len(urls) / report['Seconds']
+    report['Speedup'] = report['Seconds'].iloc[0] / report['Seconds']
+    report['Efficiency'] = report['Speedup'] / np.asarray(report.index)
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Deck parsing throughput by number of processes')
+    parser.add_argument('csv', help='7-win CSV')
+    parser.add_argument('--column', default='EWC-P', help='Deck-builder URL column (default: %(default)s)')
+    parser.add_argument('--max-jobs', type=int, help='Largest number of processes (default: number of CPUs)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per process count (default: %(default)s)')
+    args = parser.parse_args()
+    print(scaling_report(pd.read_csv(args.csv)[args.column], max_jobs=args.max_jobs, repeat=args.repeat))
@@ -0,0 +1,705 @@
+"""Analysis of FarmingEternal's 7-win run breakdown (Google Sheet exported as CSV) as a staged pipeline.
+
+Stages (in order, each one using the outputs of the previous ones):
+    load_csv     - Read the 7-win CSV
+    parse_decks  - Decode the deck-builder URLs into a long-form deck/card table (eternal.ewc.parse_deckbuilder_urls)
+    card_tables  - Per-deck table (factions, power, units), per-copy card table and card counts
+    offer_rates  - Draft offer rates of the cards and the count per offer statistics
+    reports      - Report tables (see print_reports)
+
+The output of every stage is cached on disk (a pickle per stage in cache_dir) keyed on everything it depends on:
+the CSV content, the card collection, the draft format/boosting data and the stage code version. Changing a
+report or plot doesn't re-parse the decks and appending decks to the CSV re-runs everything downstream of it.
+
+From Python:
+
+    pipeline = eternal.sevenwin.Pipeline('7win_decks_set12.csv')
+    card_counts = pipeline.run('offer_rates')
+
+From the command line (see main()):
+
+    python -m eternal.sevenwin --csv 7win_decks_set12.csv --stages parse_decks card_tables
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import scipy.stats
+
+import eternal.card
+import eternal.cardcache
+import eternal.corpus
+import eternal.ewc
+import eternal.format
+import eternal.plot
+
+CSV_PATH = '7win_decks_set12.csv'
+CSV_COLUMNS = ['s', 'Factions', 'Contributor', 'Image', 'EWC', 'EWC-P', 'W', 'L', 'Ep. #']
+URL_COLUMN = 'EWC-P'
+CACHE_DIR = '.7win_cache'
+BOOSTING_DIR = os.path.join(os.path.dirname(__file__), 'boosting_data')
+DRAFT_FORMAT = '12.1'
+
+# Stages with the stages they depend on and a version to bump whenever the code of a stage changes its output
+STAGES = {'load_csv': ([], 1),
+          'parse_decks': (['load_csv'], 1),
+          'card_tables': (['load_csv', 'parse_decks'], 1),
+          'offer_rates': (['load_csv', 'card_tables'], 2),
+          'reports': (['card_tables', 'offer_rates'], 1)}
+
+CARD_COUNT_DISPLAY_COLS = ['Name', 'Rarity', 'Faction', 'PossibleDecks', 'OfferRate', 'Count', 'CountPerDeck', 'CountPerOffer', 'CountPerOfferDeck']
+CARD_COUNT_OUTPUT_COLS = ['Faction', 'Count', 'PossibleDecks', 'CountPerDeck', 'SetNumber', 'EternalID', 'OfferRate', 'CountPerOffer', 'CountPerOfferDeck', 'Rarity',
+                          'Type', 'Name', 'CardText', 'Cost', 'Influence', 'Attack', 'Health', 'ImageUrl', 'DetailsUrl', 'DeckBuildable', 'UnitType', 'MarketAccess']
+RARITY = ['Common', 'Uncommon', 'Rare', 'Legendary']
+N = 20
+MIN_DECK = 10
+
+
+def imode(src):
+    """Return a copy of a series where all case-insensitive versions have been replaced with the most common case sensitive variant."""
+    dest = src.copy()
+    for lower, subset in src.groupby(src.str.lower()):
+        dest[subset.index] = subset.mode().values[0]
+    return dest
+
+
+def collection_digest(collection):
+    """SHA-256 hex digest of the card fields of a card collection (for keying cached stages)."""
+    data = collection.data
+    columns = [column for column in sorted(eternal.card.CardInfo.BASE_FIELDS) if column in data.columns]
+    hashes = pd.util.hash_pandas_object(data[columns].astype(str), index=True)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+
+class Pipeline:
+    """Staged (and cached) 7-win analysis.
+
+    Each stage is a method returning its output. run(stage) returns the output of a stage, loading it from the
+    cache (or computing it and its dependencies) the first time and keeping it in memory afterwards.
+    """
+
+    def __init__(self, csv_path=CSV_PATH, cache_dir=CACHE_DIR, collection=None, draft_format=DRAFT_FORMAT,
+                 boosting_dir=BOOSTING_DIR, use_cache=True, n_jobs=1):
+        """Pipeline object
+
+        Args:
+            csv_path: Path of the 7-win CSV
+            cache_dir: Directory of the cached stage outputs
+            collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+            draft_format: Draft format (boosting_data/<draft_format>.json) used for the offer rates
+            boosting_dir: Directory of the boosting data
+            use_cache: Whether stage outputs are read from / written to cache_dir
+            n_jobs: Number of processes parsing the decks (None for all CPUs, doesn't change any output)
+        """
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        self.collection = collection if collection is not None else eternal.card.ALL
+        self.draft_format = draft_format
+        self.boosting_path = os.path.join(boosting_dir, f'{draft_format}.json')
+        self.use_cache = use_cache
+        self.n_jobs = n_jobs
+        self._outputs = {}
+        self._keys = {}
+
+    def _inputs(self, stage):
+        """Inputs of a stage (besides its dependencies) that its cache is keyed on."""
+        if stage == 'load_csv':
+            return {'csv': eternal.cardcache.file_digest(self.csv_path)}
+        if stage in ('parse_decks', 'card_tables'):
+            return {'collection': collection_digest(self.collection)}
+        if stage == 'offer_rates':
+            return {'collection': collection_digest(self.collection),
+                    'boosting': eternal.cardcache.file_digest(self.boosting_path)}
+        return {}
+
+    def key(self, stage):
+        """Cache key of a stage (SHA-256 of its version, inputs and the keys of its dependencies)."""
+        if stage not in self._keys:
+            dependencies, version = STAGES[stage]
+            key = {'stage': stage, 'version': version, 'inputs': self._inputs(stage),
+                   'dependencies': [self.key(dependency) for dependency in dependencies]}
+            self._keys[stage] = hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+        return self._keys[stage]
+
+    def _cache_path(self, stage):
+        return os.path.join(self.cache_dir, f'{stage}-{self.key(stage)}.pkl')
+
+    def is_cached(self, stage):
+        """Whether the output of a stage (for the current inputs) is in the cache."""
+        return os.path.exists(self._cache_path(stage))
+
+    def _save(self, stage, output):
+        """Write a stage output to the cache (replacing outputs of the stage for previous inputs)."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-')
+            os.close(fd)
+            pd.to_pickle(output, tmp_path)
+            os.replace(tmp_path, self._cache_path(stage))
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(f'{stage}-') and name != os.path.basename(self._cache_path(stage)):
+                    os.remove(os.path.join(self.cache_dir, name))
+        except OSError as e:
+            logging.warning(f"Unable to cache the {stage} stage in {self.cache_dir}: {e}")
+
+    def run(self, stage, force=False):
+        """Get the output of a stage (running it and its dependencies as needed).
+
+        Args:
+            stage: Name of the stage (see STAGES)
+            force: Re-run the stage even if it is cached (its dependencies still come from the cache)
+
+        Returns: Output of the stage
+        """
+        if force:
+            self._outputs.pop(stage, None)
+        if stage not in self._outputs:
+            if self.use_cache and not force and self.is_cached(stage):
+                logging.info(f"Loading {stage} from {self._cache_path(stage)}")
+                self._outputs[stage] = pd.read_pickle(self._cache_path(stage))
+            else:
+                logging.info(f"Running {stage}")
+                self._outputs[stage] = getattr(self, stage)()
+                if self.use_cache:
+                    self._save(stage, self._outputs[stage])
+        return self._outputs[stage]
+
+    def deck_matrix(self):
+        """DeckMatrix of the decks (main deck) built from the parse_decks table."""
+        return eternal.corpus.DeckMatrix.from_table(self.run('parse_decks'), collection=self.collection)
+
+    # ********** STAGES **************
+
+    def load_csv(self):
+        """Read the 7-win CSV (with the contributor names normalized, see imode).
+
+        Returns: DataFrame with one row per deck
+        """
+        df_7win_decks = pd.read_csv(self.csv_path)[CSV_COLUMNS]
+        df_7win_decks['Contributor'] = imode(df_7win_decks['Contributor'])
+        return df_7win_decks
+
+    def parse_decks(self):
+        """Decode the deck-builder URLs of the decks.
+
+        Returns: Long-form deck/card table of eternal.ewc.parse_deckbuilder_urls (Deck is the CSV row)
+        """
+        table = eternal.ewc.parse_deckbuilder_urls(self.run('load_csv')[URL_COLUMN], collection=self.collection,
+                                                   n_jobs=self.n_jobs)
+        for error in table['Error'].dropna():
+            logging.warning(f"Skipping deck: {error}")
+        return table
+
+    def card_tables(self):
+        """Build the deck and card tables.
+
+        Returns: Dictionary with
+            decks           - DataFrame of the decks with MainFaction, SplashFaction, UnitCount, NumPower,
+                              EffectivePower, Attack and Health
+            all_cards       - DataFrame with one row per card copy in the main decks (indexed by card id, with DeckId
+                              and the deck factions)
+            card_counts     - DataFrame of the card counts by card name (Faction, Count, PossibleDecks and
+                              CountPerDeck) merged with the card collection
+        """
+        cards_data = self.collection.data
+        table = self.run('parse_decks')
+        deck_matrix = self.deck_matrix()
+        df_7win_decks = self.run('load_csv').loc[deck_matrix.decks].copy()
+        deck_faction_masks = deck_matrix.deck_faction_masks()
+        df_7win_decks[['MainFaction', 'SplashFaction']] = deck_matrix.deck_factions()
+
+        # One row per card copy, in the order of the deck-builder URLs
+        main = table[(table['Zone'] == 'main').to_numpy() & table['Error'].isna().to_numpy()]
+        positions = cards_data.index.get_indexer(main['CardId'].astype(str))
+        all_cards = cards_data.iloc[np.repeat(positions, main['Count'].to_numpy())].copy()
+        all_cards['DeckId'] = np.repeat(main['Deck'].to_numpy(), main['Count'].to_numpy())
+        all_cards['DeckMainFaction'] = all_cards.DeckId.map(df_7win_decks['MainFaction'])
+        all_cards['DeckSplashFaction'] = all_cards.DeckId.map(df_7win_decks['SplashFaction'])
+        all_cards['DeckFactionMask'] = all_cards.DeckId.map(deck_faction_masks['MainMask'] | deck_faction_masks['SplashMask'])
+        all_cards['IsSplash'] = (all_cards['FactionMask'].to_numpy() & all_cards.DeckId.map(deck_faction_masks['SplashMask']).to_numpy()) != 0
+        all_cards['Faction'] = eternal.card.faction_strings(all_cards['FactionMask'])
+        all_cards['Contributor'] = all_cards.DeckId.map(df_7win_decks['Contributor'])
+        for faction in 'FTJPS':
+            all_cards[faction] = (all_cards['FactionMask'] & eternal.card.FACTION_BITS[faction]) != 0
+
+        # Playable deck counts (for the factions of the non-power cards played)
+        card_faction_masks = np.unique(all_cards.loc[all_cards['Type'] != 'Power', 'FactionMask'])
+        playable_deck_count_by_faction = dict(zip(eternal.card.faction_strings(card_faction_masks),
+                                                  deck_matrix.playable_deck_counts()[card_faction_masks]))
+        playable_deck_count_by_faction['None'] = len(df_7win_decks)
+
+        # Figure out card count statistics
+        card_totals = deck_matrix.card_counts()
+        card_names = cards_data.loc[card_totals.index, 'Name']
+        card_factions = pd.Series(eternal.card.faction_strings(cards_data.loc[card_totals.index, 'FactionMask']), index=card_totals.index)
+        card_counts = pd.DataFrame({'Faction': card_factions.groupby(card_names).first(),
+                                    'Count': card_totals.groupby(card_names).sum()})
+        card_counts['PossibleDecks'] = card_counts['Faction'].map(playable_deck_count_by_faction)
+        card_counts['CountPerDeck'] = card_counts['Count'] / card_counts['PossibleDecks']
+        card_counts = card_counts.merge(cards_data, left_index=True, right_on='Name', how='left')
+
+        # Unit and power counts (missing when a deck has none, as with Deck.types())
+        is_unit = cards_data['Type'] == 'Unit'
+        unit_count = deck_matrix.deck_aggregate(is_unit)
+        df_7win_decks['UnitCount'] = unit_count.where(unit_count > 0)
+        num_power = deck_matrix.deck_aggregate(cards_data['Type'] == 'Power')
+        df_7win_decks['NumPower'] = num_power.where(num_power > 0)
+        df_7win_decks['EffectivePower'] = deck_matrix.deck_aggregate('PowerCount')
+
+        # Average unit Attack / Health (see Deck.unit_stats)
+        for column in ['Attack', 'Health']:
+            df_7win_decks[column] = deck_matrix.deck_aggregate(cards_data[column].where(is_unit, 0).astype('float64')) / unit_count
+
+        return {'decks': df_7win_decks, 'all_cards': all_cards, 'card_counts': card_counts}
+
+    def offer_rates(self):
+        """Compute the draft offer rates of the played cards.
+
+        Returns: card_counts (see card_tables) with OfferRate, CountPerOffer and CountPerOfferDeck
+        """
+        tables = self.run('card_tables')
+        df_7win_decks = tables['decks']
+        card_counts = tables['card_counts'].copy()
+        draft_format = eternal.format.DraftFormat()
+        draft_format.load_json(self.boosting_path)
+
+        freq_faction_lookup = {}
+        for faction in card_counts['Faction'].unique():
+            freq_faction_lookup[faction] = (df_7win_decks['MainFaction'] + df_7win_decks['SplashFaction']).str.contains(faction).sum() / len(df_7win_decks)
+        freq_faction_lookup['None'] = 1.0
+        card_counts['FactionFrequency'] = card_counts['Faction'].map(freq_faction_lookup)
+
+        card_counts['OfferRate'] = draft_format.offer_rates(self.collection).loc[card_counts.index].to_numpy()
+        card_counts['CountPerOffer'] = card_counts['Count'] / (card_counts['OfferRate'])
+        card_counts['CountPerOfferDeck'] = (card_counts['Count'] / (card_counts['OfferRate'] * card_counts['PossibleDecks'])).astype('float')
+        return card_counts
+
+    def reports(self):
+        """Compute the report tables (see print_reports for what they are).
+
+        Returns: Dictionary of report name -> table
+        """
+        cards_data = self.collection.data
+        tables = self.run('card_tables')
+        df_7win_decks, all_cards = tables['decks'], tables['all_cards']
+        card_counts = self.run('offer_rates')
+        reports = {}
+
+        # ********** TOP CARDS (LISTS) **************
+        rarity_cards = card_counts[card_counts['Rarity'].isin(RARITY)]
+        reports['top_by_count'] = rarity_cards.sort_values('Count', ascending=False)[CARD_COUNT_DISPLAY_COLS].head(N)
+        reports['top_by_count_per_deck'] = rarity_cards.sort_values('CountPerDeck', ascending=False)[CARD_COUNT_DISPLAY_COLS].head(N)
+        reports['top_by_count_per_offer'] = rarity_cards.sort_values('CountPerOffer', ascending=False)[CARD_COUNT_DISPLAY_COLS].head(N)
+        reports['bottom_by_count_per_offer'] = rarity_cards.sort_values('CountPerOffer', ascending=True)[CARD_COUNT_DISPLAY_COLS].head(N)
+
+        # Top splashed cards
+        deck_matrix = self.deck_matrix()
+        splash_matrix = deck_matrix.splash_matrix()
+        reports['n_splash_decks'] = (splash_matrix.getnnz(axis=1) > 0).sum()
+        splash_counts = deck_matrix.splash_counts()
+        splash_counts = splash_counts[cards_data.loc[splash_counts.index, 'Type'] != 'Power']
+        reports['top_splashed'] = splash_counts.groupby(cards_data.loc[splash_counts.index, 'Name']).sum().sort_values(ascending=False).head(N)
+
+        # All the market cards in play
+        reports['market_cards'] = card_counts[card_counts['MarketAccess']].sort_values('Count', ascending=False)[CARD_COUNT_DISPLAY_COLS]
+
+        # Top combat tricks
+        reports['fast_spell_counts'] = all_cards[all_cards['Type'] == 'Fast Spell']['Name'].value_counts().head(N)
+        reports['top_fast_spells'] = card_counts[card_counts['Type'] == 'Fast Spell'].sort_values('CountPerDeck', ascending=False)[CARD_COUNT_DISPLAY_COLS].head(N)
+
+        # Top stealth units
+        reports['stealth_unit_counts'] = all_cards[(all_cards['Type'] == 'Unit') & (all_cards['CardText'].str.contains('<b>Stealth</b>'))]['Name'].value_counts().head(N)
+        top_stealth_cards = card_counts[(card_counts['Type'] == 'Unit') & (card_counts['CardText'].str.contains('<b>Stealth</b>'))].sort_values('CountPerDeck',
+                                                                                                                                                ascending=False)
+        reports['top_stealth_units'] = top_stealth_cards[CARD_COUNT_DISPLAY_COLS].head(N)
+
+        # All "out of faction" cards
+        out_of_faction_cards = all_cards[(all_cards['FactionMask'].to_numpy() & ~all_cards['DeckFactionMask'].to_numpy()) != 0]
+        reports['out_of_faction_cards'] = out_of_faction_cards['Name'].value_counts()
+        reports['out_of_faction_contributors'] = df_7win_decks.loc[out_of_faction_cards['DeckId']]['Contributor'].value_counts()
+
+        # ********** UNIT ANALYSIS **************
+        units_by_player = df_7win_decks.groupby('Contributor')['UnitCount'].describe()
+        reports['units_by_player'] = units_by_player[units_by_player['count'] >= 3].sort_values('mean')[['count', 'mean', 'min', 'max']]
+        units_by_faction = df_7win_decks.groupby('MainFaction')['UnitCount'].describe()
+        reports['units_by_faction'] = units_by_faction[units_by_faction['count'] >= 3].sort_values('mean')[['count', 'mean', 'min', 'max']]
+
+        # ********** DECK POWER ANALYSIS **************
+        power_by_player = df_7win_decks.groupby('Contributor')['NumPower'].describe()[['count', 'mean', 'min', 'max']]
+        reports['power_by_player'] = power_by_player[power_by_player['count'] >= 3].sort_values('mean')[['count', 'mean', 'min', 'max']]
+        powercount_by_player = df_7win_decks.groupby('Contributor')['EffectivePower'].describe()[['count', 'mean', 'min', 'max']]
+        reports['powercount_by_player'] = powercount_by_player[powercount_by_player['count'] >= 3].sort_values('mean')
+        power_by_player_merged = pd.merge(power_by_player, powercount_by_player, left_index=True, right_index=True,
+                                          suffixes=('_type', '_effective'))
+        reports['power_by_player_merged'] = power_by_player_merged[power_by_player_merged['count_type'] >= 3].sort_values('mean_effective')
+        powercount_by_deck_main_faction = df_7win_decks.groupby('MainFaction')['EffectivePower'].describe()[['count', 'mean', 'min', 'max']]
+        reports['powercount_by_deck_main_faction'] = powercount_by_deck_main_faction[powercount_by_deck_main_faction['count'] >= 3].sort_values('mean')
+
+        # ********** CARD-COST ANALYSIS **************
+        non_power_cards = all_cards[all_cards.Type != 'Power']
+        curve_by_faction = non_power_cards.groupby(['DeckMainFaction', 'Cost'])['Name'].count()
+        deck_count_by_faction = df_7win_decks['MainFaction'].value_counts()
+        curve_factions = pd.Index([faction for faction, count in deck_count_by_faction.items()
+                                   if count >= MIN_DECK and faction in curve_by_faction.index.get_level_values(0)])
+        reports['average_cost_by_faction'] = non_power_cards.groupby('DeckMainFaction')['Cost'].mean()[curve_factions].sort_values()
+
+        # ********** BEST AND WORST DECKS **************
+        deck_count_per_offer = all_cards.index.map(card_counts['CountPerOfferDeck']).to_series(index=all_cards['DeckId']).groupby(level=0).mean()
+        reports['best_decks'] = df_7win_decks.loc[deck_count_per_offer.nlargest(10).index]
+        reports['worst_decks'] = df_7win_decks.loc[deck_count_per_offer.nsmallest(10).index]
+        return reports
+
+
+# ********** PRINTING **************
+
+def print_reports(reports):
+    """Print the report tables (of Pipeline.reports)."""
+    print("******Top {N} {Rarity} cards (by count)*****".format(N=N, Rarity='+'.join(RARITY)))
+    print("NOTE: OfferRates is the number of cards you would expect in a given 4-pack draft")
+    print("NOTE: CountPerOfferDeck also corrects for possible Decks so faction frequency is accounted for")
+    print(reports['top_by_count'])
+    print("\n")
+
+    print("******Top {N} {Rarity} cards (by count per deck)*****".format(N=N, Rarity='+'.join(RARITY)))
+    print("NOTE: OfferRates is the number of cards you would expect in a given 4-pack draft")
+    print("NOTE: CounterPerOffer also corrects for possible Decks so faction frequency is accounted for")
+    print(reports['top_by_count_per_deck'])
+    print("\n")
+
+    print("******Top {N} {Rarity} cards (by count per offer*)*****".format(N=N, Rarity='+'.join(RARITY)))
+    print("NOTE: OfferRates is the number of cards you would expect in a given 4-pack draft")
+    print("NOTE: CountPerOfferDeck also corrects for possible Decks so faction frequency is accounted for")
+    print(reports['top_by_count_per_offer'])
+    print("\n")
+
+    print("******Bottom {N} {Rarity} cards (by count per offer*)*****".format(N=N, Rarity='+'.join(RARITY)))
+    print("NOTE: OfferRates is the number of cards you would expect in a given 4-pack draft")
+    print("NOTE: CountPerOfferDeck also corrects for possible Decks so faction frequency is accounted for")
+    print(reports['bottom_by_count_per_offer'])
+    print("\n")
+
+    print("******Top {N} splashed for cards****".format(N=N))
+    print("(out of {n_splash_decks} decks that splashed)".format(n_splash_decks=reports['n_splash_decks']))
+    print(reports['top_splashed'])
+    print("\n")
+
+    print("*******ALL MARKET ACCESS CARDS********")
+    print("NOTE: OfferRates is the number of cards you would expect in a given 4-pack draft")
+    print("NOTE: CountPerOfferDeck also corrects for possible Decks so faction frequency is accounted for")
+    print(reports['market_cards'])
+    print("\n")
+
+    print("******Top {N} Fast spells (by count)*****".format(N=N))
+    print(reports['fast_spell_counts'])
+    print("\n")
+
+    print("******Top {N} Fast spells  (by count per deck)*****".format(N=N))
+    print(reports['top_fast_spells'])
+    print("\n")
+
+    print("******Top {N} Stealth Units (by count)*****".format(N=N))
+    print(reports['stealth_unit_counts'])
+    print("\n")
+
+    print("******Top {N} Stealh Units  (by count per deck)*****".format(N=N))
+    print(reports['top_stealth_units'])
+    print("\n")
+
+    print("Out of faction most played cards")
+    if not reports['out_of_faction_cards'].empty:
+        print(reports['out_of_faction_cards'])
+        print("Out of faction card Contributors")
+        print(reports['out_of_faction_contributors'])
+    else:
+        print("No out of faction cards played!!!")
+
+    print("**** Average unit count by deck main-faction (minimum 3 decks)")
+    print(reports['units_by_faction'])
+
+    print("**** Power played by player (card type = Power) *****")
+    print(reports['power_by_player'])
+
+    print("**** Power played by player (effective power*) *****")
+    print("NOTE: <=2 cost or less spells counted as power e.g. Seek Power/Etchings/BluePrints etc.")
+    print(reports['powercount_by_player'])
+
+    print(reports['power_by_player_merged'])
+
+    print("**** Power played by deck main factions (effective power*) *****")
+    print("NOTE: <=2 cost or less spells counted as power e.g. Seek Power/Etchings/BluePrints etc.")
+    print(reports['powercount_by_deck_main_faction'])
+
+    print("**** Average card cost by deck main faction ****")
+    print("(for all main-faction pairs with at least {MIN_DECK} decks)".format(MIN_DECK=MIN_DECK))
+    print(reports['average_cost_by_faction'])
+
+
+def power_sink_summary(all_cards, df_7win_decks, cards_data):
+    """"Analyze decks using Sketches or Rune"""
+    cards_sketches = cards_data[cards_data['Name'].str.endswith('Sketch')]
+    cards_runes = cards_data[cards_data['Name'].str.startswith('Rune of')]
+    cards_both = pd.concat([cards_runes, cards_sketches])
+
+    power_sink_summary = []
+    for id, sketch in cards_both.iterrows():
+        n_decks = all_cards[all_cards.index.isin([id])].DeckId.unique().size
+        power_sink_summary.append([sketch.Name, n_decks])
+
+    power_sink_summary.append(['Any Rune', all_cards[all_cards.index.isin(cards_runes.index)].DeckId.unique().size])
+    power_sink_summary.append(['Any Sketch', all_cards[all_cards.index.isin(cards_sketches.index)].DeckId.unique().size])
+    power_sink_summary.append(['Any Rune or Sketch', all_cards[all_cards.index.isin(cards_both.index)].DeckId.unique().size])
+
+    df_power_sink_summary = pd.DataFrame(power_sink_summary, columns=['Scenario', 'NumDecks'])
+    df_power_sink_summary['PercentageDecks'] = df_power_sink_summary['NumDecks'] / len(df_7win_decks) * 100.0
+    print("**** Percentage of decks containing power sinks (Sketches and/or Runes)****")
+    print(df_power_sink_summary)
+
+
+def display_cards_in_contention(card_counts, *args,
+                                stats=['Name', 'PossibleDecks', 'OfferRate', 'Count', 'CountPerDeck', 'CountPerOffer', 'CountPerOfferDeck']):
+    """
+
+    Args:
+        card_counts: Card counts (output of the offer_rates stage)
+        *args: One (or more) strings to use to search the names of cards to display (case insenstive)
+        stats: (optional) List of columns to display
+    """
+    re_string = '|'.join(args)
+    print(card_counts[card_counts['Name'].str.contains(re_string, flags=re.IGNORECASE)][stats])
+
+
+# ********** PLOTS **************
+
+def plot_power_by_player(power_by_player_merged):
+    """Contributor power (type) vs. effective power."""
+    power_by_player_subset = power_by_player_merged[power_by_player_merged['count_type'] >= 3]
+    plt.figure()
+    plt.scatter(power_by_player_subset['mean_type'].values, power_by_player_subset['mean_effective'].values, label=power_by_player_subset.index)
+    for name in power_by_player_subset.index:
+        plt.annotate(name, (power_by_player_subset.loc[name]['mean_type'], power_by_player_subset.loc[name]['mean_effective']))
+    plt.grid('on')
+    plt.xlabel('Power (type) cards')
+    plt.ylabel('Effective power')
+
+
+def plot_effective_power_by_faction(df_7win_decks):
+    """Amount of (effective) power by deck main faction."""
+    deck_count_by_faction = df_7win_decks['MainFaction'].value_counts()
+    deck_power_by_faction = df_7win_decks.groupby('MainFaction')['EffectivePower'].value_counts().sort_index()
+    normalized_deck_power_by_faction = pd.DataFrame()
+    for faction, count in deck_count_by_faction.items():
+        if count >= MIN_DECK:
+            normalized_deck_power_by_faction[faction] = deck_power_by_faction.loc[faction] / (float(count)) * 100.0
+    first_color = eternal.plot.get_faction_colors([x[0] for x in normalized_deck_power_by_faction.columns])
+    second_color = eternal.plot.get_faction_colors([x[1] for x in normalized_deck_power_by_faction.columns])
+    ax = normalized_deck_power_by_faction.plot(grid='on', color=first_color, linewidth=6, alpha=0.5)
+    normalized_deck_power_by_faction.plot(grid='on', color=second_color, linewidth=1, ax=ax)
+    plt.ylabel('Percentage of decks')
+    plt.title('Effective power by deck main faction')
+
+
+def plot_curve_by_faction(all_cards, df_7win_decks):
+    """Average curve by deck main faction."""
+    curve_by_faction = all_cards[all_cards.Type != 'Power'].groupby(['DeckMainFaction', 'Cost'])['Name'].count()
+    deck_count_by_faction = df_7win_decks['MainFaction'].value_counts()
+    normalized_curve_by_faction = pd.DataFrame()
+    for faction, count in deck_count_by_faction.items():
+        if count >= MIN_DECK:
+            normalized_curve_by_faction[faction] = curve_by_faction.loc[faction] / (float(count))
+    first_color = eternal.plot.get_faction_colors([x[0] for x in normalized_curve_by_faction.columns])
+    second_color = eternal.plot.get_faction_colors([x[1] for x in normalized_curve_by_faction.columns])
+    ax = normalized_curve_by_faction.plot(grid='on', color=first_color, linewidth=6, alpha=0.5)
+    normalized_curve_by_faction.plot(grid='on', color=second_color, linewidth=1, ax=ax)
+    plt.ylabel('Number of cards')
+    plt.title('Average curve by deck main faction')
+
+
+def plot_unit_health_by_faction(all_cards):
+    """Unit health by faction."""
+    units = all_cards[all_cards.Type == 'Unit'].copy()
+    units['Faction'] = eternal.card.faction_strings(units['FactionMask'])
+    units_health_by_faction = units.pivot_table(index='Faction', columns=['Health'], values='Name', aggfunc='count')
+    sorted_units_faction_by_health = units_health_by_faction.loc[units_health_by_faction.sum(axis=1).sort_values(ascending=False).index].transpose()
+    colors = eternal.plot.get_faction_colors(sorted_units_faction_by_health.columns)
+    sorted_units_faction_by_health.plot(kind='bar', stacked=True, grid=True, color=colors, legend=True)
+
+
+def plot_contributor_faction_usage(all_cards, df_7win_decks):
+    contributor_faction_counts = all_cards[all_cards.Type != 'Power'].groupby('Contributor')[['F', 'T', 'J', 'P', 'S']].sum()
+    contributor_faction_percent = contributor_faction_counts.div(contributor_faction_counts.sum(axis=1), axis=0)
+    contributor_faction_percent['count'] = contributor_faction_percent.index.map(df_7win_decks['Contributor'].value_counts())
+    contributor_faction_percent['deviation'] = (contributor_faction_percent[['F', 'T', 'J', 'P', 'S']] - 0.2).abs().sum(axis=1)
+    divergence = lambda x: scipy.stats.entropy(x.values, [0.2, 0.2, 0.2, 0.2, 0.2])
+    contributor_faction_percent['divergence'] = contributor_faction_percent[['F', 'T', 'J', 'P', 'S']].apply(divergence, axis=1)
+    contributor_faction_percent['top_faction_percent'] = (contributor_faction_percent[['F', 'T', 'J', 'P', 'S']]).max(axis=1)
+    contributor_faction_percent['top_faction'] = (contributor_faction_percent[['F', 'T', 'J', 'P', 'S']]).idxmax(axis=1)
+
+    subset = contributor_faction_percent[contributor_faction_percent['count'] >= 7]
+    plt.figure()
+    plt.plot(subset['divergence'], subset['top_faction_percent'], 'ob')
+    for name, data in subset.iterrows():
+        top_faction = data['top_faction']
+        color = eternal.plot.get_faction_colors(top_faction)
+        plt.annotate(f'{name} ({top_faction})', (data['divergence'], data['top_faction_percent']), color=color[0])
+    plt.grid('on')
+    plt.xlabel('Divergence (0 = generalize, 1.0 = specialist)')
+    plt.ylabel('Maximum faction (%)')
+    plt.title('Generalist vs. specialist')
+
+
+def plot_inscribe_faction_usage(all_cards, FACTION):
+    faction_cards = all_cards[(all_cards.Type != 'Power') & ((all_cards['FactionMask'] & eternal.card.FACTION_BITS[FACTION]) != 0)].copy()
+    faction_cards['IsInscribe'] = faction_cards.CardText.str.contains('<b>Inscribe</b>')
+    faction_cards_by_deck = faction_cards.groupby('DeckId')['IsInscribe']
+    faction_deck_stats = pd.DataFrame({'total': faction_cards_by_deck.count(), 'inscribe': faction_cards_by_deck.sum()})
+    faction_deck_stats['percent'] = faction_deck_stats['inscribe'] / faction_deck_stats['total'] * 100.0
+    plt.figure()
+    ax = plt.subplot(2, 1, 1)
+    faction_deck_stats.boxplot(column=['percent'], by=['total'], ax=ax)
+    plt.ylabel('Percent (%) Inscribe')
+    plt.xlabel(f'Number of {FACTION} cards')
+    plt.title(None)
+    ax = plt.subplot(2, 1, 2)
+    faction_deck_stats['total'].value_counts().sort_index().plot(kind='bar', ax=ax)
+    plt.grid('on')
+    plt.ylabel('Number of decks')
+    plt.xlabel(f'Number of {FACTION} cards')
+
+
+def plot_stealth_unit_health_by_faction(all_cards):
+    plt.figure()
+    for i, COST in enumerate([3, 5]):
+        ax = plt.subplot(2, 1, i + 1)
+        stealth_units = all_cards[(all_cards.Type == 'Unit') & (all_cards.CardText.str.contains('<b>Stealth</b>')) & (all_cards.Cost == COST)].copy()
+        stealth_units['Faction'] = eternal.card.faction_strings(stealth_units['FactionMask'])
+        stealth_units_health_by_faction = stealth_units.pivot_table(index='Faction', columns=['Health'], values='Name', aggfunc='count')
+        sorted_stealth_units_faction_by_health = stealth_units_health_by_faction.loc[
+            stealth_units_health_by_faction.sum(axis=1).sort_values(ascending=False).index].transpose()
+        colors = eternal.plot.get_faction_colors(sorted_stealth_units_faction_by_health.columns)
+        sorted_stealth_units_faction_by_health.plot(kind='bar', stacked=True, grid=True, color=colors, legend=True, ax=ax)
+        plt.ylabel('Count of units')
+        plt.title('Health of {COST}-cost *Stealth* units'.format(COST=COST))
+
+
+def plot_faction_popularity(df_7win_decks, faction_type='MainFaction', n_deck_window=100):
+    """
+
+    Args:
+        df_7win_decks: Deck table (see Pipeline.card_tables)
+        faction_type:    'MainFaction', 'SplashFaction', or 'MainFaction + SplashFaction'
+    :return:
+    """
+    plt.figure()
+    if faction_type == 'MainFaction':
+        deck_factions = df_7win_decks['MainFaction'].str
+    elif faction_type == 'SplashFaction':
+        deck_factions = df_7win_decks['SplashFaction'].str
+    elif faction_type == 'MainFaction + SplashFaction':
+        deck_factions = (df_7win_decks['SplashFaction'] + df_7win_decks['SplashFaction']).str
+    for faction in eternal.card.FACTIONS:
+        color = eternal.plot.get_faction_colors(faction)
+        plt.plot(deck_factions.contains(faction).rolling(n_deck_window).mean() * 100.0, color=color[0], label=faction)
+    average_n_factions = deck_factions.len().mean()
+    plt.legend()
+    plt.title(f'Rolling {n_deck_window}-deck average of {faction_type} popularity')
+    plt.grid('on')
+    plt.ylabel('Percentage of decks')
+    xlim = plt.xlim()
+    plt.plot(plt.xlim(), [average_n_factions / 5.0 * 100] * 2, '--', color=(0.5, 0.5, 0.5))
+    plt.xlim(xlim)
+    plt.ylim(0.0, plt.ylim()[1])
+
+
+def plot_multifaction_popularity(df_7win_decks):
+    N_DECK_WINDOW = 100
+    deck_count_by_faction = df_7win_decks['MainFaction'].value_counts()
+    deck_popularity_by_faction = pd.DataFrame()
+    for faction, count in deck_count_by_faction.items():
+        if count >= MIN_DECK:
+            deck_popularity_by_faction[faction] = (df_7win_decks['MainFaction'] == faction).rolling(N_DECK_WINDOW).mean() * 100.0
+
+    plt.figure()
+    faction_order = deck_popularity_by_faction.iloc[-1].sort_values(ascending=False).index
+    ax = plt.subplot(2, 1, 1)
+    df_popularity = deck_popularity_by_faction[faction_order[:5]]
+    first_color = eternal.plot.get_faction_colors([x[0] for x in df_popularity.columns])
+    second_color = eternal.plot.get_faction_colors([x[1] for x in df_popularity.columns])
+    df_popularity.plot(grid='on', color=first_color, linewidth=6, alpha=0.5, ax=ax)
+    df_popularity.plot(grid='on', color=second_color, linewidth=1, ax=ax)
+    plt.ylabel('Percentage of decks')
+    plt.title('Deck popularity (top 1-5 popular factions today)')
+    ax.get_legend().remove()
+    ylim = plt.ylim()
+
+    ax = plt.subplot(2, 1, 2)
+    df_popularity = deck_popularity_by_faction[faction_order[5:]]
+    first_color = eternal.plot.get_faction_colors([x[0] for x in df_popularity.columns])
+    second_color = eternal.plot.get_faction_colors([x[1] for x in df_popularity.columns])
+    df_popularity.plot(grid='on', color=first_color, linewidth=6, alpha=0.5, ax=ax)
+    df_popularity.plot(grid='on', color=second_color, linewidth=1, ax=ax)
+    plt.ylabel('Percentage of decks')
+    plt.title('Deck popularity (top 6-10 popular factions today)')
+    ax.get_legend().remove()
+    plt.ylim(ylim)
+
+
+def plot_reports(pipeline):
+    """Draw the default plots of the 7-win analysis."""
+    tables = pipeline.run('card_tables')
+    df_7win_decks, all_cards = tables['decks'], tables['all_cards']
+    plot_power_by_player(pipeline.run('reports')['power_by_player_merged'])
+    plot_effective_power_by_faction(df_7win_decks)
+    plot_curve_by_faction(all_cards, df_7win_decks)
+    plot_unit_health_by_faction(all_cards)
+    plot_faction_popularity(df_7win_decks, 'MainFaction', 100)
+    plot_faction_popularity(df_7win_decks, 'SplashFaction', 100)
+    plot_contributor_faction_usage(all_cards, df_7win_decks)
+    plt.show()
+
+
+def main(argv=None):
+    """Command line interface: run (selected) stages of the 7-win analysis.
+
+    Without --stages, every stage is run, the reports are printed, card_counts.csv is written and the plots are
+    drawn (unless --no-plots). With --stages only the given stages (and whatever they need) are run.
+    """
+    parser = argparse.ArgumentParser(description="Analysis of FarmingEternal's 7-win decks")
+    parser.add_argument('--csv', default=CSV_PATH, help='7-win CSV (default: %(default)s)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='Stage cache directory (default: %(default)s)')
+    parser.add_argument('--no-cache', action='store_true', help='Neither read nor write the stage cache')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), help='Only run these stages')
+    parser.add_argument('--force', action='store_true', help='Re-run the selected stages even if they are cached')
+    parser.add_argument('--draft-format', default=DRAFT_FORMAT, help='Draft format of the offer rates (default: %(default)s)')
+    parser.add_argument('--output', default='card_counts.csv', help='Card counts output CSV (default: %(default)s)')
+    parser.add_argument('--jobs', type=int, default=1, help='Processes parsing the decks (0 for all CPUs, default: %(default)s)')
+    parser.add_argument('--no-plots', action='store_true', help="Don't draw the plots")
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline(args.csv, cache_dir=args.cache_dir, draft_format=args.draft_format,
+                        use_cache=not args.no_cache, n_jobs=args.jobs or None)
+    if args.stages:
+        for stage in args.stages:
+            cached = pipeline.use_cache and not args.force and pipeline.is_cached(stage)
+            pipeline.run(stage, force=args.force)
+            print(f"{stage}: {'cached' if cached else 'done'} ({pipeline.key(stage)[:12]})")
+        return pipeline
+
+    for stage in STAGES:
+        pipeline.run(stage, force=args.force)
+    print_reports(pipeline.run('reports'))
+    display_cards_in_contention(pipeline.run('offer_rates'), 'open', 'protector')
+    pipeline.run('offer_rates')[CARD_COUNT_OUTPUT_COLS].to_csv(args.output)
+    if not args.no_plots:
+        plot_reports(pipeline)
+    return pipeline
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse
+import scipy.sparse.csgraph
+
+import eternal.corpus
+
+# Decks are compared as multisets of cards: every copy of a card is its own element (card position, copy number)
+MAX_COPIES = 32
+# Universal hashing h(x) = (a * x + b) mod p with a Mersenne prime (a * x fits in 64 bits for the element range)
+MERSENNE_PRIME = (1 << 31) - 1
+# Number of hashed elements processed at a time when computing signatures (bounds peak memory)
+CHUNK_ELEMENTS = 1 << 16
+
+
+class DeckSimilarityIndex:
+    """Near-duplicate deck search using MinHash signatures with LSH banding.
+
+    Each deck is reduced to a MinHash signature of num_perm values estimating the Jaccard similarity of the decks
+    (as multisets of cards). Signatures are split into bands of rows_per_band values and decks sharing any band
+    become candidates, so queries only look at a handful of decks instead of the whole corpus. Candidates are
+    then filtered on their estimated similarity.
+
+    With b bands of r rows decks of similarity s are candidates with probability 1 - (1 - s^r)^b; the default of
+    32 bands of 4 rows catches ~95% of decks with similarity 0.6 and ~100% above 0.7.
+    """
+
+    def __init__(self, collection=None, num_perm=128, rows_per_band=4, seed=0):
+        """DeckSimilarityIndex object
+
+        Args:
+            collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+            num_perm: Number of hash functions (length of the signatures)
+            rows_per_band: Number of signature values per LSH band (num_perm must be a multiple)
+            seed: Seed of the hash functions
+        """
+        assert num_perm % rows_per_band == 0
+        self.collection = collection
+        self.num_perm = num_perm
+        self.rows_per_band = rows_per_band
+        self.n_bands = num_perm // rows_per_band
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 1 << 63, size=rows_per_band, dtype=np.uint64) | np.uint64(1)
+
+        self.decks = pd.Index([])
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._keys = np.zeros((0, self.n_bands), dtype=np.uint64)
+        self._sorted = None
+
+    @classmethod
+    def from_decks(cls, decks, **kwargs):
+        """Build the index from a DeckMatrix or Deck objects (e.g. from eternal.ewc.parse_deckbuilder_url).
+
+        Args:
+            decks: eternal.corpus.DeckMatrix or iterable (or pandas Series) of eternal.deck.Deck
+            **kwargs: Passed on to DeckSimilarityIndex()
+
+        Returns: DeckSimilarityIndex
+        """
+        index = cls(**kwargs)
+        index.add_decks(decks)
+        return index
+
+    def _to_deck_matrix(self, decks):
+        if not isinstance(decks, eternal.corpus.DeckMatrix):
+            decks = eternal.corpus.DeckMatrix.from_decks(decks, collection=self.collection)
+        if self.collection is None:
+            self.collection = decks.collection
+        assert decks.collection is self.collection
+        return decks
+
+    def _matrix_signatures(self, matrix):
+        """MinHash signatures (n_decks x num_perm) of the rows of a deck x card count matrix."""
+        matrix = scipy.sparse.csr_matrix(matrix)
+        counts = np.minimum(matrix.data, MAX_COPIES).astype(np.int64)
+        positions = np.repeat(matrix.indices.astype(np.int64), counts)
+        run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        elements = (positions * MAX_COPIES + (np.arange(len(positions)) - run_starts)).astype(np.uint64)
+
+        deck_rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+        deck_sizes = np.bincount(deck_rows, weights=counts, minlength=matrix.shape[0]).astype(np.int64)
+        deck_starts = np.concatenate([[0], np.cumsum(deck_sizes)]).astype(np.int64)
+
+        signatures = np.full((matrix.shape[0], self.num_perm), MERSENNE_PRIME, dtype=np.uint32)
+        ix_deck = 0
+        while ix_deck < matrix.shape[0]:
+            # Hash as many whole decks as fit in a chunk
+            stop = max(np.searchsorted(deck_starts, deck_starts[ix_deck] + CHUNK_ELEMENTS, side='right') - 1,
+                       ix_deck + 1)
+            chunk = elements[deck_starts[ix_deck]:deck_starts[stop]]
+            if len(chunk):
+                hashes = (self._a[:, None] * chunk[None, :] + self._b[:, None]) % np.uint64(MERSENNE_PRIME)
+                starts = deck_starts[ix_deck:stop] - deck_starts[ix_deck]
+                non_empty = deck_sizes[ix_deck:stop] > 0
+                minimums = np.minimum.reduceat(hashes, starts[non_empty], axis=1)
+                signatures[ix_deck:stop][non_empty] = minimums.T
+            ix_deck = stop
+        return signatures
+
+    def _band_keys(self, signatures):
+        """Hash each band of the signatures into a single 64-bit key (n_decks x n_bands)."""
+        bands = signatures.reshape(len(signatures), self.n_bands, self.rows_per_band).astype(np.uint64)
+        return (bands * self._band_mix).sum(axis=2)  # Wraps around (mod 2^64)
+
+    def add_decks(self, decks):
+        """Add decks to the index.
+
+        Args:
+            decks: eternal.corpus.DeckMatrix or iterable (or pandas Series) of eternal.deck.Deck
+        """
+        deck_matrix = self._to_deck_matrix(decks)
+        signatures = self._matrix_signatures(deck_matrix.matrix)
+        self.signatures = np.concatenate([self.signatures, signatures])
+        self._keys = np.concatenate([self._keys, self._band_keys(signatures)])
+        self._sorted = None
+        self.decks = self.decks.append(deck_matrix.decks)
+
+    def _buckets(self):
+        """Band keys sorted per band (n_bands x n_decks) and the matching deck rows, sorted on first use."""
+        if self._sorted is None:
+            rows = np.argsort(self._keys, axis=0, kind='stable').T
+            self._sorted = (np.take_along_axis(self._keys.T, rows, axis=1), rows)
+        return self._sorted
+
+    def signature(self, deck):
+        """MinHash signature of a single Deck."""
+        if self.collection is None:
+            self.collection = deck.collection
+        matrix = scipy.sparse.csr_matrix((deck.main_counts, (np.zeros(len(deck.main_ids), dtype=np.int64),
+                                                             deck.main_positions)),
+                                         shape=(1, len(self.collection.cards)))
+        return self._matrix_signatures(matrix)[0]
+
+    def similar(self, deck, threshold=0.8):
+        """Find the decks in the index similar to a deck.
+
+        Args:
+            deck: eternal.deck.Deck (e.g. from eternal.ewc.parse_deckbuilder_url)
+            threshold: Minimum (estimated) Jaccard similarity
+
+        Returns: List of (deck label, similarity) sorted by decreasing similarity
+        """
+        signature = self.signature(deck)
+        sorted_keys, rows = self._buckets()
+        candidates = []
+        for band, key in enumerate(self._band_keys(signature[None, :])[0]):
+            start = np.searchsorted(sorted_keys[band], key, side='left')
+            stop = np.searchsorted(sorted_keys[band], key, side='right')
+            candidates.append(rows[band, start:stop])
+        candidates = np.unique(np.concatenate(candidates))
+        if not len(candidates):
+            return []
+        similarity = (self.signatures[candidates] == signature).mean(axis=1)
+        keep = similarity >= threshold
+        candidates, similarity = candidates[keep], similarity[keep]
+        order = np.lexsort((candidates, -similarity))
+        return list(zip(self.decks[candidates[order]], similarity[order].tolist()))
+
+    def candidate_pairs(self):
+        """All pairs of decks sharing at least one LSH band.
+
+        Returns: (n_pairs x 2) array of deck rows with row_a < row_b
+        """
+        pairs = []
+        for band_keys, band_rows in zip(*self._buckets()):
+            bucket_starts = np.flatnonzero(np.r_[True, band_keys[1:] != band_keys[:-1]])
+            bucket_sizes = np.diff(np.r_[bucket_starts, len(band_keys)])
+            for start, size in zip(bucket_starts[bucket_sizes > 1], bucket_sizes[bucket_sizes > 1]):
+                rows = band_rows[start:start + size]
+                a, b = np.triu_indices(size, k=1)
+                pairs.append(np.column_stack([np.minimum(rows[a], rows[b]), np.maximum(rows[a], rows[b])]))
+        if not pairs:
+            return np.zeros((0, 2), dtype=np.int64)
+        return np.unique(np.concatenate(pairs), axis=0)
+
+    def clusters(self, threshold=0.8):
+        """Group the decks in the index into clusters of near-duplicates.
+
+        Decks are linked when their estimated similarity is at least threshold and clusters are the connected
+        components of those links.
+
+        Args:
+            threshold: Minimum (estimated) Jaccard similarity of linked decks
+
+        Returns: Series of cluster numbers indexed by deck label (singletons get their own cluster)
+        """
+        pairs = self.candidate_pairs()
+        similarity = (self.signatures[pairs[:, 0]] == self.signatures[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[similarity >= threshold]
+        graph = scipy.sparse.coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])),
+                                        shape=(len(self.decks), len(self.decks)))
+        _, labels = scipy.sparse.csgraph.connected_components(graph, directed=False)
+        return pd.Series(labels, index=self.decks, name='Cluster')
@@ -0,0 +1,454 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import eternal.card
+import eternal.corpus
+import eternal.ewc
+
+# Deck-builder URL column of FarmingEternal's 7-win run breakdown (see 7win.py)
+URL_COLUMN = 'EWC-P'
+CONTRIBUTOR_COLUMN = 'Contributor'
+CHUNK_SIZE = 1000
+
+STATS_VERSION = 3
+# Bytes before the end of the counted rows of a CSV whose SHA-256 is checked on update (see update_deck_stats)
+TAIL_DIGEST_SIZE = 1 << 20
+
+# Per-deck values kept as histograms by deck main faction (see DeckStats.deck_values)
+DECK_VALUES = ['NumPower', 'EffectivePower', 'UnitCount']
+# Per-deck values that are missing rather than 0 for decks without any (as in eternal.sevenwin's card_tables)
+ZERO_IS_MISSING = {'NumPower', 'UnitCount'}
+
+
+def _widen(histogram, width):
+    """Pad a (rows x values) histogram with zero counts up to width values."""
+    return np.pad(histogram, ((0, 0), (0, width - histogram.shape[1])))
+
+
+def _add_histograms(histogram, other):
+    width = max(histogram.shape[1], other.shape[1])
+    return _widen(histogram, width) + _widen(other, width)
+
+
+def _add_to_histogram(histogram, rows, values):
+    """Count values (one per row) in a (rows x values) histogram, widening it as needed."""
+    values = np.asarray(values, dtype=np.int64)
+    if len(values) and values.max() >= histogram.shape[1]:
+        histogram = _widen(histogram, values.max() + 1)
+    np.add.at(histogram, (rows, values), 1)
+    return histogram
+
+
+class DeckStats:
+    """Running aggregates over a stream of decks (e.g. the 7-win decks).
+
+    Decks are folded in one DeckMatrix at a time (see update()) and only fixed size totals are kept, so memory
+    does not grow with the number of decks and the results can be read at any point while decks are coming in:
+
+        card_counts     copies of each card (n_cards)
+        deck_counts     decks playing each card (n_cards)
+        splash_counts   splashed copies of each card (n_cards)
+        faction_decks   decks by (main faction mask, splash faction mask) (32 x 32)
+        deck_values     histogram of each of DECK_VALUES by deck main faction mask (32 x max value + 1)
+        contributor_*   number of decks and DECK_VALUES histograms by contributor (as written in the CSV)
+
+    The aggregates can be saved and loaded again (see save(), load() and update_deck_stats()) so new decks can be
+    added without going over the previous ones again.
+    """
+
+    def __init__(self, collection=None):
+        """DeckStats object
+
+        Args:
+            collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+        """
+        self.collection = collection if collection is not None else eternal.card.ALL
+        n_cards = len(self.collection.cards)
+        n_masks = len(eternal.card.FACTION_MASK_STRINGS)
+        self.n_decks = 0
+        self.n_errors = 0
+        self.card_counts = np.zeros(n_cards, dtype=np.int64)
+        self.deck_counts = np.zeros(n_cards, dtype=np.int64)
+        self.splash_counts = np.zeros(n_cards, dtype=np.int64)
+        self.faction_decks = np.zeros((n_masks, n_masks), dtype=np.int64)
+        self.deck_values = dict((name, np.zeros((n_masks, 1), dtype=np.int64)) for name in DECK_VALUES)
+        self.contributors = []
+        self.contributor_decks = np.zeros(0, dtype=np.int64)
+        self.contributor_values = dict((name, np.zeros((0, 1), dtype=np.int64)) for name in DECK_VALUES)
+        self.source = None
+
+    def _contributor_rows(self, contributors):
+        """Row of each contributor in the contributor tables (adding new contributors)."""
+        rows = dict((contributor, row) for row, contributor in enumerate(self.contributors))
+        for contributor in contributors:
+            if contributor not in rows:
+                rows[contributor] = len(self.contributors)
+                self.contributors.append(contributor)
+        n_new = len(self.contributors) - len(self.contributor_decks)
+        if n_new:
+            self.contributor_decks = np.pad(self.contributor_decks, (0, n_new))
+            for name, histogram in self.contributor_values.items():
+                self.contributor_values[name] = np.pad(histogram, ((0, n_new), (0, 0)))
+        return np.array([rows[contributor] for contributor in contributors], dtype=np.int64)
+
+    def update(self, deck_matrix, n_errors=0, contributors=None):
+        """Fold a batch of decks into the aggregates.
+
+        Args:
+            deck_matrix: eternal.corpus.DeckMatrix of the new decks
+            n_errors: Number of decks of the batch that couldn't be decoded (and aren't in deck_matrix)
+            contributors: (optional) Series of the contributor of each deck indexed by deck label
+        """
+        assert deck_matrix.collection is self.collection
+        matrix = deck_matrix.matrix
+        self.n_decks += len(deck_matrix)
+        self.n_errors += n_errors
+        self.card_counts += np.asarray(matrix.sum(axis=0)).ravel()
+        self.deck_counts += np.asarray((matrix > 0).sum(axis=0)).ravel()
+        self.splash_counts += np.asarray(deck_matrix.splash_matrix().sum(axis=0)).ravel()
+
+        masks = deck_matrix.deck_faction_masks()
+        main_masks, splash_masks = masks['MainMask'].to_numpy(), masks['SplashMask'].to_numpy()
+        np.add.at(self.faction_decks, (main_masks, splash_masks), 1)
+
+        is_power = self.collection.values('Type') == 'Power'
+        is_unit = self.collection.values('Type') == 'Unit'
+        values = {'NumPower': deck_matrix.deck_aggregate(is_power),
+                  'EffectivePower': deck_matrix.deck_aggregate('PowerCount'),
+                  'UnitCount': deck_matrix.deck_aggregate(is_unit)}
+        for name, deck_values in values.items():
+            self.deck_values[name] = _add_to_histogram(self.deck_values[name], main_masks, deck_values.to_numpy())
+
+        if contributors is not None:
+            contributors = contributors.reindex(deck_matrix.decks)
+            has_contributor = contributors.notna().to_numpy()
+            rows = self._contributor_rows(contributors[has_contributor].astype(str).tolist())
+            np.add.at(self.contributor_decks, rows, 1)
+            for name, deck_values in values.items():
+                self.contributor_values[name] = _add_to_histogram(self.contributor_values[name], rows,
+                                                                  deck_values.to_numpy()[has_contributor])
+
+    def merge(self, other):
+        """Add the aggregates of another DeckStats (over the same collection) to this one."""
+        assert other.collection is self.collection
+        self.n_decks += other.n_decks
+        self.n_errors += other.n_errors
+        self.card_counts += other.card_counts
+        self.deck_counts += other.deck_counts
+        self.splash_counts += other.splash_counts
+        self.faction_decks += other.faction_decks
+        for name, histogram in other.deck_values.items():
+            self.deck_values[name] = _add_histograms(self.deck_values[name], histogram)
+
+        rows = self._contributor_rows(other.contributors)
+        np.add.at(self.contributor_decks, rows, other.contributor_decks)
+        for name, histogram in other.contributor_values.items():
+            width = max(histogram.shape[1], self.contributor_values[name].shape[1])
+            self.contributor_values[name] = _widen(self.contributor_values[name], width)
+            np.add.at(self.contributor_values[name], rows, _widen(histogram, width))
+
+    def _card_series(self, counts):
+        counts = pd.Series(counts, index=self.collection.data.index)
+        return counts[counts > 0]
+
+    def card_count_series(self):
+        """Total number of copies of each card (see eternal.corpus.DeckMatrix.card_counts)."""
+        return self._card_series(self.card_counts)
+
+    def deck_count_series(self):
+        """Number of decks playing each card (see eternal.corpus.DeckMatrix.deck_counts)."""
+        return self._card_series(self.deck_counts)
+
+    def splash_count_series(self):
+        """Total number of splashed copies of each card (see eternal.corpus.DeckMatrix.splash_counts)."""
+        return self._card_series(self.splash_counts)
+
+    def main_faction_counts(self):
+        """Number of decks by main faction string (like df_7win_decks['MainFaction'].value_counts()).
+
+        Returns: Series indexed by main faction string sorted by decreasing count
+        """
+        counts = pd.Series(self.faction_decks.sum(axis=1), index=eternal.card.FACTION_MASK_STRINGS)
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+    def playable_deck_counts(self):
+        """Number of decks able to play a card of each faction mask (see DeckMatrix.playable_deck_counts).
+
+        Returns: numpy array indexed by faction mask
+        """
+        all_masks = np.arange(len(self.faction_decks))
+        deck_masks = np.zeros(len(all_masks), dtype=np.int64)
+        np.add.at(deck_masks, all_masks[:, None] | all_masks[None, :], self.faction_decks)
+        is_covered = (all_masks[:, None] & ~all_masks[None, :]) == 0  # [card mask, deck mask]
+        return is_covered @ deck_masks
+
+    def faction_frequencies(self, factions):
+        """Fraction of decks whose main + splash faction string contains each faction string.
+
+        Args:
+            factions: Iterable of faction strings e.g. card factions from eternal.card.faction_strings
+
+        Returns: Dictionary of faction string -> fraction of decks ('None' is 1.0, the others 0.0 without decks)
+        """
+        deck_factions = eternal.card.FACTION_MASK_STRINGS[:, None] + eternal.card.FACTION_MASK_STRINGS[None, :]
+        frequencies = {}
+        for faction in factions:
+            has_faction = np.vectorize(lambda x: faction in x, otypes=[bool])(deck_factions)
+            frequencies[faction] = self.faction_decks[has_faction].sum() / self.n_decks if self.n_decks else 0.0
+        frequencies['None'] = 1.0
+        return frequencies
+
+    def describe(self, name):
+        """Count, mean, min and max of a per-deck value by deck main faction.
+
+        Args:
+            name: One of DECK_VALUES (decks with a 0 value are left out for the ZERO_IS_MISSING ones)
+
+        Returns: DataFrame indexed by main faction string with columns count, mean, min and max
+        (like df_7win_decks.groupby('MainFaction')[name].describe()[['count', 'mean', 'min', 'max']])
+        """
+        return _describe_histogram(self.deck_values[name], eternal.card.FACTION_MASK_STRINGS, 'MainFaction',
+                                   zero_is_missing=name in ZERO_IS_MISSING)
+
+    def canonical_contributors(self):
+        """Map each contributor to the most common spelling of its name ignoring case (like 7win.imode).
+
+        Returns: Dictionary of contributor -> canonical contributor
+        """
+        spellings = pd.DataFrame({'Contributor': self.contributors, 'Decks': self.contributor_decks})
+        spellings['Key'] = spellings['Contributor'].str.lower()
+        # Most decks first, ties going to the first spelling in sort order (as pandas.Series.mode)
+        spellings = spellings.sort_values(['Decks', 'Contributor'], ascending=[False, True], kind='stable')
+        canonical = spellings.groupby('Key')['Contributor'].first()
+        return dict(zip(self.contributors, canonical[spellings.set_index('Contributor').loc[self.contributors, 'Key']]))
+
+    def describe_by_contributor(self, name):
+        """Count, mean, min and max of a per-deck value by (canonical) contributor.
+
+        Args:
+            name: One of DECK_VALUES (decks with a 0 value are left out for the ZERO_IS_MISSING ones)
+
+        Returns: DataFrame indexed by contributor with columns count, mean, min and max
+        (like df_7win_decks.groupby('Contributor')[name].describe()[['count', 'mean', 'min', 'max']])
+        """
+        canonical = self.canonical_contributors()
+        return _describe_histogram(self.contributor_values[name], [canonical[x] for x in self.contributors],
+                                   'Contributor', zero_is_missing=name in ZERO_IS_MISSING)
+
+    def save(self, path):
+        """Save the aggregates to a single .npz file (written atomically).
+
+        Args:
+            path: Path of the file
+        """
+        meta = {'version': STATS_VERSION, 'n_decks': self.n_decks, 'n_errors': self.n_errors,
+                'contributors': self.contributors, 'source': self.source}
+        arrays = {'card_ids': np.array(self.collection.data.index.tolist(), dtype=str),
+                  'card_counts': self.card_counts, 'deck_counts': self.deck_counts,
+                  'splash_counts': self.splash_counts, 'faction_decks': self.faction_decks,
+                  'contributor_decks': self.contributor_decks}
+        for name in DECK_VALUES:
+            arrays[f'deck_values.{name}'] = self.deck_values[name]
+            arrays[f'contributor_values.{name}'] = self.contributor_values[name]
+
+        dirname = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp-', suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as fout:
+                np.savez(fout, meta=np.array(json.dumps(meta)), **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, collection=None):
+        """Load aggregates saved with save().
+
+        Args:
+            path: Path of the file
+            collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL), it may have more
+                        cards than when the aggregates were saved
+
+        Returns: DeckStats
+        """
+        stats = cls(collection=collection)
+        with np.load(path) as saved:
+            meta = json.loads(str(saved['meta']))
+            assert meta['version'] == STATS_VERSION
+            positions = stats.collection.data.index.get_indexer(saved['card_ids'])
+            if (positions < 0).any():
+                raise KeyError(f"Unknown card ids: {list(saved['card_ids'][positions < 0])}")
+            for name in ['card_counts', 'deck_counts', 'splash_counts']:
+                getattr(stats, name)[positions] = saved[name]
+            stats.faction_decks = saved['faction_decks']
+            stats.contributor_decks = saved['contributor_decks']
+            for name in DECK_VALUES:
+                stats.deck_values[name] = saved[f'deck_values.{name}']
+                stats.contributor_values[name] = saved[f'contributor_values.{name}']
+        stats.n_decks = meta['n_decks']
+        stats.n_errors = meta['n_errors']
+        stats.contributors = meta['contributors']
+        stats.source = meta['source']
+        return stats
+
+
+def _describe_histogram(histogram, labels, index_name, zero_is_missing=False):
+    """count/mean/min/max (as pandas describe) of histogram rows, summing the rows with the same label.
+
+    With zero_is_missing the 0 values are counted as missing (NaN) values: labels with only 0 values get a count of 0
+    and NaN statistics."""
+    histogram = pd.DataFrame(histogram, index=pd.Index(labels, name=index_name)).groupby(level=0).sum()
+    histogram = histogram[histogram.sum(axis=1) > 0]
+    counts = histogram.to_numpy().copy()
+    if zero_is_missing:
+        counts[:, 0] = 0
+    n_values = counts.sum(axis=1)
+    is_present = counts > 0
+    has_values = n_values > 0
+    return pd.DataFrame({'count': n_values.astype('float64'),
+                         'mean': np.divide(counts @ np.arange(counts.shape[1]), n_values,
+                                           out=np.full(len(counts), np.nan), where=has_values),
+                         'min': np.where(has_values, is_present.argmax(axis=1), np.nan),
+                         'max': np.where(has_values, counts.shape[1] - 1 - is_present[:, ::-1].argmax(axis=1), np.nan)},
+                        index=histogram.index)
+
+
+def read_deck_chunks(csv_path, chunksize=CHUNK_SIZE, url_column=URL_COLUMN, collection=None, first_row=0, **kwargs):
+    """Read a deck CSV in chunks and decode the deck-builder URLs of each chunk.
+
+    Only one chunk of rows (and its decks) is in memory at a time.
+
+    Args:
+        csv_path: Path (or buffer) of the CSV with one deck per row
+        chunksize: Number of rows per chunk
+        url_column: Column with the deck-builder URLs
+        collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+        first_row: Row number of the first row of the CSV (for reading a CSV from the middle)
+        **kwargs: Passed on to pandas.read_csv
+
+    Yields: (rows, deck_matrix, n_errors) for each chunk with
+        rows        - DataFrame of the CSV rows of the chunk (indexed by row number)
+        deck_matrix - eternal.corpus.DeckMatrix of the decks that could be decoded (labelled by row number)
+        n_errors    - Number of decks that couldn't be decoded
+    """
+    collection = collection if collection is not None else eternal.card.ALL
+    for rows in pd.read_csv(csv_path, chunksize=chunksize, **kwargs):
+        rows.index = rows.index + first_row
+        table = eternal.ewc.parse_deckbuilder_urls(rows[url_column], collection=collection)
+        n_errors = table.loc[table['Error'].notna(), 'Deck'].nunique()
+        yield rows, eternal.corpus.DeckMatrix.from_table(table, collection=collection), n_errors
+
+
+def stream_deck_stats(csv_path, stats=None, chunksize=CHUNK_SIZE, url_column=URL_COLUMN,
+                      contributor_column=CONTRIBUTOR_COLUMN, collection=None, **kwargs):
+    """Fold a deck CSV into running DeckStats one chunk at a time.
+
+    The same DeckStats object is yielded after every chunk so partial results can be used while the rest of
+    the CSV is still being read, e.g.
+
+        for stats in stream_deck_stats('7win_decks_set12.csv'):
+            print(stats.n_decks, stats.main_faction_counts().head())
+
+    Args:
+        csv_path: Path (or buffer) of the CSV with one deck per row
+        stats: (optional) DeckStats to add the decks to (a new one is created by default)
+        chunksize: Number of rows per chunk
+        url_column: Column with the deck-builder URLs
+        contributor_column: Column with the deck contributors (not counted if the CSV doesn't have it)
+        collection: (optional) CardCollection of the decks (defaults to that of stats or eternal.card.ALL)
+        **kwargs: Passed on to read_deck_chunks / pandas.read_csv
+
+    Yields: DeckStats updated with each chunk
+    """
+    if stats is None:
+        stats = DeckStats(collection=collection)
+    for rows, deck_matrix, n_errors in read_deck_chunks(csv_path, chunksize=chunksize, url_column=url_column,
+                                                        collection=stats.collection, **kwargs):
+        stats.update(deck_matrix, n_errors=n_errors, contributors=rows.get(contributor_column))
+        yield stats
+
+
+def read_deck_stats(csv_path, **kwargs):
+    """Compute the DeckStats of a whole deck CSV in bounded memory (see stream_deck_stats).
+
+    Returns: DeckStats
+    """
+    stats = None
+    for stats in stream_deck_stats(csv_path, **kwargs):
+        pass
+    return stats if stats is not None else DeckStats(collection=kwargs.get('collection'))
+
+
+def _csv_records_end(data):
+    """Length of the complete CSV records (ending with a newline outside of quotes) at the start of data."""
+    chars = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(chars == ord('\n'))
+    is_quoted = np.cumsum(chars == ord('"'))[newlines] % 2 == 1
+    ends = newlines[~is_quoted]
+    return int(ends[-1]) + 1 if len(ends) else 0
+
+
+def _window_digest(fin, start, stop):
+    """SHA-256 hex digest of the bytes [start, stop) of a binary file."""
+    fin.seek(start)
+    return hashlib.sha256(fin.read(stop - start)).hexdigest()
+
+
+def update_deck_stats(csv_path, stats_path, collection=None, **kwargs):
+    """Add the decks appended to a deck CSV since the last update to the DeckStats saved at stats_path.
+
+    Only the rows after the ones already counted are read and parsed (the byte offset of the end of the counted rows
+    is saved with the stats), so an update costs O(new decks). The CSV is expected to only ever be appended to: the
+    size and modification time of the CSV, the SHA-256 of its header and of the last TAIL_DIGEST_SIZE counted bytes
+    are saved too. An unchanged CSV is not read at all, and a CSV that is shorter than the counted rows or whose
+    header or counted tail changed raises ValueError (rewrites of rows further back are not detected). A trailing
+    incomplete record (no newline outside of quotes yet) is left for the next update (it may still be being written).
+
+    Args:
+        csv_path: Path of the CSV with one deck per row (only ever appended to)
+        stats_path: Path of the saved DeckStats (created if it doesn't exist)
+        collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+        **kwargs: Passed on to stream_deck_stats
+
+    Returns: Updated DeckStats (which is also saved to stats_path)
+    """
+    if os.path.exists(stats_path):
+        stats = DeckStats.load(stats_path, collection=collection)
+    else:
+        stats = DeckStats(collection=collection)
+    source = stats.source
+    stat = os.stat(csv_path)  # Before reading: rows appended meanwhile are picked up by the next update
+    if source is not None and (stat.st_size, stat.st_mtime_ns) == (source['size'], source['mtime_ns']):
+        return stats
+
+    with open(csv_path, 'rb') as fin:
+        header = fin.readline()
+        offset = max(source['offset'], len(header)) if source is not None else len(header)
+        if source is not None:
+            tail_sha256 = _window_digest(fin, max(len(header), offset - TAIL_DIGEST_SIZE), offset)
+            if stat.st_size < offset or hashlib.sha256(header).hexdigest() != source['header_sha256'] or \
+                    tail_sha256 != source['tail_sha256']:
+                raise ValueError(f"{csv_path} has changed (not only appended to) since {stats_path} was updated")
+        fin.seek(offset)
+        new_rows = fin.read()
+        new_rows = new_rows[:_csv_records_end(new_rows)]
+        new_offset = offset + len(new_rows)
+        tail_sha256 = _window_digest(fin, max(len(header), new_offset - TAIL_DIGEST_SIZE), new_offset)
+
+    rows = source['rows'] if source is not None else 0
+    n_decks = stats.n_decks + stats.n_errors
+    if new_rows:
+        for stats in stream_deck_stats(io.BytesIO(header + new_rows), stats=stats, first_row=rows, **kwargs):
+            pass
+    stats.source = {'rows': rows + stats.n_decks + stats.n_errors - n_decks, 'offset': new_offset,
+                    'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                    'header_sha256': hashlib.sha256(header).hexdigest(), 'tail_sha256': tail_sha256}
+    stats.save(stats_path)
+    return stats
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+import eternal.card
+import eternal.corpus
+
+SCORES = ['lift', 'pmi']
+
+
+class CooccurrenceIndex:
+    """Card co-occurrence (synergy) index built from a corpus of decks.
+
+    Keeps the number of decks playing each card and each pair of cards (sparse, card x card) which can be updated
+    with new decks at any time. Pair scores are:
+
+        lift(a, b) = P(a, b) / (P(a) P(b)) = n_ab * n_decks / (n_a * n_b)
+        pmi(a, b)  = log(lift(a, b))
+
+    The top-k neighbors of a card are computed from its row of the co-occurrence matrix the first time they are
+    asked for and cached until more decks are added, so repeated neighbors() calls are a dictionary lookup.
+    """
+
+    def __init__(self, collection=None, score='lift', min_count=2, include_power=False, top_k=20):
+        """CooccurrenceIndex object
+
+        Args:
+            collection: (optional) CardCollection of the decks (defaults to eternal.card.ALL)
+            score: Pair score to rank neighbors by ('lift' or 'pmi')
+            min_count: Minimum number of decks a pair of cards must share to be scored
+            include_power: Whether power cards (sigils etc.) are counted
+            top_k: Number of neighbors cached per card
+        """
+        assert score in SCORES
+        self.collection = collection if collection is not None else eternal.card.ALL
+        self.score = score
+        self.min_count = min_count
+        self.top_k = top_k
+        self.n_decks = 0
+        n_cards = len(self.collection.cards)
+        self.card_decks = np.zeros(n_cards, dtype=np.int64)
+        self.pair_decks = scipy.sparse.csr_matrix((n_cards, n_cards), dtype=np.int64)
+        self._is_counted = np.ones(n_cards, dtype=bool)
+        if not include_power:
+            self._is_counted = self.collection.values('Type') != 'Power'
+        self._neighbors = {}
+
+    @classmethod
+    def from_decks(cls, decks, **kwargs):
+        """Build the index from a DeckMatrix, Deck objects or deck-builder URLs.
+
+        Args:
+            decks: eternal.corpus.DeckMatrix, iterable of eternal.deck.Deck or iterable of URLs
+            **kwargs: Passed on to CooccurrenceIndex()
+
+        Returns: CooccurrenceIndex
+        """
+        deck_matrix = cls._to_deck_matrix(decks, kwargs.get('collection'))
+        kwargs['collection'] = deck_matrix.collection
+        index = cls(**kwargs)
+        index.add_decks(deck_matrix)
+        return index
+
+    @staticmethod
+    def _to_deck_matrix(decks, collection):
+        if isinstance(decks, eternal.corpus.DeckMatrix):
+            return decks
+        decks = list(decks)
+        if decks and isinstance(decks[0], str):
+            return eternal.corpus.DeckMatrix.from_urls(decks, collection=collection)
+        return eternal.corpus.DeckMatrix.from_decks(decks, collection=collection)
+
+    def add_decks(self, decks):
+        """Add decks to the index (only the new decks are processed).
+
+        Args:
+            decks: eternal.corpus.DeckMatrix, iterable of eternal.deck.Deck or iterable of URLs
+        """
+        deck_matrix = self._to_deck_matrix(decks, self.collection)
+        assert deck_matrix.collection is self.collection
+        presence = (deck_matrix.matrix > 0).astype(np.int64).tocsr()
+        presence.data[~self._is_counted[presence.indices]] = 0
+        presence.eliminate_zeros()
+
+        self.n_decks += presence.shape[0]
+        self.card_decks += np.asarray(presence.sum(axis=0)).ravel()
+        self.pair_decks = (self.pair_decks + (presence.T @ presence)).tocsr()
+        self._neighbors = {}
+
+    def _row_scores(self, row):
+        """Scores of every card co-occurring with the card at position row (above min_count, excluding itself)."""
+        start, stop = self.pair_decks.indptr[row], self.pair_decks.indptr[row + 1]
+        columns = self.pair_decks.indices[start:stop]
+        pair_counts = self.pair_decks.data[start:stop]
+        keep = (columns != row) & (pair_counts >= self.min_count)
+        columns, pair_counts = columns[keep], pair_counts[keep]
+        scores = pair_counts * self.n_decks / (self.card_decks[row] * self.card_decks[columns])
+        if self.score == 'pmi':
+            scores = np.log(scores)
+        return columns, scores
+
+    def _top_neighbors(self, row, k):
+        columns, scores = self._row_scores(row)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            columns, scores = columns[top], scores[top]
+        order = np.lexsort((columns, -scores))  # Highest score first, ties broken by card order
+        return columns[order], scores[order]
+
+    def neighbors(self, card_id, k=10):
+        """Cards most often played alongside a card.
+
+        Args:
+            card_id: Card id e.g. '11-4'
+            k: Number of neighbors
+
+        Returns: List of (card_id, score) tuples sorted by decreasing score
+        """
+        row = self.collection.data.index.get_loc(card_id)
+        if k > self.top_k:
+            columns, scores = self._top_neighbors(row, k)
+            return list(zip(self.collection.data.index[columns], scores.tolist()))
+        if row not in self._neighbors:
+            columns, scores = self._top_neighbors(row, self.top_k)
+            self._neighbors[row] = list(zip(self.collection.data.index[columns], scores.tolist()))
+        return self._neighbors[row][:k]
+
+    def scores(self):
+        """Scores of all card pairs (above min_count).
+
+        Returns: scipy.sparse.csr_matrix (n_cards x n_cards) in the card order of the collection
+        """
+        pairs = self.pair_decks.tocoo()
+        keep = (pairs.row != pairs.col) & (pairs.data >= self.min_count)
+        rows, columns, pair_counts = pairs.row[keep], pairs.col[keep], pairs.data[keep]
+        scores = pair_counts * self.n_decks / (self.card_decks[rows] * self.card_decks[columns])
+        if self.score == 'pmi':
+            scores = np.log(scores)
+        return scipy.sparse.csr_matrix((scores, (rows, columns)), shape=self.pair_decks.shape)
+
+    def top_pairs(self, n=20):
+        """Highest scoring card pairs.
+
+        Args:
+            n: Number of pairs
+
+        Returns: DataFrame with columns CardA, CardB, Decks and Score
+        """
+        scores = scipy.sparse.triu(self.scores(), k=1).tocoo()
+        top = np.argsort(-scores.data, kind='stable')[:n]
+        card_ids = self.collection.data.index
+        return pd.DataFrame({'CardA': card_ids[scores.row[top]],
+                             'CardB': card_ids[scores.col[top]],
+                             'Decks': np.asarray(self.pair_decks[scores.row[top], scores.col[top]]).ravel(),
+                             'Score': scores.data[top]})
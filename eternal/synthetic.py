@@ -0,0 +1,229 @@
+"""Synthetic 7-win corpora (for scale and load testing of the analysis pipeline, see eternal.sevenwin).
+
+Decks are drawn from the cards a DraftFormat offers, weighted by their offer rates (see DraftFormat.offer_rates)
+and a mana curve: a faction pair, an optional splash of SPLASH_CARDS cards of a third faction, a few offered power
+cards and sigils filling POWER_COUNTS power slots in proportion to the factions of the cards. Rows are written in
+chunks from a single seeded random stream, so a corpus of millions of decks never sits in memory and the same seed
+always gives the same CSV (whatever the chunk size).
+
+From the command line:
+
+    python -m eternal.synthetic --rows 1000000 --output 7win_synthetic.csv --draft-format 12.1
+"""
+import argparse
+import itertools
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import eternal.card
+import eternal.ewc
+import eternal.format
+import eternal.sevenwin
+from .card import FACTION_BITS, FACTION_ORDER
+
+SEED = 0
+CHUNK_SIZE = 10000
+DECK_SIZE = 45
+SIGIL_NAMES = {'F': 'Fire Sigil', 'J': 'Justice Sigil', 'P': 'Primal Sigil', 'S': 'Shadow Sigil', 'T': 'Time Sigil'}
+# Number of power cards (sigils included) -> probability
+POWER_COUNTS = {16: 0.25, 17: 0.5, 18: 0.25}
+# Offered (non sigil) power cards of the deck factions: binomial(MAX_POWER_CARDS, POWER_CARD_RATE)
+MAX_POWER_CARDS = 4
+POWER_CARD_RATE = 0.3
+# Probability of a splash and its number of non-power cards (uniform)
+SPLASH_RATE = 0.35
+SPLASH_CARDS = (1, 3)
+# Relative pick weight of the non-power cards by cost (costs above the last one use its weight)
+CURVE_WEIGHTS = [0.3, 0.7, 1.0, 1.0, 0.8, 0.5, 0.3, 0.15]
+# Losses of a 7-win run -> probability
+LOSSES = {0: 0.4, 1: 0.35, 2: 0.25}
+N_CONTRIBUTORS = 200
+DECKS_PER_EPISODE = 50
+
+
+def _pool(positions, weights):
+    """(positions, cumulative probabilities) of weighted cards, see _sample."""
+    cumulative = np.cumsum(weights[positions])
+    return positions, cumulative / cumulative[-1] if len(positions) else cumulative
+
+
+def _sample(pool, n, rng):
+    """Draw n card positions (with replacement) from a pool."""
+    positions, cumulative = pool
+    return positions[np.minimum(np.searchsorted(cumulative, rng.random(n), side='right'), len(positions) - 1)]
+
+
+class DeckGenerator:
+    """Seeded generator of plausible draft decks of a DraftFormat."""
+
+    def __init__(self, draft_format, collection=None):
+        """DeckGenerator object
+
+        Args:
+            draft_format: eternal.format.DraftFormat (cards are drawn from its current set and draft packs)
+            collection: (optional) CardCollection (defaults to eternal.card.ALL), it must have the SIGIL_NAMES cards
+        """
+        self.draft_format = draft_format
+        self.collection = collection if collection is not None else eternal.card.ALL
+        self.card_ids = self.collection.data.index.to_numpy(dtype=object)
+
+        sigils = self.collection.lookup_names(SIGIL_NAMES.values(), duplicates='first')
+        if sigils.isna().any():
+            raise KeyError(f"Sigils missing from the card collection: {sigils.index[sigils.isna()].tolist()}")
+        self.sigils = dict(zip(SIGIL_NAMES, sigils.to_numpy()))
+
+        offer_rates = np.nan_to_num(draft_format.offer_rates(self.collection).to_numpy(dtype=float))
+        costs = np.clip(np.nan_to_num(pd.to_numeric(pd.Series(self.collection.values('Cost')), errors='coerce')
+                                      .to_numpy(dtype=float)).astype(int), 0, len(CURVE_WEIGHTS) - 1)
+        self._is_power = self.collection.values('Type') == 'Power'
+        self._masks = self.collection.values('FactionMask').astype(np.int64)
+        self._weights = offer_rates * np.where(self._is_power, 1.0, np.array(CURVE_WEIGHTS)[costs])
+        self.pairs = [''.join(pair) for pair in itertools.combinations(FACTION_ORDER, 2)]
+        self._power_cumulative = np.cumsum(list(POWER_COUNTS.values())) / sum(POWER_COUNTS.values())
+        self._pools = {}
+
+    def pool(self, allowed, required=0, power=False):
+        """Pool of the offered cards of a kind (see _sample), built on first use.
+
+        Args:
+            allowed: Faction mask the cards' factions must be within
+            required: Faction mask the cards' factions must include
+            power: Power cards (sigils excluded) instead of non-power cards
+
+        Returns: (positions, cumulative probabilities)
+        """
+        key = (allowed, required, power)
+        if key not in self._pools:
+            is_card = (self._weights > 0) & (self._is_power == power) & \
+                      ((self._masks & ~allowed) == 0) & ((self._masks & required) == required)
+            if power:
+                is_card &= self._masks != 0
+            self._pools[key] = _pool(np.flatnonzero(is_card), self._weights)
+        return self._pools[key]
+
+    def deck(self, rng):
+        """Generate a deck.
+
+        Args:
+            rng: numpy.random.Generator
+
+        Returns: (faction string e.g. 'FJt' with the splash in lowercase, [(card_id, count)] in canonical order)
+        """
+        pair = self.pairs[rng.integers(len(self.pairs))]
+        pair_mask = FACTION_BITS[pair[0]] | FACTION_BITS[pair[1]]
+        splash, n_splash = '', 0
+        if rng.random() < SPLASH_RATE:
+            splash = [faction for faction in FACTION_ORDER if faction not in pair][rng.integers(len(FACTION_ORDER) - 2)]
+            if len(self.pool(pair_mask | FACTION_BITS[splash], FACTION_BITS[splash])[0]):
+                n_splash = int(rng.integers(SPLASH_CARDS[0], SPLASH_CARDS[1] + 1))
+            else:
+                splash = ''
+        deck_mask = pair_mask | (FACTION_BITS[splash] if splash else 0)
+
+        n_power = int(list(POWER_COUNTS)[np.searchsorted(self._power_cumulative, rng.random(), side='right')])
+        main_pool = self.pool(pair_mask)
+        assert len(main_pool[0]), f"No {pair} cards in the draft format"
+        positions = [_sample(main_pool, DECK_SIZE - n_power - n_splash, rng)]
+        if n_splash:
+            positions.append(_sample(self.pool(deck_mask, FACTION_BITS[splash]), n_splash, rng))
+        power_pool = self.pool(deck_mask, power=True)
+        n_power_cards = int(rng.binomial(MAX_POWER_CARDS, POWER_CARD_RATE)) if len(power_pool[0]) else 0
+        positions.append(_sample(power_pool, n_power_cards, rng))
+        positions = np.concatenate(positions)
+
+        # Sigils: about one per two splash cards, the rest split by the factions of the main cards
+        n_sigils = n_power - n_power_cards
+        n_splash_sigils = min(1 + n_splash // 2, 3) if splash else 0
+        main_masks = self._masks[positions[:DECK_SIZE - n_power - n_splash]]
+        pips = np.array([((main_masks & FACTION_BITS[faction]) != 0).sum() for faction in pair], dtype=float) + 1
+        n_first = int(round((n_sigils - n_splash_sigils) * pips[0] / pips.sum()))
+        card_counts = [(self.sigils[pair[0]], n_first), (self.sigils[pair[1]], n_sigils - n_splash_sigils - n_first)]
+        if splash:
+            card_counts.append((self.sigils[splash], n_splash_sigils))
+
+        ids, counts = np.unique(positions, return_counts=True)
+        card_counts += zip(self.card_ids[ids], counts.tolist())
+        return pair + splash.lower(), eternal.ewc.canonical_counts(card_counts)
+
+    def rows(self, n_rows, seed=SEED, v1_fraction=0.0, chunk_size=CHUNK_SIZE):
+        """Generate a 7-win corpus in chunks.
+
+        Args:
+            n_rows: Number of decks
+            seed: Random seed (the rows only depend on it, not on chunk_size)
+            v1_fraction: Fraction of the decks with v1 deck-builder URLs (the others are v2)
+            chunk_size: Number of rows per chunk
+
+        Returns: Iterator of DataFrames with the eternal.sevenwin.CSV_COLUMNS
+        """
+        rng = np.random.default_rng(seed)
+        contributor_weights = np.cumsum(1.0 / np.arange(1, N_CONTRIBUTORS + 1))
+        contributor_weights /= contributor_weights[-1]
+        losses_cumulative = np.cumsum(list(LOSSES.values())) / sum(LOSSES.values())
+        for start in range(0, n_rows, chunk_size):
+            records = []
+            for ix_row in range(start, min(start + chunk_size, n_rows)):
+                factions, card_counts = self.deck(rng)
+                if rng.random() < v1_fraction:
+                    url = f"{eternal.ewc.DECKBUILDER_URL}?main={eternal.ewc.encode_v1_cards(card_counts)}"
+                else:
+                    url = eternal.ewc.deck_url((card_counts, None))
+                contributor = int(np.searchsorted(contributor_weights, rng.random(), side='right'))
+                losses = list(LOSSES)[np.searchsorted(losses_cumulative, rng.random(), side='right')]
+                records.append((self.draft_format.set, factions[:2], f'player{contributor + 1}', '', url, url, 7,
+                                losses, ix_row // DECKS_PER_EPISODE + 1))
+            yield pd.DataFrame(records, columns=eternal.sevenwin.CSV_COLUMNS)
+
+
+def write_csv(output, n_rows, draft_format, collection=None, seed=SEED, v1_fraction=0.0, chunk_size=CHUNK_SIZE):
+    """Write a synthetic 7-win CSV (see DeckGenerator.rows), one chunk at a time.
+
+    Args:
+        output: Path of the CSV or a text file object
+        n_rows: Number of decks
+        draft_format: eternal.format.DraftFormat of the decks
+        collection: (optional) CardCollection (defaults to eternal.card.ALL)
+        seed: Random seed
+        v1_fraction: Fraction of the decks with v1 deck-builder URLs
+        chunk_size: Number of rows generated (and written) at a time
+
+    Returns: Number of rows written
+    """
+    generator = DeckGenerator(draft_format, collection=collection)
+    fout = open(output, 'w', newline='') if isinstance(output, (str, os.PathLike)) else output
+    try:
+        n_written = 0
+        for chunk in generator.rows(n_rows, seed=seed, v1_fraction=v1_fraction, chunk_size=chunk_size):
+            chunk.to_csv(fout, header=n_written == 0, index=False)
+            n_written += len(chunk)
+    finally:
+        if fout is not output:
+            fout.close()
+    return n_written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic 7-win CSV')
+    parser.add_argument('--rows', type=int, required=True, help='Number of decks')
+    parser.add_argument('--output', default='-', help='CSV path (default: standard output)')
+    parser.add_argument('--draft-format', default=eternal.sevenwin.DRAFT_FORMAT,
+                        help='Draft format of the decks (default: %(default)s)')
+    parser.add_argument('--boosting-dir', default=eternal.sevenwin.BOOSTING_DIR, help='Directory of the boosting data')
+    parser.add_argument('--seed', type=int, default=SEED, help='Random seed (default: %(default)s)')
+    parser.add_argument('--v1-fraction', type=float, default=0.0,
+                        help='Fraction of v1 deck-builder URLs (default: %(default)s)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help='Rows generated at a time (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    draft_format = eternal.format.DraftFormat()
+    draft_format.load_json(os.path.join(args.boosting_dir, f'{args.draft_format}.json'))
+    write_csv(sys.stdout if args.output == '-' else args.output, args.rows, draft_format, seed=args.seed,
+              v1_fraction=args.v1_fraction, chunk_size=args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+import eternal.card
+
+
+@pytest.fixture
+def collection():
+    data = pd.DataFrame({'Name': ['Fire Sigil', 'Torch', 'Oni Ronin', 'Sandstorm Titan', 'Trail Stories'],
+                         'Type': ['Power', 'Fast Spell', 'Unit', 'Unit', 'Spell'],
+                         'Influence': ['', '{F}', '{F}', '{T}{T}{T}', '{J}'],
+                         'CardText': ['', 'Deal 2 damage.', '', '', 'Draw a Justice Sigil.'],
+                         'Cost': [0, 1, 1, 6, 1],
+                         'Attack': [0, 0, 1, 6, 0],
+                         'Health': [0, 0, 1, 6, 0]},
+                        index=['1-1', '1-5', '1-12', '1-30', '1-40'])
+    collection = eternal.card.CardCollection()
+    collection._set_data(data)
+    return collection
+
+
+@pytest.fixture
+def all_cards(monkeypatch):
+    # Stand-in for eternal.card.ALL with the cards of the deck-builder URLs in test_ewc
+    card_ids = ['1-1', '1-21', '1-30', '1-40', '1-187', '1-212', '1-224', '1-408', '2-26', '7-14', '10-198', '10-362',
+                '10-368', '10-385', '11-2', '11-4', '11-7', '11-8', '11-10', '11-11', '11-17', '11-105', '11-115',
+                '11-119', '11-121', '11-169', '1005-18']
+    data = pd.DataFrame({'Name': [f'Card {cid}' for cid in card_ids],
+                         'Type': ['Power' if cid == '1-1' else 'Unit' for cid in card_ids],
+                         'Influence': '', 'CardText': '', 'Cost': 1, 'Attack': 1, 'Health': 1},
+                        index=card_ids)
+    collection = eternal.card.CardCollection()
+    collection._set_data(data)
+    monkeypatch.setattr(eternal.card, '_ALL', collection)
+    return collection
+
+
+@pytest.fixture
+def deck_urls():
+    return ['https://eternalwarcry.com/deck-builder?main=1-1:2;1-5:4;1-12:3;1-30:1;',
+            'https://eternalwarcry.com/deck-builder?main=1-1:1;1-40:6;1-5:1;&market=1-30:1;',
+            'https://eternalwarcry.com/deck-builder?main=BZZZ',  # Can't be decoded
+            'https://eternalwarcry.com/deck-builder?main=1-1:3;1-5:6;1-12:1;']
+
+
+@pytest.fixture
+def set_collection(collection):
+    data = collection.data[['Name', 'Type', 'Influence', 'CardText', 'Cost', 'Attack', 'Health']].copy()
+    data['Rarity'] = ['Common', 'Common', 'Common', 'Rare', 'Common']
+    data['SetNumber'] = [1, 2, 1, 1, 2]
+    set_collection = eternal.card.CardCollection()
+    set_collection._set_data(data)
+    return set_collection
@@ -0,0 +1,33 @@
+import pandas as pd
+
+import eternal.bench
+import eternal.ewc
+
+
+def test_make_decks(collection):
+    decks = eternal.bench.make_decks(collection, 5, seed=1)
+    assert decks == eternal.bench.make_decks(collection, 5, seed=1)
+    assert all(sum(count for _, count in deck) == eternal.bench.DECK_SIZE for deck in decks)
+    assert all(dict(deck)['1-1'] == eternal.bench.DECK_POWER for deck in decks)
+    url = eternal.bench.v1_url(decks[0])
+    assert eternal.ewc.deck_key(url) == eternal.ewc.deck_key((decks[0], None))
+
+
+def test_run_and_compare(collection):
+    report = eternal.bench.run(['parse_deckbuilder_urls', 'deck_analytics'], sizes=[3, 6], repeat=1,
+                               collection=collection)
+    assert report[['Benchmark', 'Size']].values.tolist() == [['parse_deckbuilder_urls', 3], ['deck_analytics', 3],
+                                                             ['parse_deckbuilder_urls', 6], ['deck_analytics', 6]]
+    assert (report['Seconds'] > 0).all() and (report['PeakMB'] > 0).all()
+
+    baseline = report.iloc[:3].copy()
+    baseline.loc[0, 'Seconds'] = report.loc[0, 'Seconds'] / 2
+    comparison = eternal.bench.compare(report, baseline, tolerance=0.5)
+    assert comparison['Regression'].tolist() == [True, False, False, False]
+    assert pd.isna(comparison.loc[3, 'TimeRatio'])
+
+
+def test_baseline(tmp_path):
+    report = pd.DataFrame([('card_load', 0, 0.1, 8.0)], columns=eternal.bench.REPORT_COLUMNS)
+    eternal.bench.save_baseline(report, tmp_path / 'baseline.json')
+    pd.testing.assert_frame_equal(eternal.bench.load_baseline(tmp_path / 'baseline.json'), report)
@@ -1,8 +1,11 @@
 import json
+import os
 
+import pandas as pd
 import pytest
 
 import eternal.card
+import eternal.cardcache
 
 
 @pytest.fixture
@@ -47,3 +50,118 @@ def test_influence_to_faction():
     assert eternal.card.influence_to_faction("'{F}{F}{J}'") == 'FJ'
     assert eternal.card.influence_to_faction("'{J}{F}'") == 'FJ'
     assert eternal.card.influence_to_faction("'{T}{T}{T}'") == 'T'
+    assert eternal.card.influence_to_faction("{S}{P}{T}") == 'PST'
+    assert eternal.card.influence_to_mask("{J}{F}") == eternal.card.FACTION_BITS['F'] | eternal.card.FACTION_BITS['J']
+
+
+@pytest.fixture
+def collection_doorbot(tmp_path, json_doorbot):
+    json_path = tmp_path / 'cards.json'
+    json_path.write_text(json.dumps([json_doorbot, {'SetNumber': 3, 'EternalID': 3}]))
+    collection = eternal.card.CardCollection()
+    collection.load(str(json_path))
+    return collection
+
+
+def test_collection_view(collection_doorbot, json_doorbot):
+    assert len(collection_doorbot) == 1
+    card_info = collection_doorbot['3-2']
+    assert card_info.id == '3-2'
+    assert card_info.data.name == '3-2'
+    assert card_info.data['Name'] == json_doorbot['Name']
+    assert card_info.power_count() == 0
+    assert not card_info.has_market_access()
+    assert not hasattr(card_info, '__dict__')
+    assert eternal.card.CardInfo(card_info).data.equals(card_info.data)
+
+
+def test_lazy_all(monkeypatch, tmp_path, json_doorbot):
+    json_path = tmp_path / 'cards.json'
+    json_path.write_text(json.dumps([json_doorbot]))
+    monkeypatch.setattr(eternal.card, 'ALL_CARDS_JSON_PATH', str(json_path))
+    monkeypatch.setattr(eternal.card, '_ALL', None)
+    assert eternal.card.preload(background=True).join() is None
+    assert eternal.card.ALL is eternal.card.load_all()
+    assert eternal.card.ALL['3-2'].id == '3-2'
+
+
+def test_lazy_all_missing(monkeypatch, tmp_path):
+    monkeypatch.setattr(eternal.card, 'ALL_CARDS_JSON_PATH', str(tmp_path / 'missing.json'))
+    monkeypatch.setattr(eternal.card, '_ALL', None)
+    with pytest.raises(FileNotFoundError):
+        eternal.card.ALL
+
+
+def test_collection_cache(tmp_path, json_doorbot, monkeypatch):
+    json_path = tmp_path / 'cards.json'
+    json_path.write_text(json.dumps([json_doorbot]))
+    parsed = eternal.card.CardCollection()
+    parsed.load(str(json_path), use_cache=False)
+    assert not os.path.exists(eternal.cardcache.cache_root(str(json_path)))
+
+    for _ in range(2):  # Write then read the cache
+        cached = eternal.card.CardCollection()
+        cached.load(str(json_path))
+        pd.testing.assert_frame_equal(cached.data, parsed.data)
+    assert not cached.values('FactionMask').flags.writeable  # Memory-mapped, not copied
+
+    monkeypatch.setattr(eternal.card, 'add_derived_columns', None)  # Derived columns come from the cache
+    cached.load(str(json_path))
+    pd.testing.assert_frame_equal(cached.data, parsed.data)
+    monkeypatch.undo()
+
+    # Changing a derivation rule recomputes the derived columns
+    monkeypatch.setitem(eternal.card.MARKET_ACCESS_EXCEPTIONS, '3-2', True)
+    eternal.card.derived_columns_digest.cache_clear()
+    cached.load(str(json_path))
+    assert cached['3-2'].has_market_access()
+    monkeypatch.undo()
+    eternal.card.derived_columns_digest.cache_clear()
+
+    # Changing the JSON invalidates (and replaces) the cache
+    json_doorbot['Name'] = 'Unhelpful Doorbot'
+    json_path.write_text(json.dumps([json_doorbot]))
+    cached = eternal.card.CardCollection()
+    cached.load(str(json_path))
+    assert cached['3-2'].data['Name'] == 'Unhelpful Doorbot'
+    assert os.listdir(eternal.cardcache.cache_root(str(json_path))) == \
+           [eternal.cardcache.file_digest(str(json_path))]
+
+
+def test_derived_columns():
+    data = pd.DataFrame({'Type': ['Power', 'Spell', 'Spell', 'Unit', 'Unit', 'Spell', 'Relic'],
+                         'CardText': ['', '<b>Inscribe</b>', 'Draw a Fire Sigil.', 'Draw a Shadow Sigil.',
+                                      'Your market', '+2 Maximum Power.', 'Draw a sigil from your market.'],
+                         'Cost': [0, 1, 2, 3, 4, 2, 1],
+                         'Influence': ['', '{F}', '{F}{J}', '{S}{S}', '{T}', '{P}{S}{S}', '']},
+                        index=['1-1', '9-1', '9-2', '9-3', '9-4', '9-5', '11-67'])
+    data = eternal.card.add_derived_columns(data)
+    assert data['PowerCount'].tolist() == [1, 1, 1, 0, 0, 0, 0]
+    assert data['EPCPowerCount'].tolist() == [1, 0, 1, 1, 0, 2, 1]
+    assert data['MarketAccess'].tolist() == [False, False, False, False, True, False, True]
+    assert eternal.card.faction_strings(data['FactionMask']).tolist() == ['None', 'F', 'FJ', 'S', 'T', 'PS', 'None']
+    assert data['InfluenceS'].tolist() == [0, 0, 0, 2, 0, 2, 0]
+
+
+def test_lookup_names(collection):
+    assert eternal.card.normalize_name("  Gentleman Jun  D’Angolo ") == "gentleman jun d'angolo"
+    data = collection.data[['Name', 'Type', 'Influence', 'CardText', 'Cost', 'Attack', 'Health']]
+    reprint = data.loc[['1-5']].rename(index={'1-5': '9-5'})
+    reprinted = eternal.card.CardCollection()
+    reprinted._set_data(pd.concat([data, reprint]))
+
+    card_ids = reprinted.lookup_names(['oni  RONIN', 'Nope', 'Fire Sigil'])
+    assert card_ids.to_dict() == {'oni  RONIN': '1-12', 'Nope': None, 'Fire Sigil': '1-1'}
+    with pytest.raises(KeyError, match='torch'):
+        reprinted.lookup_names(['Oni Ronin', 'torch'])
+    assert reprinted.lookup_names(['torch'], duplicates='first').tolist() == ['1-5']
+    assert reprinted.lookup_names(['torch'], duplicates='last').tolist() == ['9-5']
+    names = pd.Series(['Torch', 'Trail Stories'], index=[3, 4])
+    assert reprinted.lookup_names(names, duplicates='all').to_dict() == {3: ('1-5', '9-5'), 4: ('1-40',)}
+
+
+def test_cache_unexpected_values(tmp_path):
+    data = pd.DataFrame({'Name': ['a', None], 'Extra': [{'x': 1}, 'b']}, index=['1-1', '1-2'])
+    with pytest.raises(TypeError):
+        eternal.cardcache.save(str(tmp_path / 'cards.json'), 'digest', data)
+    assert os.listdir(eternal.cardcache.cache_root(str(tmp_path / 'cards.json'))) == []
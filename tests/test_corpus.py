@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+import eternal.card
+import eternal.corpus
+import eternal.deck
+import eternal.ewc
+
+
+@pytest.fixture
+def urls(deck_urls):
+    return pd.Series(deck_urls, index=[10, 11, 12, 13])
+
+
+def test_from_urls(collection, urls):
+    deck_matrix = eternal.corpus.DeckMatrix.from_urls(urls, collection=collection)
+    assert deck_matrix.matrix.shape == (3, 5)
+    assert deck_matrix.decks.tolist() == [10, 11, 13]
+    assert deck_matrix.card_counts().to_dict() == {'1-1': 6, '1-5': 11, '1-12': 4, '1-30': 1, '1-40': 6}
+    assert deck_matrix.deck_counts().to_dict() == {'1-1': 3, '1-5': 3, '1-12': 2, '1-30': 1, '1-40': 1}
+    assert deck_matrix.deck_sizes().tolist() == [10, 8, 10]
+    assert deck_matrix.deck_aggregate('PowerCount').tolist() == [2, 7, 3]
+    assert deck_matrix.deck_aggregate(collection.data['Type'] == 'Unit').tolist() == [4, 0, 1]
+    assert deck_matrix.splash_counts().to_dict() == {'1-30': 1, '1-5': 1}
+
+
+def test_from_urls_unknown_cards(collection, urls):
+    unknown = pd.Series(['https://eternalwarcry.com/deck-builder?main=1-1:2;1-9999:1;'], index=[14])
+    deck_matrix = eternal.corpus.DeckMatrix.from_urls(pd.concat([urls, unknown]), collection=collection)
+    assert deck_matrix.decks.tolist() == [10, 11, 13]
+
+
+def test_matches_decks(collection, urls):
+    valid_urls = urls.drop(12)
+    decks = pd.Series([eternal.deck.Deck.from_counts(main, collection=collection)
+                       for main, _ in map(eternal.ewc.decode_deckbuilder_url, valid_urls)], index=valid_urls.index)
+    deck_matrix = eternal.corpus.DeckMatrix.from_decks(decks)
+    assert (deck_matrix.matrix != eternal.corpus.DeckMatrix.from_urls(urls, collection=collection).matrix).nnz == 0
+
+    factions = deck_matrix.deck_factions()
+    for label, deck in decks.items():
+        main_factions, splash_factions = deck.faction()
+        assert factions.loc[label, 'MainFaction'] == ''.join(main_factions)
+        assert factions.loc[label, 'SplashFaction'] == ''.join(splash_factions)
+    splashed = deck_matrix.splash_matrix()
+    for row, deck in enumerate(decks):
+        splashed_ids = deck_matrix.cards[splashed[row].indices].tolist()
+        assert sorted(splashed_ids) == sorted(set(card.id for card in deck.cards_splash()))
+
+
+def test_playable_deck_counts(collection, urls):
+    deck_matrix = eternal.corpus.DeckMatrix.from_urls(urls, collection=collection)
+    playable = deck_matrix.playable_deck_counts()
+    bits = eternal.card.FACTION_BITS
+    assert playable[0] == 3
+    assert playable[bits['F']] == 3
+    assert playable[bits['F'] | bits['T']] == 1
+    assert playable[bits['J'] | bits['T']] == 0
+    assert playable[bits['S']] == 0
+
+
+def test_deck_features(collection, urls):
+    features = eternal.corpus.deck_features(urls, features=['PowerCount', 'Cost'], collection=collection, n_jobs=2,
+                                            shard_size=1)
+    deck_matrix = eternal.corpus.DeckMatrix.from_urls(urls, collection=collection)
+    assert features.index.tolist() == [10, 11, 13]
+    assert features['Cards'].tolist() == deck_matrix.deck_sizes().tolist()
+    assert features['PowerCount'].tolist() == deck_matrix.deck_aggregate('PowerCount').tolist()
+    assert features['Cost'].tolist() == deck_matrix.deck_aggregate('Cost').tolist()
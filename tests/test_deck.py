@@ -0,0 +1,29 @@
+import pytest
+
+import eternal.deck
+
+
+def test_from_counts(collection):
+    deck = eternal.deck.Deck.from_counts({'1-1': 2, '1-5': 4, '1-12': 3, '1-30': 1}, collection=collection)
+    assert deck.main_data.index.tolist() == ['1-1'] * 2 + ['1-5'] * 4 + ['1-12'] * 3 + ['1-30']
+    assert deck.faction() == (['F'], ['T'])
+    assert deck.types().to_dict() == {'Fast Spell': 4, 'Unit': 4, 'Power': 2}
+    assert deck.unit_stats().to_dict() == {'Attack': 2.25, 'Health': 2.25}
+    assert [card.id for card in deck.cards_splash()] == ['1-30']
+    assert deck.market_data is None
+
+
+def test_from_card_list(collection):
+    cards = [collection['1-5']] * 6 + [collection['1-40']]
+    deck = eternal.deck.Deck(cards, market=[collection['1-12']])
+    assert deck.main_cards == cards
+    assert deck.faction_string() == 'Fj'
+    assert deck.market_data.index.tolist() == ['1-12']
+    assert deck.main_data['PowerCount'].sum() == 1
+
+
+def test_unknown_card_ids(collection):
+    with pytest.raises(KeyError, match='1-2'):
+        eternal.deck.Deck.from_counts({'1-1': 2, '1-2': 1}, collection=collection)
+    with pytest.raises(KeyError, match='1-2'):
+        eternal.deck.Deck.from_counts({'1-1': 2}, market={'1-2': 1}, collection=collection)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import eternal.draftsim
+import eternal.format
+
+
+@pytest.fixture
+def draft_format():
+    draft_format = eternal.format.DraftFormat()
+    draft_format.set, draft_format.version = 2, '2.1'
+    draft_format.boosting = {'1-1': 1, '1-12': 3, '1-30': 2}
+    return draft_format
+
+
+def test_drafts(draft_format, set_collection):
+    simulator = eternal.draftsim.PackSimulator(draft_format, collection=set_collection)
+    drafts = simulator.drafts(100, np.random.default_rng(0))
+    assert drafts.shape == (100, 4, eternal.draftsim.PACK_SIZE)
+    current_set = set_collection.data.index[drafts[:, :2, :8].ravel()]
+    assert set(current_set) == {'1-5', '1-40'}
+    assert (drafts[:, :2, 8:] == -1).all()  # No uncommons or rares in the current set
+    assert set(set_collection.data.index[drafts[:, 2:, :8].ravel()]) == {'1-1', '1-12'}
+    rare_slots = drafts[:, 2:, 11].ravel()
+    assert set(set_collection.data.index[rare_slots[rare_slots >= 0]]) == {'1-30'}
+    assert 0 < (rare_slots == -1).sum() < 30  # No legendaries
+    assert (drafts == simulator.drafts(100, np.random.default_rng(0))).all()
+
+
+def test_offer_rates(draft_format, set_collection):
+    simulator = eternal.draftsim.PackSimulator(draft_format, collection=set_collection)
+    rates = simulator.offer_rates(n_drafts=20000, batch_size=2000, seed=1)
+    assert rates.index.tolist() == ['1-1', '1-5', '1-12', '1-30', '1-40']
+    assert ((rates['Lower'] <= rates['OfferRate']) & (rates['OfferRate'] <= rates['Upper'])).all()
+    analytic = rates['Analytic'].dropna()
+    assert analytic.index.tolist() == ['1-5', '1-12', '1-30', '1-40']
+    assert np.allclose(rates.loc[analytic.index, 'OfferRate'], analytic, rtol=0.02)
+    assert (rates['ZScore'].dropna().abs() < 5).all()
+    assert rates.equals(simulator.offer_rates(n_drafts=20000, batch_size=2000, seed=1, n_jobs=2))
@@ -1,5 +1,8 @@
+import numpy as np
+import pandas as pd
 import pytest
 
+import eternal.card
 import eternal.ewc
 
 
@@ -29,14 +32,132 @@ def ewc_cids_set11_deck():
             '11-169', '11-17', '11-2', '11-2', '11-4', '11-7', '11-7', '11-7', '11-8', '11-8', '2-26', '7-14']
 
 
-def test_parse_deckbuilder_url_v2_siegesupplier(ewc_v2_siegesupplier):
+def test_parse_deckbuilder_url_v2_siegesupplier(all_cards, ewc_v2_siegesupplier):
     deck = eternal.ewc.parse_deckbuilder_url_v2(ewc_v2_siegesupplier)
     assert sorted(deck.main_data.index) == ['1-1', '1-1', '10-362']
 
-def test_parse_v1_set11_deck(ewc_v1_set11_deck, ewc_cids_set11_deck):
+def test_parse_v1_set11_deck(all_cards, ewc_v1_set11_deck, ewc_cids_set11_deck):
     deck = eternal.ewc.parse_deckbuilder_url(ewc_v1_set11_deck)
     assert sorted(deck.main_data.index) == ewc_cids_set11_deck
 
-def test_parse_v2_set11_deck(ewc_v2_set11_deck, ewc_cids_set11_deck):
+def test_parse_v2_set11_deck(all_cards, ewc_v2_set11_deck, ewc_cids_set11_deck):
     deck = eternal.ewc.parse_deckbuilder_url(ewc_v2_set11_deck)
-    assert sorted(deck.main_data.index) == ewc_cids_set11_deck
\ No newline at end of file
+    assert sorted(deck.main_data.index) == ewc_cids_set11_deck
+
+def test_parse_deckbuilder_urls(ewc_v1_set11_deck, ewc_v2_set11_deck, ewc_v2_siegesupplier):
+    urls = [ewc_v1_set11_deck, 'https://eternalwarcry.com/deck-builder?main=BZZZ', ewc_v2_set11_deck,
+            ewc_v2_siegesupplier + '&market=BKqL', 'https://eternalwarcry.com/deck-builder']
+    table = eternal.ewc.parse_deckbuilder_urls(urls)
+    assert list(table.columns) == eternal.ewc.DECK_TABLE_COLUMNS
+    assert table[table.Error.notna()]['Deck'].tolist() == [1, 4]
+
+    main = table[table.Zone == 'main']
+    v1 = main[main.Deck == 0].set_index('CardId')['Count']
+    v2 = main[main.Deck == 2].set_index('CardId')['Count']
+    assert v1.sort_index().equals(v2.sort_index())
+    assert v1.sum() == 45
+    assert table[table.Deck == 3][['CardId', 'Count', 'Zone']].values.tolist() == \
+           [['10-362', 1, 'main'], ['1-1', 2, 'main'], ['10-362', 1, 'market']]
+
+
+def test_parse_deckbuilder_urls_unknown_card():
+    collection = eternal.card.CardCollection()
+    collection._set_data(pd.DataFrame({'Type': ['Power'], 'CardText': [''], 'Cost': [0], 'Influence': ['']},
+                                          index=['1-1']))
+    urls = pd.Series(['https://eternalwarcry.com/deck-builder?main=1-1:3;',
+                      'https://eternalwarcry.com/deck-builder?main=1-1:3;1-2:1;'], index=['a', 'b'])
+    table = eternal.ewc.parse_deckbuilder_urls(urls, collection=collection)
+    assert table['Deck'].tolist() == ['a', 'b']
+    assert table['Error'].tolist() == [None, 'Unknown card ids: 1-2']
+
+
+def test_parse_deckbuilder_urls_parallel(ewc_v1_set11_deck, ewc_v2_set11_deck, ewc_v2_siegesupplier):
+    urls = pd.Series([ewc_v1_set11_deck, 'https://eternalwarcry.com/deck-builder?main=BZZZ', ewc_v2_set11_deck,
+                      ewc_v2_siegesupplier, ewc_v2_set11_deck], index=list('abcde'))
+    table = eternal.ewc.parse_deckbuilder_urls(urls)
+    pd.testing.assert_frame_equal(eternal.ewc.parse_deckbuilder_urls(urls, shard_size=2), table)
+    pd.testing.assert_frame_equal(eternal.ewc.parse_deckbuilder_urls(urls, n_jobs=2, shard_size=2), table)
+
+
+def random_card_counts(rng, n_cards):
+    return [(f"{rng.integers(0, 13)}-{rng.integers(1, 832)}", int(rng.integers(1, 30))) for _ in range(n_cards)]
+
+
+def test_encode_v2_cards_round_trip():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        card_counts = random_card_counts(rng, rng.integers(0, 40))
+        encoded = eternal.ewc.encode_v2_cards(card_counts)
+        decoded = eternal.ewc.decode_v2_cards(encoded)
+        assert eternal.ewc.canonical_counts(decoded) == eternal.ewc.canonical_counts(card_counts)
+        assert eternal.ewc.encode_v2_cards(decoded) == encoded
+        assert eternal.ewc.canonical_counts(eternal.ewc.decode_v1_cards(eternal.ewc.encode_v1_cards(card_counts))) == \
+               eternal.ewc.canonical_counts(card_counts)
+        shuffled = [card_counts[ix] for ix in rng.permutation(len(card_counts))]
+        assert eternal.ewc.encode_v2_cards(shuffled) == encoded
+
+
+def test_encode_v2_cards_parse(all_cards, ewc_v1_set11_deck, ewc_v2_set11_deck, ewc_cids_set11_deck, ewc_v2_siegesupplier):
+    main, _ = eternal.ewc.decode_deckbuilder_url(ewc_v1_set11_deck)
+    cards = eternal.ewc.parse_v2_cards(eternal.ewc.encode_v2_cards(main))
+    assert sorted(card.id for card in cards) == ewc_cids_set11_deck
+    assert eternal.ewc.encode_v2_cards({'10-362': 1, '1-1': 2}) == 'CBBBKqL'
+    with pytest.raises(ValueError):
+        eternal.ewc.encode_v2_cards({'1001-1': 1})
+    assert eternal.ewc.decode_v2_cards(eternal.ewc.encode_v2_cards({'1-831': 1})) == [('1-831', 1)]
+    with pytest.raises(ValueError):
+        eternal.ewc.encode_v2_cards({'1-832': 1})
+
+
+def test_deck_key(all_cards, ewc_v1_set11_deck, ewc_v2_set11_deck, ewc_v2_siegesupplier):
+    assert eternal.ewc.deck_key(ewc_v1_set11_deck) == eternal.ewc.deck_key(ewc_v2_set11_deck)
+    assert eternal.ewc.deck_hash(ewc_v1_set11_deck) == eternal.ewc.deck_hash(ewc_v2_set11_deck)
+    assert len(eternal.ewc.deck_hash(ewc_v1_set11_deck)) == eternal.ewc.DECK_HASH_SIZE
+
+    deck = eternal.ewc.parse_deckbuilder_url(ewc_v2_siegesupplier + '&market=BKqL')
+    assert eternal.ewc.deck_key(deck) == 'main=CBBBKqL&market=BKqL'
+    assert eternal.ewc.deck_url(deck) == 'https://eternalwarcry.com/deck-builder?main=CBBBKqL&market=BKqL'
+    assert eternal.ewc.deck_key(({'1-1': 2, '10-362': 1}, {})) == eternal.ewc.deck_key(ewc_v2_siegesupplier)
+    assert eternal.ewc.deck_key(({'1-1': 2, '10-362': 1}, None)) == 'main=CBBBKqL'
+
+    hashes = eternal.ewc.deck_hashes(pd.Series([ewc_v1_set11_deck, 'not a url', ewc_v2_set11_deck], index=list('abc')))
+    assert hashes['a'] == hashes['c'] and hashes['b'] is None
+
+    campaign = eternal.ewc.deck_hashes(['https://eternalwarcry.com/deck-builder?main=1005-18:1;1-1:2;',
+                                        'https://eternalwarcry.com/deck-builder?main=1-1:1;1005-18:1;1-1:1;',
+                                        'https://eternalwarcry.com/deck-builder?main=1-900:1;'])
+    assert campaign.notna().all() and campaign[0] == campaign[1] != campaign[2]
+
+
+def test_deck_cache(all_cards, ewc_v1_set11_deck, ewc_v2_set11_deck, ewc_v2_siegesupplier):
+    cache = eternal.ewc.DeckCache(maxsize=2)
+    deck = eternal.ewc.parse_deckbuilder_url(ewc_v1_set11_deck, cache=cache)
+    hit = eternal.ewc.parse_deckbuilder_url(ewc_v2_set11_deck, cache=cache)
+    assert hit is not deck and hit.main_ids is deck.main_ids
+    assert sorted(deck.main_data.index) == sorted(eternal.ewc.parse_deckbuilder_url(ewc_v1_set11_deck).main_data.index)
+    with pytest.raises(ValueError):
+        deck.main_counts[0] = 10
+    deck.main_data.loc[:, 'Cost'] = -1
+    assert (hit.main_data['Cost'] != -1).all()
+
+    cache.parse(ewc_v2_siegesupplier)
+    cache.parse(ewc_v2_siegesupplier + '&market=BKqL')
+    assert cache.cache_info() == eternal.ewc.DeckCacheInfo(hits=1, misses=3, evictions=1, invalidations=0,
+                                                           maxsize=2, currsize=2)
+    assert cache.parse(ewc_v2_set11_deck).main_ids is not deck.main_ids
+    cache.invalidate()
+    assert len(cache) == 0 and cache.cache_info().invalidations == 1
+
+    campaign_url = 'https://eternalwarcry.com/deck-builder?main=1005-18:1;1-1:2;'  # Not encodable in v2
+    assert cache.parse(campaign_url).main_ids.tolist() == ['1-1', '1005-18']
+
+
+def test_deck_cache_collection_reload(collection):
+    cache = eternal.ewc.DeckCache(collection=collection)
+    url = 'https://eternalwarcry.com/deck-builder?main=' + eternal.ewc.encode_v2_cards({'1-5': 2, '1-12': 1})
+    deck = cache.parse(url)
+    assert deck.collection is collection
+    assert cache.parse(url).main_ids is deck.main_ids
+    collection._set_data(collection.data.copy())
+    assert cache.parse(url).main_ids is not deck.main_ids
+    assert cache.cache_info()[:4] == (1, 2, 0, 1)
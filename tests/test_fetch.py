@@ -0,0 +1,105 @@
+import asyncio
+import http.server
+import threading
+
+import pytest
+
+import eternal.fetch
+import eternal.format
+
+FANDOM_PAGES = {'/2021-05-18': '<span class="s2">"Torch"</span> = <span class="s2">"2"</span>',
+                '/2021-08-04': '<span class="s2">"Oni Ronin"</span> = <span class="s2">"1"</span>'
+                               '<span class="s2">"Sandstorm Titan"</span> = <span class="s2">"3"</span>'}
+
+
+@pytest.fixture
+def server():
+    requests = []
+    failures = {'/flaky': 2, '/broken': 100}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            if failures.get(self.path, 0) > 0:
+                failures[self.path] -= 1
+                self.send_error(503)
+                return
+            if self.path == '/missing':
+                self.send_error(404)
+                return
+            if self.headers.get('If-None-Match') == '"1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = FANDOM_PAGES.get(self.path, f'page {self.path}').encode('utf-8')
+            self.send_response(200)
+            self.send_header('ETag', '"1"')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}', requests
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch_all(server, tmp_path):
+    url, requests = server
+    fetcher = eternal.fetch.Fetcher(cache_dir=tmp_path, concurrency=2, backoff=0.01)
+    urls = [f'{url}/{i}' for i in range(10)] + [f'{url}/flaky']
+    assert fetcher.get_all(urls) == [f'page /{i}'.encode('utf-8') for i in range(10)] + [b'page /flaky']
+    assert requests.count('/flaky') == 3
+
+    with pytest.raises(eternal.fetch.urllib.error.HTTPError):
+        fetcher.get(f'{url}/broken')
+    assert requests.count('/broken') == fetcher.retries + 1
+    with pytest.raises(eternal.fetch.urllib.error.HTTPError):
+        fetcher.get(f'{url}/missing')
+    assert requests.count('/missing') == 1  # Not retried
+
+
+def test_cache(server, tmp_path):
+    url, requests = server
+    fetcher = eternal.fetch.Fetcher(cache_dir=tmp_path)
+    assert fetcher.get(f'{url}/a') == b'page /a'
+    assert fetcher.get(f'{url}/a') == b'page /a'  # Revalidated (304)
+    assert requests == ['/a', '/a']
+    assert fetcher.cache.get(f'{url}/a')[1]['etag'] == '"1"'
+
+    assert eternal.fetch.Fetcher(cache_dir=tmp_path, revalidate=False).get(f'{url}/a') == b'page /a'
+    offline = eternal.fetch.Fetcher(cache_dir=tmp_path, offline=True)
+    assert offline.get(f'{url}/a') == b'page /a'
+    assert len(requests) == 2
+    with pytest.raises(KeyError):
+        offline.get(f'{url}/b')
+
+
+
+def test_get_in_running_loop(server):
+    url, _ = server
+    fetcher = eternal.fetch.Fetcher()
+    assert fetcher.cache is None
+
+    async def notebook_cell():  # e.g. a Jupyter kernel, where asyncio.run would raise RuntimeError
+        return fetcher.get(f'{url}/a'), fetcher.get_all([f'{url}/b'])
+
+    assert asyncio.run(notebook_cell()) == (b'page /a', [b'page /b'])
+
+def test_scrape_fandom_draft_formats(server, tmp_path, collection):
+    url, requests = server
+    formats = eternal.format.scrape_fandom_draft_formats({'11.2': '2021-08-04', '11.1': '2021-05-18'}, output_dir=tmp_path,
+                                                         fetcher=eternal.fetch.Fetcher(cache_dir=tmp_path / 'cache'),
+                                                         base_url=url + '/', collection=collection)
+    assert [(d.version, d.set, d.iteration, d.startdate, d.enddate) for d in formats] == \
+           [('11.1', 11, 1, '2021-05-18', '2021-08-04'), ('11.2', 11, 2, '2021-08-04', None)]
+    assert formats[1].boosting == {'1-12': 1, '1-30': 3}
+
+    saved = eternal.format.DraftFormat()
+    saved.load_json(tmp_path / '11.1.json')
+    assert saved.boosting == {'1-5': 2}
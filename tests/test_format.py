@@ -0,0 +1,90 @@
+import gc
+
+import pandas as pd
+import pytest
+
+import eternal.card
+import eternal.format
+
+
+def test_offer_rates(set_collection):
+    draft_format = eternal.format.DraftFormat()
+    draft_format.set, draft_format.version = 2, '2.1'
+    draft_format.boosting = {'1-1': 1, '1-12': 1, '1-30': 2}
+    offer_rates = draft_format.offer_rates(set_collection)
+    assert offer_rates.index.tolist() == ['1-1', '1-5', '1-12', '1-30', '1-40']
+    assert offer_rates.isna().tolist() == [True, False, False, False, False]  # Sigils aren't offered
+    assert offer_rates['1-5'] == offer_rates['1-40'] == pytest.approx(2 * 8.0 / 2)  # Current set
+    assert offer_rates['1-12'] == pytest.approx(2 * 8.0 * 1 / 2)  # Boosted among the commons (incl. the sigil)
+    assert offer_rates['1-30'] == pytest.approx(2 * 0.905)
+    assert draft_format.offer_rates(set_collection) is offer_rates
+
+
+def test_matcher_offer_rates(set_collection):
+    matcher = eternal.format.DraftFormatMatcher(setnum=99)
+    for version, boosting in [('2.2', {'1-12': 1}), ('2.1', {'1-12': 1, '1-30': 1})]:
+        draft_format = eternal.format.DraftFormat()
+        draft_format.set, draft_format.version, draft_format.boosting = 2, version, boosting
+        matcher.formats[version] = draft_format
+    offer_rates = matcher.offer_rates(set_collection)
+    assert offer_rates.columns.tolist() == ['2.1', '2.2']
+    assert offer_rates.index.equals(set_collection.data.index)
+    pd.testing.assert_series_equal(offer_rates['2.2'], matcher.formats['2.2'].offer_rates(set_collection))
+
+
+def test_match(set_collection):
+    matcher = eternal.format.DraftFormatMatcher(setnum=99)
+    for version, boosting in [('2.1', {'1-1': 1, '1-12': 1, '1-30': 1}), ('2.2', {'1-12': 1})]:
+        draft_format = eternal.format.DraftFormat()
+        draft_format.set, draft_format.version, draft_format.boosting = 2, version, boosting
+        matcher.formats[version] = draft_format
+    assert matcher.formats_for('1-30', set_collection) == ['2.1']
+    assert matcher.formats_for('1-5', set_collection) == ['2.1', '2.2']
+    assert matcher.formats_for('1-1', set_collection) == []
+
+    urls = pd.Series(['https://eternalwarcry.com/deck-builder?main=1-1:3;1-5:2;1-12:2;1-30:1;',
+                      'https://eternalwarcry.com/deck-builder?main=1-1:3;1-5:2;1-12:2;'], index=['a', 'b'])
+    matches = matcher.match(urls, collection=set_collection)
+    assert matches['Format'].tolist() == ['2.1', '2.2']
+    assert matches.loc['a', 'Confidence'] > 0.99
+    assert 0.5 < matches.loc['b', 'Confidence'] < 0.99  # 1-12 is only more likely in 2.2
+    assert matches['Coverage'].tolist() == [1.0, 1.0]
+
+
+def test_formats_on():
+    matcher = eternal.format.DraftFormatMatcher(setnum=None)
+    assert {'11.1', '11.2', '11.3', '12.1'}.issubset(matcher.formats)
+    assert matcher.format_on('2021-08-03').version == '11.1'
+    assert matcher.format_on('2021-08-04').version == '11.2'  # End dates are exclusive
+    assert matcher.format_on('2021-05-17') is None
+    dates = pd.Series(['2021-09-23', None, '2021-11-10', '2030-01-01'], index=list('abcd'))
+    assert matcher.formats_on(dates).to_dict() == {'a': '11.3', 'b': None, 'c': '11.3', 'd': '12.1'}
+
+
+def test_formats_on_open_ended():
+    matcher = eternal.format.DraftFormatMatcher(setnum=None)
+    matcher.formats['11.1'].enddate = None  # Not yet known when 11.2 was announced
+    assert matcher.format_on('2021-08-03').version == '11.1'
+    assert matcher.format_on('2021-08-04').version == '11.2'
+    assert matcher.formats_on(['2030-01-01'])[0] == '12.1'
+
+
+def test_offer_rates_collection_reload(set_collection):
+    draft_format = eternal.format.DraftFormat()
+    draft_format.set, draft_format.version, draft_format.boosting = 2, '2.1', {'1-12': 1}
+    offer_rates = draft_format.offer_rates(set_collection)
+    assert draft_format.offer_rates(set_collection) is offer_rates
+
+    data = set_collection.data.copy()
+    data.loc['1-30', 'SetNumber'] = 2
+    set_collection._set_data(data)
+    assert draft_format.offer_rates(set_collection)['1-30'] > 0
+    assert pd.isna(offer_rates['1-30'])
+
+    collection = eternal.card.CardCollection()
+    collection._set_data(data)
+    draft_format.offer_rates(collection)
+    assert len(draft_format._offer_rates) == 2
+    del collection
+    gc.collect()
+    assert len(draft_format._offer_rates) == 1  # Cached rates don't keep collections alive
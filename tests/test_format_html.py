@@ -0,0 +1,74 @@
+import io
+import os
+import re
+
+import pytest
+from bs4 import BeautifulSoup
+
+import eternal.format
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def read_fixture(name):
+    with open(os.path.join(DATA_DIR, name), encoding='utf-8') as fin:
+        return fin.read()
+
+
+def soup_dwd_rows(html):
+    """Reference (BeautifulSoup) extraction of the DWD page, as the scraper used to do it."""
+    soup = BeautifulSoup(html, "html.parser")
+    boosting_lookup = {}
+    for text in soup(string=re.compile('This card appears in draft packs')):
+        items = text.split(' ')
+        boosting_lookup[text.count('*')] = eternal.format.text2int(items[items.index('times') - 1])
+    boosting_lookup.setdefault(0, 1)
+    rows = []
+    for table in [x for x in soup.find_all('table') if x.find('thead')]:
+        assert [x.text.strip() for x in table.find_all('th')] in eternal.format.DWD_TABLE_HEADINGS
+        for row in table.find('tbody').find_all('tr'):
+            values = [x.text.strip() for x in row.find_all('td')]
+            rows.append((values[0], boosting_lookup[values[5].count('*')]))
+    return rows
+
+
+def soup_fandom_rows(html):
+    """Reference (BeautifulSoup) extraction of the Fandom page, as the scraper used to do it."""
+    span_data = BeautifulSoup(html, "html.parser").find_all("span", {"class": "s2"})
+    return [(name.text.replace('"', '').strip(), int(boost.text.replace('"', '').strip()))
+            for name, boost in zip(span_data[::2], span_data[1::2])]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 16])
+def test_fandom_extractor(chunk_size):
+    html = read_fixture('fandom_draft_packs.html')
+    chunks = eternal.format.html_chunks(html, chunk_size=chunk_size)
+    rows = list(eternal.format.FandomBoostingExtractor().extract(chunks))
+    assert rows == soup_fandom_rows(html) == [('Torch', 2), ('Oni Ronin', 1), ('Sandstorm Titan', 3)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 16])
+def test_dwd_extractor(chunk_size, collection):
+    html = read_fixture('dwd_draft_packs.html')
+    events = list(eternal.format.DwdBoostingExtractor().extract(eternal.format.html_chunks(html, chunk_size=chunk_size)))
+    assert [event[1] for event in events if event[0] == 'row'] == [name for name, _ in soup_dwd_rows(html)]
+    boosting = eternal.format.parse_dwd_draft_pack_boosted_rates(html, collection=collection)
+    assert boosting == dict(zip(collection.lookup_names([name for name, _ in soup_dwd_rows(html)]), [boost for _, boost in soup_dwd_rows(html)]))
+    assert boosting == {'1-5': 2, '1-12': 10, '1-30': 3}
+
+
+def test_parse_sources(collection):
+    html = read_fixture('fandom_draft_packs.html')
+    expected = {'1-5': 2, '1-12': 1, '1-30': 3}
+    assert eternal.format.parse_fandom_draft_pack_boosted_rates(html, collection=collection) == expected
+    assert eternal.format.parse_fandom_draft_pack_boosted_rates(html.encode('utf-8'), collection=collection) == expected
+    assert eternal.format.parse_fandom_draft_pack_boosted_rates(io.BytesIO(html.encode('utf-8')), collection=collection) == expected
+
+
+def test_dwd_extractor_layout_tables():
+    html = '<table><tbody><tr><td>Sidebar</td><td>Links</td></tr></tbody></table>' \
+           '<table><thead><tr><th>Name</th><th>Type</th><th>Subtype</th><th>Cost</th><th>Influence</th><th>Rarity</th></tr></thead>' \
+           '<tbody><tr><td>Torch</td><td>Fast Spell</td><td></td><td>1</td><td>{F}</td><td>Common*</td></tr>' \
+           '<tr><td>Short row</td></tr></tbody></table>'
+    events = list(eternal.format.DwdBoostingExtractor().extract(html))
+    assert events == [('row', 'Torch', 'Common*'), ('table', eternal.format.DWD_TABLE_HEADINGS[0])]
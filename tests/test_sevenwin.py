@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+import eternal.card
+import eternal.ewc
+import eternal.sevenwin
+
+
+@pytest.fixture
+def csv_path(tmp_path, deck_urls):
+    decks = pd.DataFrame({column: range(len(deck_urls)) for column in eternal.sevenwin.CSV_COLUMNS})
+    decks['Contributor'] = ['Abc', 'b', 'c', 'abc']
+    decks['EWC-P'] = deck_urls
+    path = tmp_path / 'decks.csv'
+    decks.to_csv(path, index=False)
+    return path
+
+
+def test_card_tables(collection, csv_path, tmp_path):
+    pipeline = eternal.sevenwin.Pipeline(csv_path, cache_dir=tmp_path / 'cache', collection=collection)
+    tables = pipeline.run('card_tables')
+    decks, all_cards = tables['decks'], tables['all_cards']
+    assert list(decks.index) == [0, 1, 3]
+    assert list(decks['Contributor']) == ['Abc', 'b', 'Abc']
+    assert list(decks['MainFaction']) == ['F', 'J', 'F']
+    assert list(decks['SplashFaction']) == ['T', 'F', '']
+    assert decks['NumPower'].tolist() == [2, 1, 3]
+    assert decks['UnitCount'].fillna(0).tolist() == [4, 0, 1]
+    assert decks.loc[0, 'Health'] == pytest.approx(9 / 4)
+
+    assert len(all_cards) == 10 + 8 + 10
+    assert list(all_cards.loc[all_cards['DeckId'] == 1, 'Name']) == ['Fire Sigil'] + ['Trail Stories'] * 6 + ['Torch']
+    assert all_cards.loc[all_cards['DeckId'] == 1, 'IsSplash'].tolist() == [False] * 7 + [True]
+    assert tables['card_counts'].set_index('Name')['Count'].to_dict() == {'Fire Sigil': 6, 'Oni Ronin': 4, 'Sandstorm Titan': 1,
+                                                                         'Torch': 11, 'Trail Stories': 6}
+    assert tables['card_counts'].set_index('Name')['PossibleDecks'].to_dict() == {'Fire Sigil': 3, 'Oni Ronin': 3, 'Sandstorm Titan': 1,
+                                                                                 'Torch': 3, 'Trail Stories': 1}
+
+
+def test_stage_cache(collection, csv_path, tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    tables = eternal.sevenwin.Pipeline(csv_path, cache_dir=cache_dir, collection=collection).run('card_tables')
+
+    # Cached stages are not run again
+    def fail(*args, **kwargs):
+        raise AssertionError('stage should be cached')
+    monkeypatch.setattr(eternal.ewc, 'parse_deckbuilder_urls', fail)
+    pipeline = eternal.sevenwin.Pipeline(csv_path, cache_dir=cache_dir, collection=collection)
+    assert pipeline.is_cached('parse_decks')
+    pd.testing.assert_frame_equal(pipeline.run('card_tables')['all_cards'], tables['all_cards'])
+
+    # Changing the CSV invalidates every stage (and replaces the old cache files)
+    with open(csv_path, 'a') as fout:
+        fout.write('0,0,d,0,0,https://eternalwarcry.com/deck-builder?main=1-12:4;,0,0,0\n')
+    pipeline = eternal.sevenwin.Pipeline(csv_path, cache_dir=cache_dir, collection=collection)
+    assert not any(pipeline.is_cached(stage) for stage in eternal.sevenwin.STAGES)
+    with pytest.raises(AssertionError):
+        pipeline.run('card_tables')
+    monkeypatch.undo()
+    assert len(pipeline.run('card_tables')['decks']) == 4
+    assert len(list(cache_dir.glob('parse_decks-*.pkl'))) == 1
+
+    # So does a new card collection, from the parsed decks on
+    renamed = eternal.card.CardCollection()
+    renamed._set_data(collection.data.assign(Name=collection.data['Name'] + ' (reprint)'))
+    pipeline = eternal.sevenwin.Pipeline(csv_path, cache_dir=cache_dir, collection=renamed)
+    assert pipeline.is_cached('load_csv') and not pipeline.is_cached('parse_decks')
+
+
+def test_main_stages(collection, csv_path, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(eternal.card, '_ALL', collection)
+    args = ['--csv', str(csv_path), '--cache-dir', str(tmp_path / 'cache'), '--stages', 'load_csv']
+    for extra_args, status in [([], 'done'), ([], 'cached'), (['--force'], 'done')]:
+        eternal.sevenwin.main(args + extra_args)
+        assert capsys.readouterr().out.startswith(f'load_csv: {status} (')
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+import eternal.deck
+import eternal.similarity
+
+
+def test_similar(collection):
+    decks = pd.Series([eternal.deck.Deck.from_counts({'1-1': 10, '1-5': 4, '1-12': 3}, collection=collection),
+                       eternal.deck.Deck.from_counts({'1-1': 10, '1-5': 4, '1-12': 2}, collection=collection),
+                       eternal.deck.Deck.from_counts({'1-1': 2, '1-30': 3, '1-40': 3}, collection=collection),
+                       eternal.deck.Deck.from_counts({}, collection=collection)],
+                      index=['a', 'b', 'c', 'empty'])
+    index = eternal.similarity.DeckSimilarityIndex.from_decks(decks, num_perm=256)
+    similar = index.similar(decks['a'], threshold=0.8)
+    assert [label for label, _ in similar] == ['a', 'b']
+    assert similar[0][1] == 1.0
+    assert np.isclose(similar[1][1], 16 / 17, atol=0.1)
+    assert index.similar(decks['c'], threshold=0.8) == [('c', 1.0)]
+
+    clusters = index.clusters(threshold=0.8)
+    assert clusters['a'] == clusters['b']
+    assert clusters.nunique() == 3
+
+
+def test_incremental(collection):
+    decks = pd.Series([eternal.deck.Deck.from_counts({'1-1': 10, '1-5': 4, '1-12': i}, collection=collection)
+                       for i in range(6)], index=[f'deck{i}' for i in range(6)])
+    full = eternal.similarity.DeckSimilarityIndex.from_decks(decks)
+    incremental = eternal.similarity.DeckSimilarityIndex.from_decks(decks[:2])
+    incremental.add_decks(decks[2:])
+    assert (full.signatures == incremental.signatures).all()
+    assert incremental.similar(decks.iloc[5], threshold=0.5) == full.similar(decks.iloc[5], threshold=0.5)
@@ -0,0 +1,114 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+import eternal.corpus
+import eternal.stats
+
+
+@pytest.fixture
+def deck_csv(deck_urls):
+    return pd.DataFrame({'Contributor': ['a', 'b', 'c', 'a'], 'EWC-P': deck_urls}).to_csv(index=False)
+
+
+def test_stream_deck_stats(collection, deck_csv):
+    partial_decks = [stats.n_decks for stats in eternal.stats.stream_deck_stats(io.StringIO(deck_csv), chunksize=2,
+                                                                                collection=collection)]
+    assert partial_decks == [2, 3]
+
+    stats = eternal.stats.read_deck_stats(io.StringIO(deck_csv), chunksize=1, collection=collection)
+    urls = pd.read_csv(io.StringIO(deck_csv))['EWC-P']
+    deck_matrix = eternal.corpus.DeckMatrix.from_urls(urls, collection=collection)
+    assert stats.n_decks == 3
+    assert stats.n_errors == 1
+    assert stats.card_count_series().equals(deck_matrix.card_counts())
+    assert stats.deck_count_series().equals(deck_matrix.deck_counts())
+    assert stats.splash_count_series().equals(deck_matrix.splash_counts())
+    assert (stats.playable_deck_counts() == deck_matrix.playable_deck_counts()).all()
+
+    deck_table = deck_matrix.deck_factions()
+    deck_table['EffectivePower'] = deck_matrix.deck_aggregate('PowerCount')
+    assert stats.main_faction_counts().to_dict() == deck_table['MainFaction'].value_counts().to_dict()
+    expected = deck_table.groupby('MainFaction')['EffectivePower'].describe()[['count', 'mean', 'min', 'max']]
+    pd.testing.assert_frame_equal(stats.describe('EffectivePower'), expected)
+
+
+def test_merge(collection, deck_csv):
+    header, *rows = deck_csv.splitlines()
+    merged = eternal.stats.DeckStats(collection=collection)
+    for row in rows:
+        merged.merge(eternal.stats.read_deck_stats(io.StringIO(f'{header}\n{row}\n'), collection=collection))
+    full = eternal.stats.read_deck_stats(io.StringIO(deck_csv), collection=collection)
+    assert merged.n_decks == full.n_decks
+    assert (merged.card_counts == full.card_counts).all()
+    assert (merged.faction_decks == full.faction_decks).all()
+    for name in eternal.stats.DECK_VALUES:
+        pd.testing.assert_frame_equal(merged.describe(name), full.describe(name))
+
+
+def test_update_deck_stats(collection, deck_csv, tmp_path):
+    csv_path, stats_path = tmp_path / 'decks.csv', tmp_path / 'stats.npz'
+    lines = deck_csv.splitlines(keepends=True)
+    csv_path.write_text(''.join(lines[:3]) + lines[3].rstrip('\n'))  # Last deck still being written
+    stats = eternal.stats.update_deck_stats(csv_path, stats_path, collection=collection)
+    assert (stats.n_decks, stats.n_errors) == (2, 0)
+    csv_path.write_text(''.join(lines) + 'Abc,https://eternalwarcry.com/deck-builder?main=1-40:4;\n')
+    stats = eternal.stats.update_deck_stats(csv_path, stats_path, collection=collection)
+    assert eternal.stats.update_deck_stats(csv_path, stats_path, collection=collection).n_decks == 4
+
+    full = eternal.stats.read_deck_stats(csv_path, collection=collection)
+    loaded = eternal.stats.DeckStats.load(stats_path, collection=collection)
+    for stats in [stats, loaded]:
+        assert (stats.n_decks, stats.n_errors) == (full.n_decks, full.n_errors)
+        assert stats.card_count_series().equals(full.card_count_series())
+        assert (stats.faction_decks == full.faction_decks).all()
+        for name in eternal.stats.DECK_VALUES:
+            pd.testing.assert_frame_equal(stats.describe(name), full.describe(name))
+            pd.testing.assert_frame_equal(stats.describe_by_contributor(name), full.describe_by_contributor(name))
+
+    counted = ''.join(lines) + 'Abc,https://eternalwarcry.com/deck-builder?main=1-40:4;\n'
+    for changed in [counted.replace('1-12:3', '1-12:2'),  # Same length edit of an early row
+                    counted.replace('Contributor', 'Contribut0r'),  # Header
+                    counted.replace('1-40:4;', '1-40:5;')]:  # Same length rewrite of the tail
+        csv_path.write_text(changed)
+        os.utime(csv_path, ns=(0, 0))  # Same size: only the modification time tells the CSV was written to
+        with pytest.raises(ValueError):
+            eternal.stats.update_deck_stats(csv_path, stats_path, collection=collection)
+
+
+def test_update_deck_stats_multiline_cells(collection, tmp_path):
+    csv_path, stats_path = tmp_path / 'decks.csv', tmp_path / 'stats.npz'
+    csv_path.write_text('Contributor,EWC-P\n"a\nb",https://eternalwarcry.com/deck-builder?main=1-1:2;\n"c\n')
+    stats = eternal.stats.update_deck_stats(csv_path, stats_path, collection=collection)
+    assert stats.n_decks == 1 and stats.contributors == ['a\nb']
+    with open(csv_path, 'a') as fout:
+        fout.write('d",https://eternalwarcry.com/deck-builder?main=1-5:1;\n')
+    stats = eternal.stats.update_deck_stats(csv_path, stats_path, collection=collection)
+    assert stats.n_decks == 2
+    assert stats.card_count_series().equals(eternal.stats.read_deck_stats(csv_path, collection=collection).card_count_series())
+
+
+def test_contributors_and_frequencies(collection, deck_csv):
+    deck_csv += 'A,https://eternalwarcry.com/deck-builder?main=1-30:6;1-40:1;\n'
+    stats = eternal.stats.read_deck_stats(io.StringIO(deck_csv), collection=collection)
+    decks = pd.read_csv(io.StringIO(deck_csv)).drop(index=2)
+    deck_matrix = eternal.corpus.DeckMatrix.from_urls(decks['EWC-P'], collection=collection)
+    decks = decks.join(deck_matrix.deck_factions())
+    for name, card_type in [('NumPower', 'Power'), ('UnitCount', 'Unit')]:  # Missing when 0, as in card_tables
+        counts = deck_matrix.deck_aggregate(collection.data['Type'] == card_type)
+        decks[name] = counts.where(counts > 0)
+    assert stats.canonical_contributors() == {'a': 'a', 'b': 'b', 'A': 'a'}
+    decks['Contributor'] = decks['Contributor'].str.lower()
+    for name in ['NumPower', 'UnitCount']:
+        expected = decks.groupby('Contributor')[name].describe()[['count', 'mean', 'min', 'max']]
+        pd.testing.assert_frame_equal(stats.describe_by_contributor(name), expected)
+        expected = decks.groupby('MainFaction')[name].describe()[['count', 'mean', 'min', 'max']]
+        pd.testing.assert_frame_equal(stats.describe(name), expected)
+
+    frequencies = stats.faction_frequencies(['F', 'T', 'JT', 'FT', 'S'])
+    for faction in ['F', 'T', 'JT', 'FT', 'S']:
+        assert frequencies[faction] == (decks['MainFaction'] + decks['SplashFaction']).str.contains(faction).mean()
+    assert frequencies['None'] == 1.0
+    assert eternal.stats.DeckStats(collection=collection).faction_frequencies(['F']) == {'F': 0.0, 'None': 1.0}
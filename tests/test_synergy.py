@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import eternal.synergy
+
+
+@pytest.fixture
+def urls():
+    return ['https://eternalwarcry.com/deck-builder?main=1-1:5;1-5:4;1-12:3;',
+            'https://eternalwarcry.com/deck-builder?main=1-1:5;1-5:1;1-12:1;',
+            'https://eternalwarcry.com/deck-builder?main=1-1:5;1-30:2;1-40:1;',
+            'https://eternalwarcry.com/deck-builder?main=1-1:5;1-5:2;1-40:1;']
+
+
+def test_neighbors(collection, urls):
+    index = eternal.synergy.CooccurrenceIndex.from_decks(urls, collection=collection, min_count=1)
+    assert index.n_decks == 4
+    # 1-12 is always played with 1-5 (3 decks): lift = 2 * 4 / (2 * 3)
+    assert index.neighbors('1-12') == [('1-5', pytest.approx(4 / 3))]
+    assert [card_id for card_id, _ in index.neighbors('1-5')] == ['1-12', '1-40']
+    assert index.neighbors('1-5', k=1) == index.neighbors('1-5')[:1]
+    assert index.neighbors('1-1') == []  # Power is excluded
+
+
+def test_incremental(collection, urls):
+    full = eternal.synergy.CooccurrenceIndex.from_decks(urls, collection=collection, score='pmi', min_count=1)
+    incremental = eternal.synergy.CooccurrenceIndex.from_decks(urls[:2], collection=collection, score='pmi', min_count=1)
+    incremental.neighbors('1-5')
+    incremental.add_decks(urls[2:])
+    assert incremental.neighbors('1-5') == full.neighbors('1-5')
+    assert (incremental.scores() != full.scores()).nnz == 0
+    assert full.top_pairs(1)[['CardA', 'CardB', 'Decks']].values.tolist() == [['1-30', '1-40', 1]]
+    assert np.isclose(full.top_pairs(1)['Score'][0], np.log(2))
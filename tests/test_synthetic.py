@@ -0,0 +1,67 @@
+import io
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import eternal.card
+import eternal.ewc
+import eternal.format
+import eternal.sevenwin
+import eternal.synthetic
+
+
+@pytest.fixture
+def draft_collection():
+    records = {f'1-{ix + 1}': (name, 'Power', '', 'Common', 1, 0)
+               for ix, name in enumerate(eternal.synthetic.SIGIL_NAMES.values())}
+    for ix, (factions, cost) in enumerate(itertools.product(['F', 'J', 'P', 'S', 'T', 'FJ', 'PS', ''], range(1, 7))):
+        records[f'2-{ix + 1}'] = (f'Card {ix}', 'Unit', ''.join(f'{{{f}}}' for f in factions), 'Common', 2, cost)
+    records['2-100'] = ('Banner', 'Power', '{F}{J}', 'Uncommon', 2, 0)
+    data = pd.DataFrame.from_dict(records, orient='index',
+                                  columns=['Name', 'Type', 'Influence', 'Rarity', 'SetNumber', 'Cost'])
+    data['CardText'], data['Attack'], data['Health'] = '', 2, 2
+    collection = eternal.card.CardCollection()
+    collection._set_data(data)
+    return collection
+
+
+@pytest.fixture
+def draft_format():
+    draft_format = eternal.format.DraftFormat()
+    draft_format.set, draft_format.version, draft_format.boosting = 2, '2.1', {}
+    return draft_format
+
+
+def test_deck(draft_collection, draft_format):
+    generator = eternal.synthetic.DeckGenerator(draft_format, collection=draft_collection)
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        factions, card_counts = generator.deck(rng)
+        card_counts = dict(card_counts)
+        assert sum(card_counts.values()) == eternal.synthetic.DECK_SIZE
+        deck_mask = eternal.card.influence_to_mask(factions.upper())
+        masks = draft_collection.data.loc[list(card_counts), 'FactionMask']
+        assert ((masks & ~deck_mask) == 0).all()
+        types = draft_collection.data.loc[list(card_counts), 'Type']
+        n_power = sum(count for cid, count in card_counts.items() if types[cid] == 'Power')
+        assert n_power in eternal.synthetic.POWER_COUNTS
+
+
+def test_rows(draft_collection, draft_format):
+    generator = eternal.synthetic.DeckGenerator(draft_format, collection=draft_collection)
+    rows = pd.concat(generator.rows(25, seed=3, v1_fraction=0.5, chunk_size=10))
+    assert rows.columns.tolist() == eternal.sevenwin.CSV_COLUMNS
+    pd.testing.assert_frame_equal(rows.reset_index(drop=True),
+                                  pd.concat(generator.rows(25, seed=3, v1_fraction=0.5, chunk_size=7), ignore_index=True))
+    is_v1 = rows['EWC-P'].str.contains(';')
+    assert is_v1.any() and not is_v1.all()
+    table = eternal.ewc.parse_deckbuilder_urls(rows['EWC-P'].tolist(), collection=draft_collection)
+    assert table['Error'].isna().all()
+
+    fout = io.StringIO()
+    assert eternal.synthetic.write_csv(fout, 25, draft_format, collection=draft_collection, seed=3, v1_fraction=0.5,
+                                       chunk_size=4) == 25
+    pd.testing.assert_frame_equal(pd.read_csv(io.StringIO(fout.getvalue()), keep_default_na=False),
+                                  pd.read_csv(io.StringIO(rows.to_csv(index=False)), keep_default_na=False))